@@ -1,6 +1,8 @@
 # account_store.py
-import os, json, secrets, string
-from typing import Dict, Any, Optional
+import os, json, secrets, string, unicodedata
+from bisect import bisect_left, insort
+import json_cache
+from typing import Dict, Any, Optional, Iterable, List
 
 DEFAULT_PATH = os.getenv("ACCOUNTS_PATH", "./data/accounts.json")
 
@@ -14,24 +16,81 @@ def _ensure_path(path: str) -> None:
 
 def _load(path: str = DEFAULT_PATH) -> Dict[str, Any]:
     _ensure_path(path)
-    with open(path, "r", encoding="utf-8") as f:
-        try: d = json.load(f)
-        except json.JSONDecodeError: d = {}
+    d = json_cache.load(path)
     d.setdefault("accounts", {})
     d.setdefault("by_user", {})
     return d
 
 def _save(d: Dict[str, Any], path: str = DEFAULT_PATH) -> None:
     _ensure_path(path)
-    tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(d, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, path)
+    json_cache.save(d, path)
 
 def _gen_numeric_id(length: int = 6) -> str:
     digits = string.digits
     return "".join(secrets.choice(digits) for _ in range(length))
 
+# ===== فهرس الأسماء للبحث بالبادئة =====
+# حروف تُكتب بأكثر من شكل (الهمزات والتشكيل تُزال مع NFKD)
+_FOLD = str.maketrans({"ى": "ي", "ة": "ه", "ـ": None})
+MAX_SCAN = 500   # حد المفاتيح المفحوصة لكل بحث حتى لا تتحول بادئة عامة لمسح طويل
+
+def normalize_name(text: str) -> str:
+    """صيغة موحدة للمقارنة: بدون حالة أحرف أو تشكيل أو همزات، والتاء المربوطة/الألف المقصورة موحدة."""
+    t = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in t if not unicodedata.combining(c)).translate(_FOLD)
+
+def name_tokens(name: str) -> List[str]:
+    return sorted(set(normalize_name(name).split()))
+
+# مصفوفة مرتبة من "كلمة\0user_id" لكل كلمة في كل اسم (سلسلة واحدة بدل tuple لتوفير الذاكرة)،
+# تُبنى عند أول بحث بعد كل تحميل للملف ويحدّثها create_or_update_account
+_names: Dict[str, Dict[str, Any]] = {}
+
+def _name_keys(d: Dict[str, Any], path: str) -> List[str]:
+    ix = _names.get(path)
+    if ix is None or ix["data"] is not d:
+        keys = [f"{tok}\0{a['user_id']}" for a in d["accounts"].values() for tok in name_tokens(a["name"])]
+        keys.sort()
+        ix = _names[path] = {"data": d, "keys": keys}
+    return ix["keys"]
+
+def _reindex_name(d: Dict[str, Any], path: str, user_id: int, old: str, new: str) -> None:
+    ix = _names.get(path)
+    if ix is None or ix["data"] is not d:
+        return
+    keys, old_t, new_t = ix["keys"], set(name_tokens(old)), set(name_tokens(new))
+    for tok in old_t - new_t:
+        k = f"{tok}\0{user_id}"
+        i = bisect_left(keys, k)
+        if i < len(keys) and keys[i] == k:
+            del keys[i]
+    for tok in new_t - old_t:
+        insort(keys, f"{tok}\0{user_id}")
+
+def find_by_name_prefix(query: str, limit: int = 10, path: str = DEFAULT_PATH) -> List[int]:
+    """مستخدمون كل كلمة في query بداية لكلمة من اسم حسابهم (بترتيب الكلمات أبجديًا)."""
+    words = normalize_name(query).split()
+    if not words:
+        return []
+    d = _load(path)
+    keys = _name_keys(d, path)
+    probe = max(words, key=len)   # الأطول أضيق مدى في الفهرس
+    out: List[int] = []
+    i = bisect_left(keys, probe)
+    end = min(len(keys), i + MAX_SCAN)
+    while i < end and len(out) < limit and keys[i].startswith(probe):
+        uid = int(keys[i].rsplit("\0", 1)[1])
+        i += 1
+        if uid in out:
+            continue
+        if len(words) > 1:
+            acc = d["accounts"].get(d["by_user"].get(str(uid), ""))
+            toks = name_tokens(acc["name"]) if acc else []
+            if not all(any(t.startswith(w) for t in toks) for w in words):
+                continue
+        out.append(uid)
+    return out
+
 def get_account_by_user(user_id: int, path: str = DEFAULT_PATH) -> Optional[Dict[str, Any]]:
     d = _load(path)
     acc_id = d["by_user"].get(str(user_id))
@@ -39,37 +98,59 @@ def get_account_by_user(user_id: int, path: str = DEFAULT_PATH) -> Optional[Dict
 
 def create_or_update_account(user_id: int, name: str, username: Optional[str] = None,
                              path: str = DEFAULT_PATH) -> Dict[str, Any]:
-    d = _load(path)
-    acc_id = d["by_user"].get(str(user_id))
-    if not acc_id:
-        while True:
-            acc_id = _gen_numeric_id(6)  # أرقام فقط
-            if acc_id not in d["accounts"]:
-                break
-        d["by_user"][str(user_id)] = acc_id
-        d["accounts"][acc_id] = {
-            "account_id": acc_id,
-            "user_id": int(user_id),
-            "name": name.strip(),
-            "username": username or ""
-        }
-    else:
-        d["accounts"][acc_id]["name"] = name.strip()
-        if username is not None:
-            d["accounts"][acc_id]["username"] = username
-    _save(d, path)
-    return d["accounts"][acc_id]
+    with json_cache.transaction(path):
+        d = _load(path)
+        acc_id = d["by_user"].get(str(user_id))
+        old_name = d["accounts"][acc_id]["name"] if acc_id else ""
+        if not acc_id:
+            while True:
+                acc_id = _gen_numeric_id(6)  # أرقام فقط
+                if acc_id not in d["accounts"]:
+                    break
+            d["by_user"][str(user_id)] = acc_id
+            d["accounts"][acc_id] = {
+                "account_id": acc_id,
+                "user_id": int(user_id),
+                "name": name.strip(),
+                "username": username or ""
+            }
+        else:
+            d["accounts"][acc_id]["name"] = name.strip()
+            if username is not None:
+                d["accounts"][acc_id]["username"] = username
+        _reindex_name(d, path, int(user_id), old_name, name)
+        _save(d, path)
+        return d["accounts"][acc_id]
 
 def set_username(user_id: int, username: Optional[str], path: str = DEFAULT_PATH) -> None:
-    d = _load(path)
-    acc_id = d["by_user"].get(str(user_id))
-    if acc_id and username is not None:
-        d["accounts"][acc_id]["username"] = username
-        _save(d, path)
+    with json_cache.transaction(path):
+        d = _load(path)
+        acc_id = d["by_user"].get(str(user_id))
+        if acc_id and username is not None:
+            d["accounts"][acc_id]["username"] = username
+            _save(d, path)
 
-def get_display(user_id: int, path: str = DEFAULT_PATH) -> str:
-    acc = get_account_by_user(user_id, path)
+def format_display(acc: Optional[Dict[str, Any]], user_id: int) -> str:
     if acc:
         uname = ("@" + acc["username"]) if acc.get("username") else ""
         return f"{acc['name']} {uname}".strip()
-    return str(user_id)
\ No newline at end of file
+    return str(user_id)
+
+def get_display(user_id: int, path: str = DEFAULT_PATH) -> str:
+    return format_display(get_account_by_user(user_id, path), user_id)
+
+def get_displays(user_ids: Iterable[int], path: str = DEFAULT_PATH) -> Dict[int, str]:
+    """أسماء العرض لعدة مستخدمين بتحميل واحد للملف: {user_id: display}."""
+    d = _load(path)
+    out: Dict[int, str] = {}
+    for uid in user_ids:
+        acc_id = d["by_user"].get(str(uid))
+        out[int(uid)] = format_display(d["accounts"].get(acc_id) if acc_id else None, uid)
+    return out
+
+# ===== باك-إند SQLite (STORE_BACKEND=sqlite) =====
+if os.getenv("STORE_BACKEND", "json").lower() == "sqlite":
+    from sqlite_store import (  # noqa: F811
+        get_account_by_user, create_or_update_account, set_username, get_display, get_displays,
+        find_by_name_prefix
+    )
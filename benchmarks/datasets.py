@@ -0,0 +1,115 @@
+# benchmarks/datasets.py
+"""بيانات صناعية بأحجام حقيقية لملفات المتجر (groups / accounts / user_index / teams).
+
+أحجام المجموعات موزعة توزيع باريتو (ذيل طويل): أغلبها صغير وقليل منها بالآلاف، والمعلّقون
+نسبة صغيرة من حجم كل مجموعة. نفس seed يعطي نفس البيانات في كل تشغيل.
+
+    python benchmarks/datasets.py 100k ./data
+"""
+import os, sys, random
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import json_cache
+
+USER_BASE = 100_000_000
+USERS_PER_GROUP = 25      # عدد المجموعات ≈ المستخدمين / 25
+USERS_PER_TEAM = 50
+ACCOUNT_RATIO = 0.9       # نسبة من لديهم حساب
+USERNAME_RATIO = 0.85
+PHONE_RATIO = 0.3
+
+def parse_size(text: str) -> int:
+    t = text.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(t[-1:], 1)
+    return int(float(t[:-1] if mult > 1 else t) * mult)
+
+def _sizes(rng: random.Random, count: int, n_users: int) -> List[int]:
+    cap = max(2, min(n_users // 4, 20_000))
+    return [min(cap, int(rng.paretovariate(1.3) * 4)) for _ in range(count)]
+
+def _unique_ids(rng: random.Random, count: int, taken: set) -> List[str]:
+    out = []
+    while len(out) < count:
+        i = str(rng.randrange(100_000, 10 ** 7))
+        if i not in taken:
+            taken.add(i)
+            out.append(i)
+    return out
+
+def generate(n_users: int, folder: str, seed: int = 1) -> Dict[str, Any]:
+    """يكتب الملفات الأربعة في folder ويرجع مجمّعات (pools) تستخدمها الاختبارات كوسائط."""
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    users = [USER_BASE + i for i in range(n_users)]
+
+    # ===== المجموعات =====
+    n_groups = max(1, n_users // USERS_PER_GROUP)
+    owners = rng.sample(users, n_groups)
+    groups: Dict[str, Any] = {}
+    for gid, owner, size in zip(_unique_ids(rng, n_groups, set()), owners, _sizes(rng, n_groups, n_users)):
+        members = [owner] + [u for u in rng.sample(users, min(size, n_users)) if u != owner]
+        member_set = set(members)
+        pending = [u for u in rng.sample(users, min(n_users, max(1, size // 10))) if u not in member_set]
+        groups[gid] = {"group_id": gid, "name": f"Group {gid}", "owner_user_id": owner,
+                       "members": members, "pending": pending}
+    json_cache.dump({"groups": groups}, os.path.join(folder, "groups.json"))
+
+    # ===== الحسابات =====
+    accounts: Dict[str, Any] = {}
+    by_user: Dict[str, str] = {}
+    with_acc = [u for u in users if rng.random() < ACCOUNT_RATIO]
+    for acc_id, uid in zip(_unique_ids(rng, len(with_acc), set()), with_acc):
+        accounts[acc_id] = {"account_id": acc_id, "user_id": uid, "name": f"User {uid}",
+                            "username": f"user{uid}" if rng.random() < USERNAME_RATIO else ""}
+        by_user[str(uid)] = acc_id
+    json_cache.dump({"accounts": accounts, "by_user": by_user}, os.path.join(folder, "accounts.json"))
+
+    # ===== فهرس المستخدمين =====
+    index: Dict[str, Any] = {"by_username": {}, "by_phone": {}, "by_id": {}}
+    for uid in users:
+        uname = f"user{uid}" if rng.random() < USERNAME_RATIO else ""
+        phone = f"+20{uid}" if rng.random() < PHONE_RATIO else ""
+        index["by_id"][str(uid)] = {"username": uname, "phone": phone}
+        if uname:
+            index["by_username"][uname] = uid
+        if phone:
+            index["by_phone"][phone] = uid
+    json_cache.dump(index, os.path.join(folder, "user_index.json"))
+
+    # ===== الفرق (كل مستخدم بفريق واحد على الأكثر) =====
+    teams: Dict[str, Any] = {}
+    memberships: Dict[str, str] = {}
+    shuffled = users[:]
+    rng.shuffle(shuffled)
+    pos = 0
+    for n, size in enumerate(_sizes(rng, max(1, n_users // USERS_PER_TEAM), n_users)):
+        chunk = shuffled[pos:pos + size + 1]
+        if not chunk:
+            break
+        pos += len(chunk)
+        tid = f"T{n:06d}"
+        teams[tid] = {"id": tid, "name": f"Team {n}", "owner_id": chunk[0], "members": chunk, "pending": []}
+        for uid in chunk:
+            memberships[str(uid)] = tid
+    json_cache.dump({"teams": teams, "memberships": memberships}, os.path.join(folder, "teams.json"))
+
+    return {
+        "users": users,
+        "groups": {gid: {"owner": g["owner_user_id"], "members": g["members"], "pending": g["pending"]}
+                   for gid, g in groups.items()},
+        "usernames": list(index["by_username"]),
+        "phones": list(index["by_phone"]),
+        "teams": list(teams),
+        "teamless": shuffled[pos:],
+    }
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: python benchmarks/datasets.py <size e.g. 100k> <folder> [seed]")
+        raise SystemExit(2)
+    n = parse_size(sys.argv[1])
+    generate(n, sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 1)
+    print(f"wrote {n} users to {sys.argv[2]}")
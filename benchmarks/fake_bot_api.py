@@ -0,0 +1,102 @@
+# benchmarks/fake_bot_api.py
+"""سيرفر محلي يقلّد Bot API لاختبارات الحمل: يرد فورًا ويسجّل كل استدعاء.
+
+يدعم ما يستخدمه البوت (getMe / sendMessage / editMessageText / answerCallbackQuery)
+وأي طريقة أخرى ترجع True. تشغيل مستقل لتجربة server.py كعملية منفصلة:
+
+    python benchmarks/fake_bot_api.py --port 8081
+    TELEGRAM_API_BASE=http://127.0.0.1:8081 python server.py
+"""
+import json, time, socket, argparse, threading, itertools
+from urllib.parse import parse_qsl
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+
+def _param(raw: Any) -> Any:
+    """PTB يرسل القيم المركّبة (reply_markup...) كنص JSON داخل الفورم."""
+    if isinstance(raw, str) and raw[:1] in "[{":
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return raw
+    return raw
+
+class FakeBotAPI:
+    def __init__(self, on_call: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.on_call = on_call            # يُستدعى من خيط السيرفر مع كل طلب
+        self.calls: Counter = Counter()   # method -> عدد
+        self.messages: Dict[int, List[Dict[str, Any]]] = defaultdict(list)   # chat_id -> رسائل مستلمة
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.app = FastAPI()
+        self.app.add_api_route("/bot{token}/{method}", self._handle, methods=["GET", "POST"])
+
+    async def _handle(self, token: str, method: str, request: Request):
+        if request.headers.get("content-type", "").startswith("application/json"):
+            params = await request.json()
+        else:   # PTB يرسل الطلبات بدون ملفات كـ application/x-www-form-urlencoded
+            body = (await request.body()).decode()
+            params = {k: _param(v) for k, v in parse_qsl(body)}
+        params["method"] = method
+        with self._lock:
+            self.calls[method] += 1
+        if method == "getMe":
+            result: Any = BOT_USER
+        elif method in ("sendMessage", "editMessageText"):
+            chat_id = int(params.get("chat_id") or 0)
+            result = {
+                "message_id": int(params.get("message_id") or next(self._ids)),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", ""),
+            }
+            params["message_id"] = result["message_id"]
+            with self._lock:
+                self.messages[chat_id].append(params)
+        else:
+            result = True
+        if self.on_call is not None:
+            self.on_call(method, params)
+        return JSONResponse({"ok": True, "result": result})
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.messages.clear()
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class ServerThread:
+    """يشغّل FakeBotAPI على خيط مستقل (حلقة asyncio خاصة) حتى لا ينافس البوت على حلقته."""
+    def __init__(self, api: FakeBotAPI, port: int = 0):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        config = uvicorn.Config(api.app, host="127.0.0.1", port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, name="fake-bot-api", daemon=True)
+
+    def start(self) -> "ServerThread":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Local Bot API stand-in")
+    ap.add_argument("--port", type=int, default=8081)
+    args = ap.parse_args()
+    uvicorn.run(FakeBotAPI().app, host="127.0.0.1", port=args.port, log_level="warning")
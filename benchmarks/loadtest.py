@@ -0,0 +1,306 @@
+# benchmarks/loadtest.py
+"""اختبار حمل من الطرف للطرف: server.py + سيرفر Bot API وهمي + تدفق تحديثات صناعي.
+
+كل مستخدم افتراضي يرسل تحديثًا وينتظر رد البوت عليه (sendMessage/editMessageText لنفس
+المحادثة) قبل الخطوة التالية، والزمن بينهما هو زمن التحديث. المراحل بالترتيب:
+تسجيل (start/الإدارة/حساب) ← إنشاء المجموعات ← طلبات الانضمام ← موافقة الملاك ← عرض الأعضاء.
+الموافقة تمر على أزرار رسالة لكل طلب، أو على رسالة الطلبات المجمّعة (join_digest) مع --digest.
+
+    python benchmarks/loadtest.py --users 500 --groups 25
+    python benchmarks/loadtest.py --users 2000 --groups 100 --backend sqlite --json out.json
+
+البيانات تُكتب في مجلد مؤقت، وحدود outbox تُرفع افتراضيًا (السيرفر الوهمي بلا flood limits)
+إلا مع --real-limits.
+"""
+import os, re, sys, json, time, math, asyncio, logging, argparse, tempfile
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_bot_api import FakeBotAPI, ServerThread
+
+TOKEN = "123456:BENCHMARK"
+USER_BASE = 10_000_000
+REPLY_METHODS = ("sendMessage", "editMessageText")
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[max(0, math.ceil(p / 100 * len(s)) - 1)]
+
+def _proc_io() -> Dict[str, int]:
+    try:
+        with open("/proc/self/io", "r") as f:
+            return {k: int(v) for k, v in (line.split(":") for line in f)}
+    except OSError:
+        return {}
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.rejected = 0
+        self.updates = 0
+        self.opens = 0
+        self.phase_calls: Dict[str, Dict[str, int]] = {}
+        self._update_ids = iter(range(1, 1 << 62))
+        self._waiters: Dict[int, asyncio.Future] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.api = FakeBotAPI(on_call=self._on_call)
+
+    # ----- ردود البوت (تصل من خيط السيرفر الوهمي) -----
+    def _on_call(self, method: str, params: Dict[str, Any]) -> None:
+        if method in REPLY_METHODS and self.loop is not None:
+            self.loop.call_soon_threadsafe(self._resolve, int(params.get("chat_id") or 0), params)
+
+    def _resolve(self, chat_id: int, params: Dict[str, Any]) -> None:
+        fut = self._waiters.pop(chat_id, None)
+        if fut is not None and not fut.done():
+            fut.set_result(params)
+
+    # ----- بناء التحديثات -----
+    def _user(self, uid: int) -> Dict[str, Any]:
+        return {"id": uid, "is_bot": False, "first_name": f"U{uid}", "username": f"bench{uid}"}
+
+    def message(self, uid: int, text: str) -> Dict[str, Any]:
+        n = next(self._update_ids)
+        msg = {"message_id": n, "date": int(time.time()), "chat": {"id": uid, "type": "private"},
+               "from": self._user(uid), "text": text}
+        if text.startswith("/"):
+            msg["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return {"update_id": n, "message": msg}
+
+    def callback(self, uid: int, data: str, message_id: int) -> Dict[str, Any]:
+        n = next(self._update_ids)
+        return {"update_id": n, "callback_query": {
+            "id": str(n), "from": self._user(uid), "chat_instance": str(uid), "data": data,
+            "message": {"message_id": message_id, "date": int(time.time()),
+                        "chat": {"id": uid, "type": "private"}, "text": "-"},
+        }}
+
+    async def step(self, client, kind: str, uid: int, update: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """يرسل التحديث للـ webhook وينتظر أول رد للمحادثة؛ يرجع الرد أو None عند المهلة."""
+        fut = self.loop.create_future()
+        self._waiters[uid] = fut
+        t0 = time.perf_counter()
+        while True:
+            r = await client.post("/webhook", json=update)
+            if r.status_code != 429:
+                break
+            self.rejected += 1   # الطابور ممتلئ: أعد الإرسال كما يفعل تيليجرام
+            await asyncio.sleep(0.05)
+        self.updates += 1
+        try:
+            reply = await asyncio.wait_for(fut, self.args.timeout)
+        except asyncio.TimeoutError:
+            self._waiters.pop(uid, None)
+            self.errors[kind] += 1
+            return None
+        self.samples[kind].append(time.perf_counter() - t0)
+        return reply
+
+    # ----- المراحل -----
+    async def _each(self, uids: List[int], fn) -> None:
+        sem = asyncio.Semaphore(self.args.concurrency)
+        async def one(uid):
+            async with sem:
+                await fn(uid)
+        await asyncio.gather(*(one(u) for u in uids))
+
+    async def _settle(self) -> None:
+        """ينتظر إشعارات الخلفية (outbox والرسائل المجمّعة) حتى لا تُحسب كرد على خطوة في المرحلة التالية."""
+        import outbox, join_digest, broadcast
+        while outbox.pending() or join_digest.pending() or broadcast.pending():
+            await asyncio.sleep(0.01)
+
+    async def run(self, client, bh) -> Dict[str, float]:
+        a = self.args
+        users = [USER_BASE + i for i in range(a.users)]
+        owners, members = users[:a.groups], users[a.groups:]
+        gids: Dict[int, str] = {}
+        phases: Dict[str, float] = {}
+
+        async def onboard(uid):
+            await self.step(client, "start", uid, self.message(uid, "/start"))
+            await self.step(client, "admin", uid, self.message(uid, bh.BTN_ADMIN))
+            await self.step(client, "create_acc", uid, self.message(uid, bh.BTN_CREATE_ACC))
+            await self.step(client, "create_acc", uid, self.message(uid, f"Bench User {uid}"))
+
+        async def create_group(uid):
+            await self.step(client, "create_group", uid, self.message(uid, bh.BTN_CREATE_GROUP))
+            reply = await self.step(client, "create_group", uid, self.message(uid, f"Group {uid}"))
+            m = re.search(r"Group ID: (\d+)", (reply or {}).get("text", ""))
+            if m:
+                gids[uid] = m.group(1)
+
+        async def join(uid):
+            gid = gids.get(owners[uid % len(owners)])
+            if gid is None:
+                return
+            await self.step(client, "join_request", uid, self.message(uid, bh.BTN_JOIN_GROUP))
+            await self.step(client, "join_request", uid, self.message(uid, gid))
+
+        def digest_approve(msg) -> Optional[str]:
+            rows = (msg.get("reply_markup") or {}).get("inline_keyboard") or []
+            return next((b["callback_data"] for row in rows for b in row
+                         if re.match(r"JD:\d+:a:", str(b.get("callback_data", "")))), None)
+
+        async def approve(uid):
+            msgs = self.api.messages.get(uid, [])
+            # رسالة مجمّعة: اضغط أول زر قبول في آخر نسخة منها حتى تفرغ
+            while msgs and (data := digest_approve(msgs[-1])):
+                if await self.step(client, "approve", uid, self.callback(uid, data, msgs[-1]["message_id"])) is None:
+                    break
+            for msg in list(self.api.messages.get(uid, [])):
+                rows = (msg.get("reply_markup") or {}).get("inline_keyboard") or []
+                for btn in (b for row in rows for b in row):
+                    if str(btn.get("callback_data", "")).startswith("APPROVE_G:"):
+                        await self.step(client, "approve", uid, self.callback(uid, btn["callback_data"], msg["message_id"]))
+
+        async def members_list(uid):
+            await self.step(client, "members", uid, self.message(uid, bh.BTN_MEMBERS))
+
+        async def send_broadcast(uid):
+            # زر رجوع أثناء انتظار النص يلغي البث، ثم بث فعلي بعد التأكيد
+            await self.step(client, "broadcast", uid, self.message(uid, bh.BTN_BROADCAST))
+            await self.step(client, "broadcast", uid, self.message(uid, bh.BTN_BACK))
+            await self.step(client, "broadcast", uid, self.message(uid, bh.BTN_BROADCAST))
+            reply = await self.step(client, "broadcast", uid, self.message(uid, f"Bench broadcast {uid}"))
+            if reply and "BC:yes" in json.dumps(reply.get("reply_markup") or {}):
+                await self.step(client, "broadcast", uid, self.callback(uid, "BC:yes", reply["message_id"]))
+
+        for name, uids, fn in (("onboard", users, onboard), ("create_group", owners, create_group),
+                               ("join_request", members, join), ("approve", owners, approve),
+                               ("members", users, members_list), ("broadcast", owners, send_broadcast)):
+            t0, calls0 = time.perf_counter(), dict(self.api.calls)
+            await self._each(uids, fn)
+            await self._settle()
+            phases[name] = time.perf_counter() - t0
+            self.phase_calls[name] = {k: v - calls0.get(k, 0) for k, v in self.api.calls.items()
+                                      if v != calls0.get(k, 0)}
+        return phases
+
+def _store_ops() -> Dict[str, float]:
+    import metrics
+    ops: Dict[str, float] = defaultdict(float)
+    for key, row in metrics.STORE_SECONDS._data.items():
+        ops[dict(key).get("op", "?")] += sum(row[:-1])
+    return ops
+
+async def main_async(args) -> Dict[str, Any]:
+    test = LoadTest(args)
+    test.loop = asyncio.get_running_loop()
+    fake = ServerThread(test.api).start()
+    os.environ["TELEGRAM_API_BASE"] = fake.url
+    os.environ["TELEGRAM_TOKEN"] = TOKEN
+
+    import httpx
+    import server, bot_handlers
+    for name in ("httpx", "telegram-bot", "uvicorn"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    data_dir = os.path.abspath("data")
+    def audit(event, evargs):
+        if event == "open" and isinstance(evargs[0], str) and os.path.abspath(evargs[0]).startswith(data_dir):
+            test.opens += 1
+    sys.addaudithook(audit)
+
+    await server.on_startup()
+    io0, ops0, opens0 = _proc_io(), _store_ops(), test.opens
+    try:
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            t0 = time.perf_counter()
+            phases = await test.run(client, bot_handlers)
+            wall = time.perf_counter() - t0
+    finally:
+        await server.on_shutdown()
+        fake.stop()
+    io1, ops1 = _proc_io(), _store_ops()
+
+    n = max(1, test.updates)
+    every = [v for vals in test.samples.values() for v in vals]
+    def lat(vals):
+        return {"count": len(vals), "p50_ms": percentile(vals, 50) * 1000,
+                "p95_ms": percentile(vals, 95) * 1000, "p99_ms": percentile(vals, 99) * 1000}
+    return {
+        "config": {"users": args.users, "groups": args.groups, "concurrency": args.concurrency,
+                   "backend": args.backend, "real_limits": args.real_limits, "join_digest": args.digest},
+        "updates": test.updates,
+        "wall_seconds": wall,
+        "throughput_ups": test.updates / wall if wall else 0.0,
+        "rejected_429": test.rejected,
+        "timeouts": dict(test.errors),
+        "latency": dict({"all": lat(every)}, **{k: lat(v) for k, v in sorted(test.samples.items())}),
+        "phases_seconds": phases,
+        "io_per_update": {
+            "store_loads": (ops1.get("load", 0) - ops0.get("load", 0)) / n,
+            "store_saves": (ops1.get("save", 0) - ops0.get("save", 0)) / n,
+            "file_opens": (test.opens - opens0) / n,
+            "disk_write_bytes": ((io1.get("write_bytes", 0) - io0.get("write_bytes", 0)) / n) if io0 else None,
+        },
+        "api_calls": dict(test.api.calls),
+        "api_calls_by_phase": test.phase_calls,
+    }
+
+def print_report(r: Dict[str, Any]) -> None:
+    c = r["config"]
+    print(f"users={c['users']} groups={c['groups']} concurrency={c['concurrency']} backend={c['backend']}"
+          f" join_digest={'on' if c['join_digest'] else 'off'}")
+    print(f"updates={r['updates']}  wall={r['wall_seconds']:.2f}s  throughput={r['throughput_ups']:.1f} upd/s"
+          f"  429={r['rejected_429']}  timeouts={sum(r['timeouts'].values())}")
+    print(f"{'step':<14}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for k, v in r["latency"].items():
+        print(f"{k:<14}{v['count']:>8}{v['p50_ms']:>10.2f}{v['p95_ms']:>10.2f}{v['p99_ms']:>10.2f}")
+    io = r["io_per_update"]
+    dw = "n/a" if io["disk_write_bytes"] is None else f"{io['disk_write_bytes']:.0f}"
+    print(f"per update: store loads={io['store_loads']:.2f} saves={io['store_saves']:.2f}"
+          f" file opens={io['file_opens']:.2f} disk write bytes={dw}")
+    print("api calls:", ", ".join(f"{k}={v}" for k, v in sorted(r["api_calls"].items())))
+    for phase, calls in r["api_calls_by_phase"].items():
+        print(f"  {phase:<13}", ", ".join(f"{k}={v}" for k, v in sorted(calls.items())))
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="End-to-end webhook load test against a fake Bot API")
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--groups", type=int, default=10)
+    ap.add_argument("--concurrency", type=int, default=50, help="virtual users in flight at once")
+    ap.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    ap.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for each reply")
+    ap.add_argument("--real-limits", action="store_true", help="keep the outbox flood limits")
+    ap.add_argument("--digest", action="store_true", help="batch owner join notifications (JOIN_DIGEST=1)")
+    ap.add_argument("--keep-data", action="store_true", help="print and keep the data directory")
+    ap.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = ap.parse_args()
+    if args.groups < 1 or args.users <= args.groups:
+        ap.error("need at least one group and more users than groups")
+
+    # الإعدادات تُقرأ عند استيراد الوحدات، لذا تُضبط قبل استيراد server
+    os.environ["STORE_BACKEND"] = args.backend
+    os.environ["JOIN_DIGEST"] = "1" if args.digest else "0"
+    if not args.real_limits:
+        for k, v in (("OUTBOX_GLOBAL_RATE", "1e6"), ("OUTBOX_GLOBAL_BURST", "1e6"),
+                     ("OUTBOX_CHAT_RATE", "1e6"), ("OUTBOX_CHAT_BURST", "1e6")):
+            os.environ.setdefault(k, v)
+    workdir = tempfile.mkdtemp(prefix="bot-loadtest-")
+    os.chdir(workdir)
+    logging.basicConfig(level=logging.WARNING)
+
+    report = asyncio.run(main_async(args))
+    print_report(report)
+    if args.json:
+        out = args.json if os.path.isabs(args.json) else os.path.join(os.environ.get("PWD", ROOT), args.json)
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.keep_data:
+        print("data:", workdir)
+    else:
+        import shutil
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
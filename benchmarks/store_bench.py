@@ -0,0 +1,249 @@
+# benchmarks/store_bench.py
+"""قياس زمن كل دالة عامة في group_store / account_store / user_index / team_store / user_search
+على بيانات صناعية (benchmarks/datasets.py) بأحجام 1k / 100k / 1m مستخدم.
+
+    python benchmarks/store_bench.py --sizes 1k,100k --out base.json
+    python benchmarks/store_bench.py --sizes 1k,100k --backend sqlite --compare base.json
+
+كل حجم يعمل في عملية منفصلة وبمجلد مؤقت خاص حتى لا يتأثر بكاش/اتصالات الحجم السابق.
+الناتج JSON (meta + results) قابل للمقارنة بين التشغيلات بـ --compare.
+"""
+import os, sys, json, time, math, random, argparse, platform, resource, subprocess, tempfile, shutil
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.datasets import parse_size, generate, USER_BASE
+
+ENV_KEYS = ("STORE_BACKEND", "STORE_FORMAT", "STORE_FLUSH_MS", "STORE_FLUSH_MAX_OPS", "GROUPS_JOURNAL",
+            "GROUPS_SHARDS")
+
+def percentile(values: List[float], p: float) -> float:
+    s = sorted(values)
+    return s[max(0, math.ceil(p / 100 * len(s)) - 1)] if s else 0.0
+
+class Pools:
+    """وسائط صالحة لكل استدعاء: القراءات تختار عشوائيًا والتعديلات تستهلك من مجمّع."""
+    def __init__(self, data: Dict[str, Any], rng: random.Random):
+        self.rng = rng
+        self.users = data["users"]
+        self.gids = list(data["groups"])
+        self.groups = data["groups"]
+        self.owners = {g["owner"] for g in self.groups.values()}
+        self.usernames, self.phones, self.teams = data["usernames"], data["phones"], data["teams"]
+        self.pending = [(gid, u) for gid, g in self.groups.items() for u in g["pending"]]
+        rng.shuffle(self.pending)
+        self.removable = [(gid, u) for gid, g in self.groups.items() for u in g["members"][1:]]
+        rng.shuffle(self.removable)
+        self.non_owners = [u for u in rng.sample(self.users, min(len(self.users), 5000)) if u not in self.owners]
+        self.teamless = list(data["teamless"])
+        self.team_pending: List[Tuple[str, int]] = []
+        self.next_user = USER_BASE + len(self.users)
+
+    def user(self) -> int:
+        return self.rng.choice(self.users)
+
+    def gid(self) -> str:
+        return self.rng.choice(self.gids)
+
+    def new_user(self) -> int:
+        self.next_user += 1
+        return self.next_user
+
+    def take(self, pool: list):
+        if not pool:
+            raise IndexError("pool exhausted")
+        return pool.pop()
+
+def specs(p: Pools, mods: Dict[str, Any]) -> List[Tuple[str, str, str, Callable[[], tuple]]]:
+    """(module, function, kind, argfn) لكل دالة عامة."""
+    def join_args():
+        gid = p.gid()
+        members = set(p.groups[gid]["members"])
+        uid = p.user()
+        while uid in members:
+            uid = p.user()
+        p.pending.append((gid, uid))
+        return (gid, uid)
+    def team_join():
+        tid, uid = p.rng.choice(p.teams), p.take(p.teamless)
+        p.team_pending.append((tid, uid))
+        return (tid, uid)
+    return [
+        ("group_store", "get_group", "read", lambda: (p.gid(),)),
+        ("group_store", "is_owner", "read", lambda: (p.gid(), p.user())),
+        ("group_store", "my_groups", "read", lambda: (p.user(),)),
+        ("group_store", "owner_group", "read", lambda: (p.user(),)),
+        ("group_store", "list_members", "read", lambda: (p.gid(),)),
+        ("group_store", "members_page", "read", lambda: (p.gid(),)),
+        ("group_store", "request_join", "write", join_args),
+        ("group_store", "approve_join", "write", lambda: p.take(p.pending)),
+        ("group_store", "deny_join", "write", lambda: p.take(p.pending)),
+        ("group_store", "add_member", "write", lambda: (p.gid(), p.user())),
+        ("group_store", "pending_queue", "read", lambda: (p.gid(),)),
+        ("group_store", "expire_pending", "write", lambda: (86400,)),
+        ("group_store", "add_members", "write", lambda: (p.gid(), [p.new_user() for _ in range(100)])),
+        ("group_store", "remove_member", "write", lambda: p.take(p.removable)),
+        ("group_store", "create_group", "write", lambda: ("Bench", p.take(p.non_owners))),
+        ("account_store", "get_account_by_user", "read", lambda: (p.user(),)),
+        ("account_store", "get_display", "read", lambda: (p.user(),)),
+        ("account_store", "get_displays", "read", lambda: ([p.user() for _ in range(50)],)),
+        ("account_store", "create_or_update_account", "write", lambda: (p.new_user(), "New User", "newuser")),
+        ("account_store", "set_username", "write", lambda: (p.user(), f"renamed{p.rng.randrange(10**9)}")),
+        ("user_index", "find_by_username", "read", lambda: (p.rng.choice(p.usernames),)),
+        ("user_index", "find_by_username_prefix", "read", lambda: (p.rng.choice(p.usernames)[:7],)),
+        ("account_store", "find_by_name_prefix", "read", lambda: (str(p.user())[:6],)),
+        ("user_search", "search", "read", lambda: (p.rng.choice(p.usernames)[:7],)),
+        ("user_index", "find_by_phone", "read", lambda: (p.rng.choice(p.phones),)),
+        ("user_index", "get_cached", "read", lambda: (p.user(),)),
+        ("user_index", "upsert", "write", lambda: (p.user(), f"renamed{p.rng.randrange(10**9)}")),
+        ("team_store", "get_team_by_id", "read", lambda: (p.rng.choice(p.teams),)),
+        ("team_store", "my_team", "read", lambda: (p.user(),)),
+        ("team_store", "request_join", "write", team_join),
+        ("team_store", "approve", "write", lambda: p.take(p.team_pending)),
+        ("team_store", "new_team", "write", lambda: (p.new_user(),)),
+        ("team_store", "set_team_name", "write", lambda: (p.rng.choice(p.teams), "Renamed")),
+    ]
+
+def _time_calls(fn: Callable, argfn: Callable[[], tuple], calls: int) -> List[float]:
+    out: List[float] = []
+    for _ in range(calls):
+        try:
+            args = argfn()
+        except IndexError:
+            break   # نفدت الوسائط الصالحة (مثلًا لا معلّقين)
+        t0 = time.perf_counter()
+        fn(*args)
+        out.append(time.perf_counter() - t0)
+    return out
+
+def run_size(size: str, args) -> List[Dict[str, Any]]:
+    n = parse_size(size)
+    workdir = tempfile.mkdtemp(prefix=f"store-bench-{size}-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        t0 = time.perf_counter()
+        data = generate(n, "data", args.seed)
+        gen_s = time.perf_counter() - t0
+        if args.backend == "sqlite":
+            import sqlite_store
+            sqlite_store.import_json("data/groups.json", "data/accounts.json", "data/user_index.json")
+        import json_cache, group_store, account_store, user_index, team_store, user_search
+        group_store.all_groups()   # مع GROUPS_SHARDS: التقسيم الأول يحدث هنا لا داخل القياس
+        json_cache.invalidate()
+        mods = {"group_store": group_store, "account_store": account_store,
+                "user_index": user_index, "team_store": team_store, "user_search": user_search}
+        pools = Pools(data, random.Random(args.seed))
+        del data
+        results: List[Dict[str, Any]] = []
+
+        def record(module: str, name: str, kind: str, times: List[float]) -> None:
+            if not times:
+                return
+            results.append({
+                "size": size, "users": n, "module": module, "function": name, "kind": kind,
+                "calls": len(times), "mean_us": sum(times) / len(times) * 1e6,
+                "p50_us": percentile(times, 50) * 1e6, "p95_us": percentile(times, 95) * 1e6,
+                "p99_us": percentile(times, 99) * 1e6, "ops_per_s": len(times) / sum(times) if sum(times) else 0.0,
+            })
+
+        # أول قراءة بعد تفريغ الكاش = تحميل الملف من القرص (لا معنى لها مع sqlite)
+        for module, fn, argfn in (("group_store", group_store.get_group, lambda: (pools.gid(),)),
+                                  ("account_store", account_store.get_account_by_user, lambda: (pools.user(),)),
+                                  ("user_index", user_index.get_cached, lambda: (pools.user(),)),
+                                  ("team_store", team_store.my_team, lambda: (pools.user(),))):
+            json_cache.invalidate()
+            record(module, "(cold load)", "load", _time_calls(fn, argfn, 1))
+
+        for module, name, kind, argfn in specs(pools, mods):
+            if args.only and f"{module}.{name}" not in args.only and module not in args.only:
+                continue
+            calls = args.reads if kind == "read" else args.writes
+            fn = getattr(mods[module], name)
+            _time_calls(fn, argfn, min(calls, args.warmup))
+            record(module, name, kind, _time_calls(fn, argfn, calls))
+        json_cache.flush()
+        for r in results:
+            r["generate_s"] = gen_s
+            r["maxrss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def meta(args) -> Dict[str, Any]:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                             text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        rev = ""
+    return {"git": rev, "python": platform.python_version(), "platform": platform.platform(),
+            "backend": args.backend, "seed": args.seed, "reads": args.reads, "writes": args.writes,
+            "env": {k: os.environ[k] for k in ENV_KEYS if k in os.environ},
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def print_table(results: List[Dict[str, Any]], baseline: Optional[Dict[Tuple, Dict[str, Any]]] = None) -> None:
+    head = f"{'size':<6}{'function':<42}{'calls':>7}{'p50 us':>12}{'p95 us':>12}{'p99 us':>12}"
+    print(head + ("  vs base p50" if baseline else ""))
+    for r in results:
+        name = f"{r['module']}.{r['function']}"
+        line = f"{r['size']:<6}{name:<42}{r['calls']:>7}{r['p50_us']:>12.1f}{r['p95_us']:>12.1f}{r['p99_us']:>12.1f}"
+        if baseline:
+            b = baseline.get((r["size"], r["module"], r["function"]))
+            if b and b["p50_us"]:
+                line += f"  x{r['p50_us'] / b['p50_us']:.2f}"
+        print(line)
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Store microbenchmarks on synthetic datasets")
+    ap.add_argument("--sizes", default="1k,100k", help="comma list, e.g. 1k,100k,1m")
+    ap.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    ap.add_argument("--reads", type=int, default=2000, help="calls per read function")
+    ap.add_argument("--writes", type=int, default=50, help="calls per write function")
+    ap.add_argument("--warmup", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--only", default="", help="comma list of modules or module.function")
+    ap.add_argument("--out", metavar="PATH", help="write results JSON here")
+    ap.add_argument("--compare", metavar="PATH", help="previous results JSON to compare against")
+    ap.add_argument("--format", choices=("table", "json"), default="table", help="stdout format")
+    ap.add_argument("--quiet", action="store_true")
+    args = ap.parse_args()
+    args.only = {s.strip() for s in args.only.split(",") if s.strip()}
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    out = os.path.abspath(args.out) if args.out else None
+    os.environ["STORE_BACKEND"] = args.backend   # يُقرأ عند استيراد الوحدات
+
+    results: List[Dict[str, Any]] = []
+    if len(sizes) == 1:
+        results = run_size(sizes[0], args)
+    else:
+        for size in sizes:
+            fd, tmp = tempfile.mkstemp(suffix=".json")
+            os.close(fd)
+            cmd = [sys.executable, os.path.abspath(__file__), "--sizes", size, "--backend", args.backend,
+                   "--reads", str(args.reads), "--writes", str(args.writes), "--warmup", str(args.warmup),
+                   "--seed", str(args.seed), "--only", ",".join(args.only), "--out", tmp, "--quiet"]
+            subprocess.run(cmd, check=True)
+            with open(tmp, "r", encoding="utf-8") as f:
+                results += json.load(f)["results"]
+            os.remove(tmp)
+
+    doc = {"meta": meta(args), "results": results}
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2)
+    if args.quiet:
+        return
+    if args.format == "json":
+        print(json.dumps(doc))
+        return
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = {(r["size"], r["module"], r["function"]): r for r in json.load(f)["results"]}
+    print_table(results, baseline)
+
+if __name__ == "__main__":
+    main()
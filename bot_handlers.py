@@ -1,21 +1,36 @@
 # bot_handlers.py
-import base64, re
+import os, base64, re
 from typing import Optional
 from telegram import (
     Update, ReplyKeyboardMarkup, KeyboardButton,
     InlineKeyboardMarkup, InlineKeyboardButton
 )
+from telegram.error import BadRequest
 from telegram.ext import (
     Application, CommandHandler, MessageHandler,
     CallbackQueryHandler, ContextTypes, filters
 )
 
-from account_store import create_or_update_account, get_account_by_user, set_username, get_display
+from account_store import create_or_update_account, set_username, get_displays
 from group_store   import (
     create_group, get_group, request_join, approve_join, deny_join,
-    my_groups, list_members, is_owner, add_member, remove_member, owner_group
+    list_members, members_page, is_owner, is_member, add_member, remove_member,
+    add_members, remove_members, pending_queue, approve_pending, deny_pending
 )
-from user_index    import upsert as idx_upsert, find_by_username, find_by_phone
+from user_index    import upsert as idx_upsert, find_by_username, find_many_by_username, find_by_phone
+import user_search
+from update_scope  import current as current_scope, scoped
+from metrics       import timed
+import outbox
+import broadcast
+import join_digest
+from pending_view  import pending_view
+
+# عدد الأعضاء في كل صفحة من قائمة الأعضاء
+MEMBERS_PAGE_SIZE = int(os.getenv("MEMBERS_PAGE_SIZE", "20"))
+# حدود الإضافة/الإزالة الجماعية (قائمة ملصقة أو ملف نصي/CSV)
+BULK_MAX_ENTRIES = int(os.getenv("BULK_MAX_ENTRIES", "2000"))
+BULK_MAX_BYTES = int(os.getenv("BULK_MAX_BYTES", str(256 * 1024)))
 
 # ===== الكيبورد =====
 BTN_ADMIN = "🛠️ الإدارة"
@@ -30,17 +45,39 @@ BTN_MEMBERS      = "👥 أعضاء مجموعتي"
 BTN_ADD_MEMBER   = "➕ إضافة عضو"
 BTN_REM_MEMBER   = "➖ إزالة عضو"
 BTN_INVITE       = "📨 دعوة لشخص"
+BTN_BROADCAST    = "📣 رسالة للأعضاء"
+BTN_PENDING      = "📥 الطلبات المعلّقة"
 BTN_BACK         = "↩︎ رجوع"
 BTN_HELP         = "ℹ️ مساعدة"
 
+# أسماء ثابتة لفروع on_text في /metrics
+BRANCHES = {
+    BTN_ADMIN: "admin", BTN_BACK: "back", BTN_CREATE_ACC: "create_acc", BTN_CREATE_GROUP: "create_group",
+    BTN_JOIN_GROUP: "join_group", BTN_MY_ACC: "my_acc", BTN_MY_GROUPS: "my_groups", BTN_MEMBERS: "members",
+    BTN_ADD_MEMBER: "add_member", BTN_REM_MEMBER: "rem_member", BTN_INVITE: "invite", BTN_BROADCAST: "broadcast",
+    BTN_PENDING: "pending", BTN_HELP: "help", "/help": "help",
+}
+
+def text_branch(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    action = (context.user_data.get("state") or {}).get("action")
+    if action:
+        return f"wizard:{action}"
+    return BRANCHES.get(((update.message and update.message.text) or "").strip(), "other")
+
+def callback_branch(*actions: str):
+    """فرع المقياس من الجزء الثالث في callback_data، محصورًا في actions (البيانات من العميل)."""
+    def branch(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+        parts = (update.callback_query.data or "").split(":")
+        return parts[2] if len(parts) > 2 and parts[2] in actions else "other"
+    return branch
+
 def main_kb() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup([[KeyboardButton(BTN_ADMIN)]], resize_keyboard=True)
 
 def admin_kb(user_id: int) -> ReplyKeyboardMarkup:
     rows = []
-    acc = get_account_by_user(user_id)
-    groups = my_groups(user_id)
-    own = owner_group(user_id)
+    sc = current_scope(user_id)
+    acc, groups, own = sc.account, sc.groups, sc.own
 
     # صف 1: حساب + إنشاء مجموعة (لو عنده حساب ولم يملك مجموعة بعد)
     rows.append([KeyboardButton(BTN_CREATE_ACC), KeyboardButton(BTN_MY_ACC)])
@@ -57,7 +94,8 @@ def admin_kb(user_id: int) -> ReplyKeyboardMarkup:
     # صف 4: أدوات المالك فقط
     if own:
         rows.append([KeyboardButton(BTN_ADD_MEMBER), KeyboardButton(BTN_REM_MEMBER)])
-        rows.append([KeyboardButton(BTN_INVITE)])
+        rows.append([KeyboardButton(BTN_INVITE), KeyboardButton(BTN_BROADCAST)])
+        rows.append([KeyboardButton(BTN_PENDING)])
 
     # صف 5: مساعدة + رجوع
     rows.append([KeyboardButton(BTN_HELP), KeyboardButton(BTN_BACK)])
@@ -70,12 +108,12 @@ async def show_admin(update: Update, context: ContextTypes.DEFAULT_TYPE, text="
     await send_text(update, context, text, admin_kb(update.effective_user.id))
 
 async def send_text(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, kb: ReplyKeyboardMarkup):
-    if update.message:
-        await update.message.reply_text(text, reply_markup=kb)
-    else:
-        await context.bot.send_message(update.effective_chat.id, text, reply_markup=kb)
+    # رد تفاعلي: يمر على المُجدول بأولوية أعلى من الإشعارات الخلفية
+    await outbox.send(context.bot, update.effective_chat.id, text, reply_markup=kb)
 
 # ===== أوامر =====
+@timed("cmd_start")
+@scoped
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     idx_upsert(user.id, username=user.username)
@@ -92,10 +130,13 @@ def state(context: ContextTypes.DEFAULT_TYPE) -> dict:
     return context.user_data.setdefault("state", {})
 
 # ===== منطق النص =====
+@timed("on_text", text_branch)
+@scoped
 async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.message
     text = (msg.text or "").strip()
     user = update.effective_user
+    sc = current_scope(user.id)
 
     idx_upsert(user.id, username=user.username)  # تحديث فهرس المستخدم
 
@@ -112,44 +153,44 @@ async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # === أزرار الإدارة (تعرض حسب الحالة تلقائيًا) ===
     if text == BTN_CREATE_ACC:
-        acc = get_account_by_user(user.id)
+        acc = sc.account
         if acc:
-            return await show_admin(update, context, f"لديك حساب بالفعل: {get_display(user.id)}\n🆔 {acc['account_id']}")
+            return await show_admin(update, context, f"لديك حساب بالفعل: {sc.display}\n🆔 {acc['account_id']}")
         st.update({"action": "CREATE_ACC", "step": "ASK_NAME"})
         return await send_text(update, context, "✍️ اكتب اسمك الآن (رسالة واحدة).", admin_kb(user.id))
 
     if text == BTN_CREATE_GROUP:
-        if not get_account_by_user(user.id):
+        if not sc.account:
             return await show_admin(update, context, "⚠️ أنشئ حسابًا أولًا.")
-        if owner_group(user.id):
+        if sc.own:
             return await show_admin(update, context, "🚫 مسموح بمجموعة واحدة فقط لكل مالك.")
         st.update({"action": "CREATE_GROUP", "step": "ASK_NAME"})
         return await send_text(update, context, "✍️ اكتب اسم المجموعة الآن.", admin_kb(user.id))
 
     if text == BTN_JOIN_GROUP:
-        if not get_account_by_user(user.id):
+        if not sc.account:
             return await show_admin(update, context, "⚠️ أنشئ حسابًا أولًا.")
         st.update({"action": "JOIN_GROUP", "step": "ASK_GID"})
         return await send_text(update, context, "✍️ اكتب **رقم مجموعة** مكوّن من أرقام فقط (مثال: 825104).", admin_kb(user.id))
 
     if text == BTN_MY_ACC:
-        acc = get_account_by_user(user.id)
+        acc = sc.account
         if not acc:
             return await show_admin(update, context, "لا يوجد حساب بعد.")
-        groups = my_groups(user.id)
+        groups = sc.groups
         extra = ""
         if groups:
             extra = "\n\nمجموعاتك:\n" + "\n".join([f"- {g['name']} ({g['group_id']})" for g in groups])
-        return await show_admin(update, context, f"{get_display(user.id)}\n🆔 {acc['account_id']}{extra}")
+        return await show_admin(update, context, f"{sc.display}\n🆔 {acc['account_id']}{extra}")
 
     if text == BTN_MY_GROUPS:
-        groups = my_groups(user.id)
+        groups = sc.groups
         if not groups:
             return await show_admin(update, context, "🚫 لست عضوًا بأي مجموعة.")
         return await show_admin(update, context, "مجموعاتك:\n" + "\n".join([f"- {g['name']} ({g['group_id']})" for g in groups]))
 
     if text == BTN_MEMBERS:
-        groups = my_groups(user.id)
+        groups = sc.groups
         if not groups:
             return await show_admin(update, context, "🚫 لست عضوًا بأي مجموعة.")
         if len(groups) == 1:
@@ -158,42 +199,60 @@ async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return await send_text(update, context, "اكتب رقم المجموعة لعرض الأعضاء.", admin_kb(user.id))
 
     if text == BTN_ADD_MEMBER:
-        own = owner_group(user.id)
+        own = sc.own
         if not own:
             return await show_admin(update, context, "🚫 هذه الخاصية للمالك فقط.")
         st.update({"action": "ADD_MEMBER", "step": "ASK_USER", "gid": own["group_id"]})
-        return await send_text(update, context, "ارسل @username أو ID المستخدم لإضافته.", admin_kb(user.id))
+        return await send_text(update, context, "ارسل @username أو ID المستخدم أو جزءًا من اسمه لإضافته،\nأو قائمة (سطر لكل واحد) أو ملف نصي/CSV لإضافة عدة أشخاص مرة واحدة.", admin_kb(user.id))
 
     if text == BTN_REM_MEMBER:
-        own = owner_group(user.id)
+        own = sc.own
         if not own:
             return await show_admin(update, context, "🚫 هذه الخاصية للمالك فقط.")
         st.update({"action": "REM_MEMBER", "step": "ASK_USER", "gid": own["group_id"]})
-        return await send_text(update, context, "ارسل @username أو ID المستخدم لإزالته.", admin_kb(user.id))
+        return await send_text(update, context, "ارسل @username أو ID المستخدم أو جزءًا من اسمه لإزالته،\nأو قائمة (سطر لكل واحد) أو ملف نصي/CSV لإزالة عدة أشخاص مرة واحدة.", admin_kb(user.id))
 
     if text == BTN_INVITE:
-        own = owner_group(user.id)
+        own = sc.own
         if not own:
             return await show_admin(update, context, "🚫 هذه الخاصية للمالك فقط.")
         st.update({"action": "INVITE", "step": "ASK_TARGET", "gid": own["group_id"]})
-        return await send_text(update, context, "أرسل @username أو رقم الهاتف الدولي (+201234567890).", admin_kb(user.id))
+        return await send_text(update, context, "أرسل @username أو رقم الهاتف الدولي (+201234567890) أو جزءًا من الاسم.", admin_kb(user.id))
+
+    if text == BTN_BROADCAST:
+        own = sc.own
+        if not own:
+            return await show_admin(update, context, "🚫 هذه الخاصية للمالك فقط.")
+        st.update({"action": "BROADCAST", "step": "ASK_TEXT", "gid": own["group_id"]})
+        return await send_text(update, context, "✍️ اكتب الرسالة التي ستصل لكل أعضاء مجموعتك.", admin_kb(user.id))
+
+    if text == BTN_PENDING:
+        own = sc.own
+        if not own:
+            return await show_admin(update, context, "🚫 هذه الخاصية للمالك فقط.")
+        text, kb = pending_view(own["group_id"])
+        if kb is None:
+            return await show_admin(update, context, text)
+        return await send_text(update, context, text, kb)
 
     if text == BTN_HELP or text == "/help":
         return await show_admin(update, context,
-            "الإدارة ديناميكية حسب دورك: المالك يرى أدوات الإضافة/الإزالة/الدعوة؛ العضو يرى الأعضاء فقط.")
+            "الإدارة ديناميكية حسب دورك: المالك يرى أدوات الإضافة/الإزالة/الدعوة/البث؛ العضو يرى الأعضاء فقط.")
 
     return await show_main(update, context, f"استخدم زر {BTN_ADMIN} لإظهار الإدارة.")
 
 # ===== الويزارد =====
 async def handle_wizard(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, st: dict):
     user = update.effective_user
+    sc = current_scope(user.id)
     action, step = st.get("action"), st.get("step")
 
     # إنشاء حساب
     if action == "CREATE_ACC" and step == "ASK_NAME":
         acc = create_or_update_account(user.id, text, username=user.username)
+        sc.invalidate()
         reset_state(context)
-        return await show_admin(update, context, f"🎉 تم إنشاء حسابك.\n{get_display(user.id)}\n🆔 {acc['account_id']}")
+        return await show_admin(update, context, f"🎉 تم إنشاء حسابك.\n{sc.display}\n🆔 {acc['account_id']}")
 
     # إنشاء مجموعة
     if action == "CREATE_GROUP" and step == "ASK_NAME":
@@ -204,6 +263,7 @@ async def handle_wizard(update: Update, context: ContextTypes.DEFAULT_TYPE, text
             if str(e) == "ALREADY_OWNER":
                 return await show_admin(update, context, "🚫 لديك مجموعة بالفعل. مسموح بواحدة فقط.")
             return await show_admin(update, context, "حدث خطأ أثناء إنشاء المجموعة.")
+        sc.invalidate()
         reset_state(context)
         return await show_admin(update, context, f"✅ تم إنشاء المجموعة: {g['name']}\n🆔 Group ID: {g['group_id']}")
 
@@ -224,21 +284,21 @@ async def handle_wizard(update: Update, context: ContextTypes.DEFAULT_TYPE, text
             if str(e) == "ALREADY_MEMBER":
                 return await show_admin(update, context, "✅ أنت بالفعل عضو.")
             return await show_admin(update, context, "حدث خطأ، حاول لاحقًا.")
-        payload = base64.urlsafe_b64encode(f"{gid}|{user.id}".encode()).decode()
-        kb = InlineKeyboardMarkup([[
-            InlineKeyboardButton("✅ موافقة", callback_data=f"APPROVE_G:{payload}"),
-            InlineKeyboardButton("✖️ رفض",    callback_data=f"DENY_G:{payload}")
-        ]])
-        uname = user.username or user.full_name
-        try:
-            await context.bot.send_message(
-                g["owner_user_id"],
+        if join_digest.ENABLED:
+            join_digest.notify(context.bot, g)   # رسالة مجمّعة واحدة للمالك تُعدَّل مع كل دفعة
+        else:
+            payload = base64.urlsafe_b64encode(f"{gid}|{user.id}".encode()).decode()
+            kb = InlineKeyboardMarkup([[
+                InlineKeyboardButton("✅ موافقة", callback_data=f"APPROVE_G:{payload}"),
+                InlineKeyboardButton("✖️ رفض",    callback_data=f"DENY_G:{payload}")
+            ]])
+            uname = user.username or user.full_name
+            outbox.post(
+                context.bot, g["owner_user_id"],
                 f"📨 طلب انضمام جديد إلى {g['name']} ({g['group_id']}):\n"
                 f"المستخدم: {uname} (ID: {user.id})",
                 reply_markup=kb
             )
-        except Exception:
-            pass
         reset_state(context)
         return await show_admin(update, context, "تم إرسال طلبك للمالك. انتظر الموافقة ✅")
 
@@ -250,58 +310,211 @@ async def handle_wizard(update: Update, context: ContextTypes.DEFAULT_TYPE, text
 
     # إضافة عضو (المالك فقط)
     if action == "ADD_MEMBER" and step == "ASK_USER":
-        gid = st.get("gid")
+        entries = parse_bulk(text)
+        if entries:
+            return await do_bulk(update, context, st.get("gid"), action, entries)
         uid = await resolve_user_id(text)
-        if not uid:
+        if uid:
+            return await do_add_member(update, context, st.get("gid"), uid)
+        uids = search_users(text)
+        if not uids:
             reset_state(context)
             return await show_admin(update, context, "لم أجد هذا المستخدم.")
-        add_member(gid, uid)
-        reset_state(context)
-        return await show_admin(update, context, f"✅ تمت إضافة {await display_user(uid)} إلى المجموعة {gid}.")
+        return await offer_matches(update, context, uids)
 
     # إزالة عضو (المالك فقط)
     if action == "REM_MEMBER" and step == "ASK_USER":
         gid = st.get("gid")
+        entries = parse_bulk(text)
+        if entries:
+            return await do_bulk(update, context, gid, action, entries)
         uid = await resolve_user_id(text)
-        if not uid:
+        if uid:
+            return await do_remove_member(update, context, gid, uid)
+        uids = search_users(text, where=lambda u: is_member(gid, u))
+        if not uids:
             reset_state(context)
             return await show_admin(update, context, "لم أجد هذا المستخدم.")
-        remove_member(gid, uid)
-        reset_state(context)
-        return await show_admin(update, context, f"✅ تمت إزالة {await display_user(uid)} من المجموعة {gid}.")
+        return await offer_matches(update, context, uids)
 
     # دعوة شخص
     if action == "INVITE" and step == "ASK_TARGET":
-        gid = st.get("gid")
         uname, phone = parse_target(text)
-        me = await context.bot.get_me()
-        invite_link = f"https://t.me/{me.username}?start=join_{gid}"
-        ok = False
         target_id: Optional[int] = None
         if uname:
             target_id = find_by_username(uname)
         elif phone:
             target_id = find_by_phone(phone)
-        if target_id:
-            try:
-                await context.bot.send_message(
-                    target_id,
-                    f"📨 دعوة للانضمام إلى مجموعة رقم: {gid}\nاضغط: {invite_link}"
-                )
-                ok = True
-            except Exception:
-                ok = False
-        reset_state(context)
-        if ok:
-            return await show_admin(update, context, "✅ تم إرسال الدعوة مباشرة.")
-        else:
-            return await show_admin(update, context, f"شارك هذا الرابط مع الشخص:\n{invite_link}")
+        if not target_id and not phone and not re.fullmatch(r"\+?\d+", text.strip()):
+            uids = search_users(text)
+            if uids:
+                return await offer_matches(update, context, uids)
+        return await do_invite(update, context, st.get("gid"), target_id)
+
+    # بث رسالة لكل الأعضاء (المالك فقط)
+    if action == "BROADCAST" and step == "ASK_TEXT":
+        gid = st.get("gid")
+        if text in BRANCHES or not text:
+            # زر من لوحة الإدارة (رجوع مثلًا) ليس نص البث: إلغاء بدل إرساله للكل
+            reset_state(context)
+            return await show_admin(update, context, "تم إلغاء البث.")
+        if not is_owner(gid, user.id):
+            reset_state(context)
+            return await show_admin(update, context, "🚫 هذه الخاصية للمالك فقط.")
+        n = sum(1 for uid in list_members(gid) if uid != user.id)
+        if not n:
+            reset_state(context)
+            return await show_admin(update, context, "لا يوجد أعضاء آخرون في المجموعة.")
+        st.update({"step": "CONFIRM", "text": text})
+        kb = InlineKeyboardMarkup([[InlineKeyboardButton(f"📣 إرسال ({n})", callback_data="BC:yes"),
+                                    InlineKeyboardButton("✖️ إلغاء", callback_data="BC:no")]])
+        return await send_text(update, context, f"إرسال هذه الرسالة إلى {n} عضو؟\n\n{text}", kb)
 
     # fallback
     reset_state(context)
     return await show_admin(update, context, "تم إلغاء العملية.")
 
+# ===== تنفيذ خطوات الإضافة/الإزالة/الدعوة (من النص أو من زر نتيجة بحث) =====
+async def do_add_member(update: Update, context: ContextTypes.DEFAULT_TYPE, gid: str, uid: int):
+    add_member(gid, uid)
+    current_scope(update.effective_user.id).invalidate()
+    reset_state(context)
+    return await show_admin(update, context, f"✅ تمت إضافة {await display_user(uid)} إلى المجموعة {gid}.")
+
+async def do_remove_member(update: Update, context: ContextTypes.DEFAULT_TYPE, gid: str, uid: int):
+    remove_member(gid, uid)
+    current_scope(update.effective_user.id).invalidate()
+    reset_state(context)
+    return await show_admin(update, context, f"✅ تمت إزالة {await display_user(uid)} من المجموعة {gid}.")
+
+async def do_bulk(update: Update, context: ContextTypes.DEFAULT_TYPE, gid: str, action: str, entries: list):
+    """قائمة كاملة = تحويل واحد للأسماء + تعديل واحد على المجموعة + ملخص."""
+    uids, unresolved = resolve_many(entries[:BULK_MAX_ENTRIES])
+    if action == "ADD_MEMBER":
+        res, done_label, skip_label = add_members(gid, uids), "✅ أُضيف", "↔️ أعضاء أصلًا"
+    else:
+        res, done_label, skip_label = remove_members(gid, uids), "✅ أُزيل", "↔️ ليسوا أعضاء"
+    current_scope(update.effective_user.id).invalidate()
+    reset_state(context)
+    lines = [f"📋 المجموعة {gid}:", f"{done_label}: {len(res['done'])}", f"{skip_label}: {len(res['skipped'])}"]
+    if unresolved:
+        shown = ", ".join(unresolved[:30]) + (" …" if len(unresolved) > 30 else "")
+        lines.append(f"❓ لم أتعرف على {len(unresolved)}: {shown}")
+    if len(entries) > BULK_MAX_ENTRIES:
+        lines.append(f"⚠️ عولج أول {BULK_MAX_ENTRIES} فقط من {len(entries)}.")
+    return await show_admin(update, context, "\n".join(lines))
+
+async def do_invite(update: Update, context: ContextTypes.DEFAULT_TYPE, gid: str, target_id: Optional[int]):
+    me = await context.bot.get_me()
+    invite_link = f"https://t.me/{me.username}?start=join_{gid}"
+    ok = False
+    if target_id:
+        try:
+            await outbox.send(
+                context.bot, target_id,
+                f"📨 دعوة للانضمام إلى مجموعة رقم: {gid}\nاضغط: {invite_link}"
+            )
+            ok = True
+        except Exception:
+            ok = False
+    reset_state(context)
+    if ok:
+        return await show_admin(update, context, "✅ تم إرسال الدعوة مباشرة.")
+    else:
+        return await show_admin(update, context, f"شارك هذا الرابط مع الشخص:\n{invite_link}")
+
+def search_users(text: str, where=None) -> list:
+    # أزرار القائمة أثناء انتظار الاختيار ليست بحثًا
+    return [] if text in BRANCHES else user_search.search(text, where=where)
+
+async def offer_matches(update: Update, context: ContextTypes.DEFAULT_TYPE, uids: list):
+    """نتائج البحث كأزرار PICK:<uid>؛ الويزارد يبقى مفتوحًا فيمكن أيضًا كتابة محاولة أخرى."""
+    names = get_displays(uids)
+    kb = InlineKeyboardMarkup([[InlineKeyboardButton(names[uid], callback_data=f"PICK:{uid}")] for uid in uids])
+    return await send_text(update, context, "اختر المستخدم المقصود (أو اكتب بحثًا آخر):", kb)
+
+@timed("on_pick_user")
+@scoped
+async def on_pick_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    try:
+        uid = int(q.data.split(":", 1)[1])
+    except Exception:
+        return await q.edit_message_text("بيانات غير صالحة.")
+    st = state(context)
+    action, gid = st.get("action"), st.get("gid")
+    if action not in ("ADD_MEMBER", "REM_MEMBER", "INVITE"):
+        return await q.edit_message_text("انتهت هذه العملية.")
+    await q.edit_message_text(f"☑️ {await display_user(uid)}")
+    if action == "ADD_MEMBER":
+        return await do_add_member(update, context, gid, uid)
+    if action == "REM_MEMBER":
+        return await do_remove_member(update, context, gid, uid)
+    return await do_invite(update, context, gid, uid)
+
+# ===== تأكيد البث (BC:yes|no) =====
+@timed("on_broadcast_confirm", lambda u, c: "yes" if u.callback_query.data == "BC:yes" else "no")
+@scoped
+async def on_broadcast_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    user = update.effective_user
+    st = state(context)
+    if st.get("action") != "BROADCAST" or st.get("step") != "CONFIRM":
+        return await q.edit_message_text("انتهت هذه العملية.")
+    gid, text = st.get("gid"), st.get("text")
+    reset_state(context)
+    if q.data != "BC:yes":
+        await q.edit_message_text("تم إلغاء البث.")
+        return await show_admin(update, context)
+    if not is_owner(gid, user.id):
+        return await q.edit_message_text("🚫 هذه الخاصية للمالك فقط.")
+    meta = broadcast.create(gid, user.id, text, list_members(gid))
+    if not meta["recipients"]:
+        return await q.edit_message_text("لا يوجد أعضاء آخرون في المجموعة.")
+    broadcast.start(context.bot, meta)
+    await q.edit_message_text(f"📣 بدأ إرسال الرسالة إلى {len(meta['recipients'])} عضو. سيصلك تقرير عند الانتهاء.")
+
 # ===== دعم =====
+USERNAME_RE = re.compile(r"[A-Za-z][A-Za-z0-9_]{3,31}")
+
+def split_entries(text: str) -> list:
+    """عناصر قائمة ملصقة أو ملف نصي/CSV: خلية لكل عنصر، والخلية "@a @b" تُقسم بالمسافات.
+
+    خلية فيها مسافات وليست كلها @/IDs (اسم كامل مثلًا) تبقى عنصرًا واحدًا فتظهر ضمن غير المعروفين.
+    """
+    out = []
+    for cell in re.split(r"[\r\n,;\t]+", text):
+        cell = cell.strip().strip('"').strip()
+        if not cell:
+            continue
+        parts = cell.split()
+        if len(parts) > 1 and all(p.startswith("@") or p.isdigit() for p in parts):
+            out.extend(parts)
+        else:
+            out.append(cell)
+    return out
+
+def parse_bulk(text: str) -> Optional[list]:
+    """عناصر القائمة لو النص أكثر من عنصر، وإلا None (بحث/مستخدم واحد كالمعتاد)."""
+    entries = split_entries(text)
+    return entries if len(entries) > 1 else None
+
+def resolve_many(entries: list) -> tuple[list, list]:
+    """IDs كما هي، وكل أسماء المستخدمين في تحميل واحد للفهرس؛ يرجع (user_ids، عناصر لم تُعرف)."""
+    names = {e: e.lstrip("@") for e in entries if not re.fullmatch(r"\d{5,12}", e)}
+    found = find_many_by_username([n for n in names.values() if USERNAME_RE.fullmatch(n)])
+    uids, unresolved = [], []
+    for e in entries:
+        if e not in names:
+            uids.append(int(e))
+        elif names[e].lower() in found:
+            uids.append(found[names[e].lower()])
+        else:
+            unresolved.append(e)
+    return uids, unresolved
+
 async def resolve_user_id(text: str) -> Optional[int]:
     text = text.strip()
     if re.fullmatch(r"\d{5,12}", text):
@@ -311,19 +524,31 @@ async def resolve_user_id(text: str) -> Optional[int]:
     return None
 
 async def display_user(user_id: int) -> str:
-    return get_display(user_id)
+    return get_displays([user_id])[int(user_id)]
+
+def members_view(page: dict):
+    """نص الصفحة + أزرار السابق/التالي؛ الأسماء تُجلب لأعضاء هذه الصفحة فقط."""
+    gid, uids = page["group_id"], page["members"]
+    names = get_displays(uids)
+    lines = [f"- {names[uid]} (ID: {uid})" + (" 👑" if uid == page["owner_user_id"] else "") for uid in uids]
+    text = f"👥 أعضاء {page['name']} ({gid}) — {page['total']}:\n" + "\n".join(lines)
+    nav = []
+    if page["prev"] is not None:
+        nav.append(InlineKeyboardButton("◀️ السابق", callback_data=f"MEM:{gid}:b:{page['prev']}"))
+    if page["next"] is not None:
+        nav.append(InlineKeyboardButton("التالي ▶️", callback_data=f"MEM:{gid}:a:{page['next']}"))
+    return text, (InlineKeyboardMarkup([nav]) if nav else None)
 
 async def show_members(update: Update, context: ContextTypes.DEFAULT_TYPE, gid: str):
-    g = get_group(gid)
-    if not g:
+    page = members_page(gid, MEMBERS_PAGE_SIZE)
+    if not page:
         return await show_admin(update, context, "❌ لم أجد هذه المجموعة.")
-    uids = list_members(gid)
-    if not uids:
-        return await show_admin(update, context, f"المجموعة {g['name']} ({gid}) بلا أعضاء.")
-    lines = []
-    for uid in uids:
-        lines.append(f"- {await display_user(uid)} (ID: {uid})")
-    return await show_admin(update, context, f"👥 أعضاء {g['name']} ({gid}):\n" + "\n".join(lines))
+    if not page["members"]:
+        return await show_admin(update, context, f"المجموعة {page['name']} ({gid}) بلا أعضاء.")
+    text, kb = members_view(page)
+    if kb is None:
+        return await show_admin(update, context, text)
+    return await send_text(update, context, text, kb)
 
 def parse_target(text: str) -> tuple[Optional[str], Optional[str]]:
     t = text.strip()
@@ -332,6 +557,8 @@ def parse_target(text: str) -> tuple[Optional[str], Optional[str]]:
     return (None, None)
 
 # ===== ردود المالك على أزرار الموافقة/الرفض =====
+@timed("on_owner_decision", lambda u, c: (u.callback_query.data or "").split(":", 1)[0])
+@scoped
 async def on_owner_decision(update: Update, context: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query
     await q.answer()
@@ -346,19 +573,132 @@ async def on_owner_decision(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return await q.edit_message_text("المجموعة غير موجودة.")
     if update.effective_user.id != g["owner_user_id"]:
         return await q.edit_message_text("هذه الأزرار للمالك فقط.")
+    if uid not in g["pending"]:
+        # زر قديم: الطلب حُسم (قبول/رفض الكل) أو انتهت مهلته بعد إرسال الرسالة
+        return await q.edit_message_text(f"⚠️ طلب {await display_user(uid)} لم يعد معلّقًا.")
     if action == "APPROVE_G":
         approve_join(gid, uid)
         await q.edit_message_text(f"✅ تمت الموافقة على {await display_user(uid)}.")
-        try: await context.bot.send_message(uid, f"🎉 تم قبولك في {g['name']} (ID: {g['group_id']})")
-        except Exception: pass
+        outbox.post(context.bot, uid, f"🎉 تم قبولك في {g['name']} (ID: {g['group_id']})")
     else:
         deny_join(gid, uid)
         await q.edit_message_text(f"✖️ تم رفض {await display_user(uid)}.")
-        try: await context.bot.send_message(uid, f"عذرًا، تم رفض طلبك للانضمام إلى {g['name']}.")
-        except Exception: pass
+        outbox.post(context.bot, uid, f"عذرًا، تم رفض طلبك للانضمام إلى {g['name']}.")
+
+# ===== تصفح قائمة الأعضاء (MEM:<gid>:a|b:<cursor>) =====
+@timed("on_members_page")
+@scoped
+async def on_members_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    try:
+        _, gid, direction, cursor = q.data.split(":", 3)
+        cursor = int(cursor)
+    except Exception:
+        return await q.edit_message_text("بيانات غير صالحة.")
+    if not any(g["group_id"] == gid for g in current_scope(update.effective_user.id).groups):
+        return await q.edit_message_text("🚫 لست عضوًا بهذه المجموعة.")
+    if direction == "b":
+        page = members_page(gid, MEMBERS_PAGE_SIZE, before=cursor)
+    else:
+        page = members_page(gid, MEMBERS_PAGE_SIZE, after=cursor)
+    if not page:
+        return await q.edit_message_text("المجموعة غير موجودة.")
+    text, kb = members_view(page)
+    await q.edit_message_text(text, reply_markup=kb)
+
+# ===== ملف قائمة (نص/CSV) أثناء ويزارد الإضافة/الإزالة =====
+@timed("on_document")
+@scoped
+async def on_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    doc = update.message.document
+    st = state(context)
+    action = st.get("action")
+    if action not in ("ADD_MEMBER", "REM_MEMBER"):
+        return await show_admin(update, context, "أرسل الملف بعد اختيار إضافة أو إزالة عضو.")
+    if doc.file_size and doc.file_size > BULK_MAX_BYTES:
+        reset_state(context)
+        return await show_admin(update, context, f"🚫 الملف أكبر من {BULK_MAX_BYTES // 1024}KB.")
+    f = await doc.get_file()
+    raw = bytes(await f.download_as_bytearray())
+    entries = split_entries(raw.decode("utf-8-sig", errors="replace"))
+    if not entries:
+        reset_state(context)
+        return await show_admin(update, context, "الملف فارغ.")
+    return await do_bulk(update, context, st.get("gid"), action, entries)
+
+# ===== طابور الطلبات المعلّقة (PQ:<gid>:approve|deny:<عدد>:<وقت العرض>) =====
+@timed("on_pending_batch", callback_branch("approve", "deny"))
+@scoped
+async def on_pending_batch(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    try:
+        _, gid, action, count, shown_at = q.data.split(":")
+        n, before = int(count), int(shown_at)
+    except Exception:
+        return await q.edit_message_text("بيانات غير صالحة.")
+    g = get_group(gid)
+    if not g:
+        return await q.edit_message_text("المجموعة غير موجودة.")
+    if update.effective_user.id != g["owner_user_id"]:
+        return await q.edit_message_text("هذه الأزرار للمالك فقط.")
+    if action == "approve":
+        uids = approve_pending(gid, n, before)
+        note, done = f"🎉 تم قبولك في {g['name']} (ID: {gid})", f"✅ تم قبول {len(uids)}."
+    else:
+        uids = deny_pending(gid, n, before)
+        note, done = f"عذرًا، تم رفض طلبك للانضمام إلى {g['name']}.", f"✖️ تم رفض {len(uids)}."
+    current_scope(update.effective_user.id).invalidate()
+    for uid in uids:
+        outbox.post(context.bot, uid, note, priority=outbox.BULK)
+    text, kb = pending_view(gid)
+    await q.edit_message_text(f"{done}\n\n{text}", reply_markup=kb)
+
+# ===== رسالة الطلبات المجمّعة (JD:<gid>:a|d:<uid>:<page> أو JD:<gid>:p:<page>) =====
+@timed("on_digest", callback_branch("a", "d", "p"))
+@scoped
+async def on_digest(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    try:
+        parts = q.data.split(":")
+        gid, action = parts[1], parts[2]
+        uid, page = (None, int(parts[3])) if action == "p" else (int(parts[3]), int(parts[4]))
+    except Exception:
+        return await q.edit_message_text("بيانات غير صالحة.")
+    g = get_group(gid)
+    if not g:
+        return await q.edit_message_text("المجموعة غير موجودة.")
+    if update.effective_user.id != g["owner_user_id"]:
+        return await q.edit_message_text("هذه الأزرار للمالك فقط.")
+    note = ""
+    if action in ("a", "d") and uid not in g["pending"]:
+        # رسالة قديمة: الطلب حُسم أو سُحب أو انتهت مهلته بعد عرضها
+        note = "⚠️ هذا الطلب لم يعد معلّقًا.\n\n"
+    elif action == "a":
+        approve_join(gid, uid)
+        outbox.post(context.bot, uid, f"🎉 تم قبولك في {g['name']} (ID: {g['group_id']})")
+        current_scope(update.effective_user.id).invalidate()
+    elif action == "d":
+        deny_join(gid, uid)
+        outbox.post(context.bot, uid, f"عذرًا، تم رفض طلبك للانضمام إلى {g['name']}.")
+    text, kb = join_digest.view(gid, g["name"], page)
+    text = note + text
+    try:
+        await q.edit_message_text(text, reply_markup=kb)
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():   # زر رقم الصفحة = تحديث، وقد لا يتغير شيء
+            raise
 
 def register_handlers(app: Application) -> None:
     app.add_handler(CommandHandler("start",   cmd_start))
     app.add_handler(CommandHandler("version", cmd_version))
     app.add_handler(CallbackQueryHandler(on_owner_decision, pattern="^(APPROVE_G|DENY_G):"))
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, on_text))
\ No newline at end of file
+    app.add_handler(CallbackQueryHandler(on_members_page,   pattern="^MEM:"))
+    app.add_handler(CallbackQueryHandler(on_pick_user,      pattern="^PICK:"))
+    app.add_handler(CallbackQueryHandler(on_pending_batch,  pattern="^PQ:"))
+    app.add_handler(CallbackQueryHandler(on_digest,         pattern="^JD:"))
+    app.add_handler(CallbackQueryHandler(on_broadcast_confirm, pattern="^BC:"))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, on_text))
+    app.add_handler(MessageHandler(filters.Document.ALL, on_document))
\ No newline at end of file
@@ -0,0 +1,189 @@
+# broadcast.py
+"""إرسال رسالة من المالك لكل أعضاء مجموعته عبر محرك متوازٍ قابل للاستئناف.
+
+كل بث له ملف وصف (<bid>.json) وسجل تقدّم إلحاقي (<bid>.progress) فيه سطر لكل مستلم
+انتهى أمره، فلو أُعيد تشغيل الخادم يكمل البث من حيث توقف بدل الإرسال من جديد.
+الملفات تُحذف بعد انتهاء البث وإرسال التقرير للمالك.
+الإرسال نفسه يمر على outbox بأولوية BULK فيلتزم بحدود تيليجرام ولا يؤخر الردود التفاعلية.
+مع عدة عمليات للسيرفر كل بث تنفّذه عملية واحدة فقط (قفل ملف <bid>.lock) حتى لا يُرسل مرتين.
+"""
+import os, json, time, secrets, asyncio, logging
+from typing import Dict, Any, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from telegram.error import Forbidden
+
+import outbox
+
+logger = logging.getLogger("telegram-bot.broadcast")
+
+DEFAULT_DIR = os.getenv("BROADCASTS_DIR", "./data/broadcasts")
+CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "16"))
+
+DELIVERED, FAILED, BLOCKED = "delivered", "failed", "blocked"
+
+_tasks: Dict[str, asyncio.Task] = {}
+
+def _meta_path(bid: str, folder: str) -> str:
+    return os.path.join(folder, f"{bid}.json")
+
+def _progress_path(bid: str, folder: str) -> str:
+    return os.path.join(folder, f"{bid}.progress")
+
+def _write_meta(meta: Dict[str, Any], folder: str) -> None:
+    path = _meta_path(meta["bid"], folder)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def _cleanup(bid: str, folder: str) -> None:
+    """يحذف ملفات البث بعد انتهائه (الوصف أولًا حتى لا يُستأنف لو انقطع الحذف)."""
+    for path in (_meta_path(bid, folder), _progress_path(bid, folder), os.path.join(folder, f"{bid}.lock")):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def _read_progress(bid: str, folder: str) -> Dict[int, str]:
+    done: Dict[int, str] = {}
+    try:
+        with open(_progress_path(bid, folder), "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break   # سطر ناقص من انقطاع سابق: يُعاد إرساله
+                uid, status = line.rstrip("\n").split("\t", 1)
+                done[int(uid)] = status
+    except FileNotFoundError:
+        pass
+    return done
+
+def create(group_id: str, owner_user_id: int, text: str, recipients: List[int],
+           folder: str = DEFAULT_DIR) -> Dict[str, Any]:
+    os.makedirs(folder, exist_ok=True)
+    meta = {
+        "bid": f"{int(time.time())}-{secrets.token_hex(3)}",
+        "group_id": group_id,
+        "owner_user_id": int(owner_user_id),
+        "text": text,
+        "recipients": [int(u) for u in recipients if int(u) != int(owner_user_id)],
+        "created_ts": int(time.time()),
+        "done": False,
+    }
+    if not meta["recipients"]:
+        meta["done"] = True   # لا أحد غير المالك: لا شيء يُحفظ أو يُستأنف
+        return meta
+    _write_meta(meta, folder)
+    return meta
+
+def summary(meta: Dict[str, Any], folder: str = DEFAULT_DIR) -> Dict[str, int]:
+    done = _read_progress(meta["bid"], folder)
+    counts = {DELIVERED: 0, FAILED: 0, BLOCKED: 0}
+    for status in done.values():
+        counts[status] = counts.get(status, 0) + 1
+    counts["pending"] = len(meta["recipients"]) - len(done)
+    return counts
+
+def _claim(bid: str, folder: str) -> Optional[int]:
+    """يحجز البث لهذه العملية؛ None = عملية أخرى تنفّذه الآن."""
+    fd = os.open(os.path.join(folder, f"{bid}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    if fcntl is not None:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return None
+    return fd
+
+async def _deliver(bot, meta: Dict[str, Any], folder: str) -> Dict[str, int]:
+    done = _read_progress(meta["bid"], folder)
+    queue: asyncio.Queue = asyncio.Queue()
+    for uid in meta["recipients"]:
+        if uid not in done:
+            queue.put_nowait(uid)
+    text = f"📣 رسالة من مالك المجموعة {meta['group_id']}:\n\n{meta['text']}"
+    with open(_progress_path(meta["bid"], folder), "a", encoding="utf-8") as log:
+        async def worker():
+            while True:
+                try:
+                    uid = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    await outbox.send(bot, uid, text, priority=outbox.BULK)
+                    status = DELIVERED
+                except Forbidden:
+                    status = BLOCKED     # المستخدم حظر البوت أو لم يبدأه
+                except Exception:
+                    status = FAILED
+                log.write(f"{uid}\t{status}\n")
+                log.flush()
+        await asyncio.gather(*(worker() for _ in range(max(1, CONCURRENCY))))
+    meta["done"] = True
+    counts = summary(meta, folder)
+    _cleanup(meta["bid"], folder)
+    return counts
+
+async def _run(bot, meta: Dict[str, Any], folder: str) -> None:
+    fd = _claim(meta["bid"], folder)
+    if fd is None:
+        _tasks.pop(meta["bid"], None)
+        return
+    try:
+        counts = await _deliver(bot, meta, folder)
+    except asyncio.CancelledError:
+        logger.info("broadcast %s paused; will resume on restart", meta["bid"])
+        raise
+    except Exception:
+        logger.exception("broadcast %s failed", meta["bid"])
+        return
+    finally:
+        _tasks.pop(meta["bid"], None)
+        os.close(fd)   # يحرر القفل
+    outbox.post(
+        bot, meta["owner_user_id"],
+        f"📣 انتهى البث للمجموعة {meta['group_id']}:\n"
+        f"✅ تم التسليم: {counts[DELIVERED]}\n"
+        f"⛔ محظور: {counts[BLOCKED]}\n"
+        f"✖️ فشل: {counts[FAILED]}",
+        priority=outbox.INTERACTIVE
+    )
+
+def start(bot, meta: Dict[str, Any], folder: str = DEFAULT_DIR) -> None:
+    if meta["bid"] not in _tasks:
+        _tasks[meta["bid"]] = asyncio.create_task(_run(bot, meta, folder))
+
+def resume_all(bot, folder: str = DEFAULT_DIR) -> int:
+    """يستأنف كل بث لم يكتمل (يُستدعى عند تشغيل الخادم)."""
+    if not os.path.isdir(folder):
+        return 0
+    n = 0
+    for name in sorted(os.listdir(folder)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        if meta.get("done"):
+            _cleanup(meta["bid"], folder)   # بث منتهٍ من نسخة كانت تُبقي ملفاته
+        else:
+            start(bot, meta, folder)
+            n += 1
+    return n
+
+def pending() -> int:
+    """عدد البثوث الجارية في هذه العملية (للاختبارات)."""
+    return len(_tasks)
+
+async def stop() -> None:
+    """يوقف البث الجاري؛ التقدّم محفوظ ويُستأنف في التشغيل التالي."""
+    tasks = list(_tasks.values())
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
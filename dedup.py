@@ -0,0 +1,123 @@
+# dedup.py
+"""تجاهل التحديثات المكررة من تيليجرام (إعادة الإرسال عند بطء الرد) حسب update_id.
+
+ذاكرة محدودة: حلقة (ring buffer) بآخر N معرّف + set للبحث السريع.
+اختياريًا تُحفظ المعرّفات في ملف إلحاقي لتبقى بعد إعادة التشغيل، ويُضغط الملف
+لآخر N سطر كلما تجاوز ضعف السعة. مع عدة عمليات (WEB_CONCURRENCY) يتشاركون الملف:
+الإلحاق والضغط تحت قفل ملف (<path>.lock)، وكل عملية تعيد فتح الملف لو ضغطته غيرها.
+"""
+import os
+from array import array
+from contextlib import contextmanager
+from typing import List, Optional, Set
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class SeenUpdates:
+    def __init__(self, capacity: int = 10000, path: Optional[str] = None):
+        self.capacity = max(1, capacity)
+        self.path = path
+        self._ring = array("q", [0] * self.capacity)
+        self._pos = 0
+        self._count = 0
+        self._set: Set[int] = set()
+        self._log = None
+        self._lock_fd: Optional[int] = None
+        self._compact_at = 0
+        if path:
+            self._restore()
+
+    def __contains__(self, update_id: int) -> bool:
+        return int(update_id) in self._set
+
+    def __len__(self) -> int:
+        return len(self._set)
+
+    def _remember(self, uid: int) -> None:
+        if self._count == self.capacity:
+            self._set.discard(self._ring[self._pos])   # أقدم معرّف يخرج
+        else:
+            self._count += 1
+        self._ring[self._pos] = uid
+        self._pos = (self._pos + 1) % self.capacity
+        self._set.add(uid)
+
+    def add(self, update_id: int) -> bool:
+        """يسجّل المعرّف؛ يرجع False لو كان مسجّلًا من قبل (تكرار)."""
+        uid = int(update_id)
+        if uid in self._set:
+            return False
+        self._remember(uid)
+        if self._log is not None:
+            self._append(uid)
+        return True
+
+    @contextmanager
+    def _locked(self):
+        """قفل ملف مشترك: مع WEB_CONCURRENCY>1 كل العمليات تكتب نفس الملف وتضغطه."""
+        if self._lock_fd is not None and fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+        else:
+            yield
+
+    def _append(self, uid: int) -> None:
+        with self._locked():
+            # عملية أخرى ضغطت الملف (os.replace): الملف المفتوح صار قديمًا، افتح الجديد
+            if os.fstat(self._log.fileno()).st_ino != os.stat(self.path).st_ino:
+                self._reopen()
+            self._log.write(f"{uid}\n")
+            self._log.flush()
+            if self._log.tell() > self._compact_at:
+                self._compact()
+
+    def _restore(self) -> None:
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        self._lock_fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        with self._locked():
+            for uid in self._read():
+                if uid not in self._set:
+                    self._remember(uid)
+            self._compact()
+
+    def _read(self) -> List[int]:
+        ids: List[int] = []
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.lstrip("-").isdigit():
+                        ids.append(int(line))
+        return ids
+
+    def _compact(self) -> None:
+        """يعيد كتابة الملف بآخر capacity معرّف فيه (من كل العمليات)؛ يُستدعى والقفل محجوز."""
+        ids = list(dict.fromkeys(reversed(self._read())))[:self.capacity]
+        ids.reverse()
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("".join(f"{uid}\n" for uid in ids))
+        os.replace(tmp, self.path)
+        self._reopen()
+
+    def _reopen(self) -> None:
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self.path, "a", encoding="utf-8")
+        self._compact_at = 2 * max(self._log.tell(), self.capacity * 8)   # ~ضعف السعة بالبايت
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
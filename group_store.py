@@ -1,9 +1,34 @@
 # group_store.py
-import os, json, secrets, string
-from typing import Dict, Any, Optional, List
+import os, json, secrets, string, threading, copy, zlib, logging, time
+from bisect import bisect_left, bisect_right, insort
+from heapq import heappush, heappop, heapify
+import json_cache
+from typing import Dict, Any, Optional, List, Tuple
 
 DEFAULT_PATH = os.getenv("GROUPS_PATH", "./data/groups.json")
 
+# وضع السجل (journal): كل تعديل يُلحق كسطر صغير في groups.json.log بدل إعادة كتابة الملف كله،
+# والضغط (compaction) يدمج السجل في لقطة جديدة بالخلفية بعد تجاوز الحجم المحدد.
+JOURNAL = os.getenv("GROUPS_JOURNAL", "0") == "1"
+JOURNAL_MAX_BYTES = int(os.getenv("GROUPS_JOURNAL_MAX_BYTES", str(4 * 1024 * 1024)))
+
+# وضع الشرائح: المجموعات موزعة على GROUPS_SHARDS ملف حسب crc32(group_id) داخل مجلد groups.d
+# مع manifest.json صغير، فالتعديل يعيد كتابة شريحة واحدة فقط. الفهارس العكسية (عضو/مالك) في
+# الذاكرة تُبنى مرة من كل الشرائح ثم تُحدَّث لكل شريحة على حدة عند إعادة تحميلها.
+# ملف groups.json القديم يُقسَّم تلقائيًا أول مرة (ويُحفظ باسم groups.json.migrated)، ووضع السجل
+# لا يُستخدم مع الشرائح لأن الكتابة أصلًا صغيرة.
+SHARDS = int(os.getenv("GROUPS_SHARDS", "0"))   # 0 = ملف واحد (الافتراضي)
+
+logger = logging.getLogger("telegram-bot.group_store")
+
+_lock = json_cache.lock   # نفس قفل الكاش حتى لا يتداخل التعديل مع خيط الحفظ الخلفي
+_replayed: Dict[str, Dict[str, int]] = {}   # path -> {"gen", "offset"}
+_indexes: Dict[str, Dict[str, Any]] = {}    # path -> فهارس عكسية مبنية على نفس كائن البيانات
+_compacting: set = set()
+_manifests: Dict[str, int] = {}             # path -> عدد الشرائح (0 = ملف واحد)
+_stamps: Dict[str, Any] = {}                # path -> آخر توقيع لملف stamp (STORE_MULTIPROCESS)
+_timestamped: set = set()                   # مسارات رُحّلت طلباتها القديمة (بلا pending_at) مرة
+
 def _ensure_path(path: str) -> None:
     folder = os.path.dirname(path)
     if folder and not os.path.exists(folder):
@@ -12,120 +37,565 @@ def _ensure_path(path: str) -> None:
         with open(path, "w", encoding="utf-8") as f:
             json.dump({"groups": {}}, f, ensure_ascii=False)
 
+def _log_path(path: str) -> str:
+    return path + ".log"
+
+# ===== الشرائح =====
+
+def _shard_dir(path: str) -> str:
+    return os.path.splitext(path)[0] + ".d"
+
+def _shard_path(path: str, i: int) -> str:
+    return os.path.join(_shard_dir(path), f"shard-{i:03d}.json")
+
+def _stamp_path(path: str) -> str:
+    return os.path.join(_shard_dir(path), "stamp")
+
+def _bump_stamp(path: str) -> None:
+    """مع عدة عمليات: يعلن أن شريحة ما تغيّرت حتى تعيد العمليات الأخرى فحص شرائحها."""
+    sp = _stamp_path(path)
+    with open(sp, "a", encoding="utf-8") as f:
+        f.write(".")
+        if f.tell() > 4096:
+            f.truncate(0)
+    _stamps[path] = json_cache.signature(sp)
+
+def _sync_shards(path: str, n: int) -> None:
+    """فحص رخيص (stat لملف واحد): لو عملية أخرى عدّلت أي شريحة تُراجع كل الشرائح."""
+    sig = json_cache.signature(_stamp_path(path))
+    if _stamps.get(path) != sig:
+        for i in range(n):
+            _load_shard(path, i)
+        _stamps[path] = sig
+
+def _shard_of(gid: str, n: int) -> int:
+    return zlib.crc32(gid.encode("utf-8")) % n
+
+def _shard_count(path: str) -> int:
+    """عدد الشرائح حسب manifest (وليس الإعداد) حتى لا يتغير توزيع المجموعات بين التشغيلات."""
+    n = _manifests.get(path)
+    if n is not None:
+        return n
+    with json_cache.transaction(path):   # عمليات متعددة قد تبدأ معًا: واحدة فقط تقسّم الملف
+        if path in _manifests:
+            return _manifests[path]
+        manifest = os.path.join(_shard_dir(path), "manifest.json")
+        n = 0
+        if os.path.exists(manifest):
+            with open(manifest, "r", encoding="utf-8") as f:
+                n = int(json.load(f)["shards"])
+            if SHARDS and n != SHARDS:
+                logger.warning("%s has %d shards; ignoring GROUPS_SHARDS=%d", _shard_dir(path), n, SHARDS)
+        elif SHARDS > 0:
+            n = _split(path, SHARDS)
+        _manifests[path] = n
+        return n
+
+def _split(path: str, n: int) -> int:
+    """يقسّم groups.json الحالي (إن وُجد) على n شريحة ثم يكتب manifest كآخر خطوة."""
+    folder = _shard_dir(path)
+    os.makedirs(folder, exist_ok=True)
+    groups = _load(path)["groups"] if os.path.exists(path) else {}   # مع إعادة تشغيل السجل إن وُجد
+    buckets: List[Dict[str, Any]] = [{} for _ in range(n)]
+    for gid, g in groups.items():
+        buckets[_shard_of(gid, n)][gid] = g
+    for i, b in enumerate(buckets):
+        json_cache.dump({"groups": b}, _shard_path(path, i))
+    json_cache.dump({"shards": n, "hash": "crc32"}, os.path.join(folder, "manifest.json"))
+    json_cache.invalidate(path)
+    _indexes.pop(path, None)
+    _replayed.pop(path, None)
+    for old in (path, _log_path(path), _log_path(path) + ".old"):
+        if os.path.exists(old):
+            os.replace(old, old + ".migrated")
+    return n
+
+def _shard_index(path: str) -> Dict[str, Any]:
+    """فهارس كل الشرائح معًا؛ تُبنى أول مرة بتحميل كل الشرائح."""
+    ix = _indexes.get(path)
+    if ix is None:
+        ix = _indexes[path] = {"by_user": {}, "by_owner": {}, "members": {}, "pending": {},
+                               "groups": {}, "shards": {}, "sorted": {}, "expiry": [], "stale": 0}
+        for i in range(_shard_count(path)):
+            _load_shard(path, i)
+    return ix
+
+def _unindex(ix: Dict[str, Any], d: Dict[str, Any]) -> None:
+    for gid, g in d["groups"].items():
+        if ix["by_owner"].get(g["owner_user_id"]) == gid:
+            del ix["by_owner"][g["owner_user_id"]]
+        for uid in ix["members"].pop(gid, ()):
+            gids = ix["by_user"].get(uid)
+            if gids is not None:
+                gids.pop(gid, None)
+                if not gids:
+                    del ix["by_user"][uid]
+        ix["stale"] += len(ix["pending"].pop(gid, ()))   # مدخلاتها في كومة الانتهاء صارت قديمة
+        ix["groups"].pop(gid, None)
+        ix["sorted"].pop(gid, None)
+
+def _load_shard(path: str, i: int) -> Dict[str, Any]:
+    """يرجع بيانات الشريحة i، ولو أُعيد تحميلها من القرص يستبدل مساهمتها في الفهارس فقط."""
+    sp = _shard_path(path, i)
+    with _lock:
+        d = json_cache.load(sp)
+        d.setdefault("groups", {})
+        ix = _indexes.get(path) or _shard_index(path)
+        old = ix["shards"].get(i)
+        if old is not d:
+            if old is not None:
+                _unindex(ix, old)
+            for gid, g in d["groups"].items():
+                _apply_index(ix, gid, g)
+            ix["shards"][i] = d
+            _trim_expiry(ix)
+        return d
+
+def _apply_index(ix: Dict[str, Any], gid: str, g: Dict[str, Any]) -> None:
+    ix["sorted"].pop(gid, None)
+    ix["by_owner"][g["owner_user_id"]] = gid
+    ix["members"][gid] = set(g.get("members", []))
+    ix["pending"][gid] = set(g.get("pending", []))
+    if "groups" in ix:
+        ix["groups"][gid] = g
+    for uid in g.get("members", []):
+        ix["by_user"].setdefault(uid, {})[gid] = None   # dict كـ set مرتّب حسب الانضمام
+    at = g.get("pending_at") or {}   # طلبات أقدم من الحقل تُؤرَّخ مرة في expire_pending
+    for uid in g.get("pending", []):
+        ts = at.get(str(uid))
+        if ts is not None:
+            heappush(ix["expiry"], (ts, gid, uid))
+
+def _trim_expiry(ix: Dict[str, Any]) -> None:
+    """يعيد بناء كومة الانتهاء لما تصير أغلب مدخلاتها قديمة (إعادة تحميل شرائح، قبول/رفض)."""
+    heap = ix["expiry"]
+    if ix["stale"] * 2 <= len(heap):
+        return
+    groups = ix["groups"] if "groups" in ix else ix["data"]["groups"]
+    heap[:] = {(ts, gid, uid) for ts, gid, uid in heap
+               if uid in ix["pending"].get(gid, ())
+               and (groups[gid].get("pending_at") or {}).get(str(uid)) == ts}   # set: بلا تكرار
+    heapify(heap)
+    ix["stale"] = 0
+
+def _open(path: str, gid: str):
+    """(البيانات، الفهارس، الملف) الذي يحوي gid: الملف الواحد أو شريحته."""
+    n = _shard_count(path)
+    if not n:
+        d = _load(path)
+        return d, _index(d, path), path
+    i = _shard_of(gid, n)
+    d = _load_shard(path, i)
+    return d, _indexes[path], _shard_path(path, i)
+
+def _lookup(path: str, gids) -> List[Dict[str, Any]]:
+    """المجموعات بالترتيب من الفهرس؛ في وضع الشرائح تُحمَّل شرائحها هي فقط."""
+    n = _shard_count(path)
+    if not n:
+        d = _load(path)
+        return [d["groups"][gid] for gid in gids]
+    ix = _shard_index(path)
+    if json_cache.MULTIPROCESS:
+        _sync_shards(path, n)
+    for i in {_shard_of(gid, n) for gid in gids}:
+        _load_shard(path, i)   # تحقق من تغيّر الشريحة على القرص
+    return [ix["groups"][gid] for gid in gids if gid in ix["groups"]]
+
+def all_groups(path: str = DEFAULT_PATH) -> Dict[str, Dict[str, Any]]:
+    """كل المجموعات {group_id: group} أيًا كان التخزين (للتصدير/الترحيل)."""
+    n = _shard_count(path)
+    if not n:
+        return dict(_load(path)["groups"]) if os.path.exists(path) else {}
+    out: Dict[str, Dict[str, Any]] = {}
+    for i in range(n):
+        out.update(_load_shard(path, i)["groups"])
+    return out
+
+def _index(d: Dict[str, Any], path: str) -> Dict[str, Any]:
+    """الفهارس العكسية (عضو -> مجموعاته، مالك -> مجموعته) + الأعضاء/المعلّقين كـ set.
+
+    تُبنى مرة عند كل تحميل جديد للملف ويحدّثها _apply مع كل تعديل.
+    """
+    ix = _indexes.get(path)
+    if ix is not None and ix["data"] is d:
+        return ix
+    ix = {"data": d, "by_user": {}, "by_owner": {}, "members": {}, "pending": {}, "sorted": {}, "expiry": [], "stale": 0}
+    for gid, g in d["groups"].items():
+        _apply_index(ix, gid, g)
+    _indexes[path] = ix
+    return ix
+
+def _replay(d: Dict[str, Any], ix: Dict[str, Any], log: str, offset: int = 0) -> int:
+    """يطبّق سجلات الملف ابتداءً من offset ويرجع الموضع الجديد."""
+    try:
+        f = open(log, "rb")
+    except FileNotFoundError:
+        return offset
+    with f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break   # سطر ناقص (انقطاع أثناء الكتابة)
+            offset += len(line)
+            try: op = json.loads(line)
+            except json.JSONDecodeError: continue
+            _apply(d, ix, op)
+    return offset
+
 def _load(path: str = DEFAULT_PATH) -> Dict[str, Any]:
     _ensure_path(path)
-    with open(path, "r", encoding="utf-8") as f:
-        try: d = json.load(f)
-        except json.JSONDecodeError: d = {}
-    d.setdefault("groups", {})
-    return d
+    with _lock:
+        d = json_cache.load(path)
+        d.setdefault("groups", {})
+        ix = _index(d, path)
+        if JOURNAL:
+            gen = json_cache.generation(path)
+            st = _replayed.get(path)
+            if st is None or st["gen"] != gen:
+                # لقطة جديدة من القرص: أعد تشغيل السجل المدوَّر (إن وُجد) ثم السجل الحالي
+                _replay(d, ix, _log_path(path) + ".old")
+                st = _replayed[path] = {"gen": gen, "offset": 0}
+            st["offset"] = _replay(d, ix, _log_path(path), st["offset"])
+        return d
 
 def _save(d: Dict[str, Any], path: str = DEFAULT_PATH) -> None:
     _ensure_path(path)
-    tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(d, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, path)
+    json_cache.save(d, path)
 
 def _gen_numeric_id(length: int = 6) -> str:
     digits = string.digits
     return "".join(secrets.choice(digits) for _ in range(length))
 
+def _apply(d: Dict[str, Any], ix: Dict[str, Any], op: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """التعديل الوحيد على البيانات والفهارس؛ يُستخدم للتنفيذ المباشر ولإعادة تشغيل السجل (idempotent)."""
+    kind = op["op"]
+    if kind == "create":
+        g = d["groups"][op["g"]["group_id"]] = copy.deepcopy(op["g"])
+        _apply_index(ix, g["group_id"], g)
+        return g
+    gid = op["gid"]
+    g = d["groups"].get(gid)
+    if not g:
+        return None
+    if kind == "stamp":   # تأريخ طلبات قديمة بلا pending_at (ترحيل لمرة واحدة)
+        at = g.setdefault("pending_at", {})
+        for uid in op["uids"]:
+            if uid in ix["pending"][gid] and str(uid) not in at:
+                at[str(uid)] = op["ts"]
+                heappush(ix["expiry"], (op["ts"], gid, uid))
+        return g
+    if kind.endswith("_many"):   # تعديل جماعي = سطر سجل واحد وحفظ واحد
+        for uid in op["uids"]:
+            _apply(d, ix, {"op": kind[:-5], "gid": gid, "uid": uid})
+        return g
+    uid = op["uid"]
+    members, pending = ix["members"][gid], ix["pending"][gid]
+
+    def _unpend():
+        if uid in pending:
+            pending.discard(uid); g["pending"].remove(uid)
+            g.get("pending_at", {}).pop(str(uid), None)
+            ix["stale"] += 1
+
+    if kind == "request":
+        if uid not in members and uid not in pending:
+            pending.add(uid); g["pending"].append(uid)
+            ts = op.get("ts") or time.time()
+            g.setdefault("pending_at", {})[str(uid)] = ts
+            heappush(ix["expiry"], (ts, gid, uid))
+    elif kind == "approve" or kind == "add":
+        _unpend()
+        if uid not in members:
+            members.add(uid); g["members"].append(uid)
+            ix["by_user"].setdefault(uid, {})[gid] = None
+            if gid in ix["sorted"]: insort(ix["sorted"][gid], uid)
+    elif kind == "deny":
+        _unpend()
+    elif kind == "remove":
+        if uid in members and uid != g["owner_user_id"]:
+            members.discard(uid); g["members"].remove(uid)
+            ix["by_user"].get(uid, {}).pop(gid, None)
+            if gid in ix["sorted"]: ix["sorted"][gid].remove(uid)
+        _unpend()
+    return g
+
+def _commit(d: Dict[str, Any], ix: Dict[str, Any], op: Dict[str, Any], path: str,
+            file: str) -> Dict[str, Any]:
+    """يطبّق التعديل ثم يحفظه: سطر في السجل (وضع journal) أو إعادة كتابة الملف/الشريحة."""
+    with _lock:
+        g = _apply(d, ix, op)
+        if not JOURNAL or file != path:
+            _save(d, file)
+            if file != path and json_cache.MULTIPROCESS:
+                _bump_stamp(path)
+            return g
+        line = (json.dumps(op, ensure_ascii=False) + "\n").encode("utf-8")
+        with open(_log_path(path), "ab") as f:
+            f.write(line)
+        st = _replayed[path]
+        st["offset"] += len(line)
+        if st["offset"] >= JOURNAL_MAX_BYTES and path not in _compacting:
+            _compacting.add(path)
+            threading.Thread(target=compact, args=(path,), daemon=True).start()
+        return g
+
+def compact(path: str = DEFAULT_PATH) -> None:
+    """يدمج السجل في لقطة جديدة: تدوير السجل تحت القفل ثم كتابة اللقطة خارج القفل."""
+    if json_cache.MULTIPROCESS:
+        # مع عدة عمليات: التدوير واللقطة معًا تحت قفل الملف، وإلا قد تقرأ عملية أخرى سجلًا بلا لقطته
+        with json_cache.transaction(path):
+            return _compact(path)
+    return _compact(path)
+
+def _compact(path: str) -> None:
+    log = _log_path(path)
+    old = log + ".old"
+    try:
+        with _lock:
+            if not JOURNAL or _shard_count(path):
+                return
+            d = _load(path)
+            snapshot = copy.deepcopy(d)
+            if os.path.exists(old):
+                # ضغط سابق لم يكتمل: ضُم السجل الحالي إلى المدوَّر بدل الكتابة فوقه
+                with open(log, "rb") as src, open(old, "ab") as dst:
+                    dst.write(src.read())
+                os.remove(log)
+            elif os.path.exists(log):
+                os.replace(log, old)
+            _replayed[path]["offset"] = 0
+        json_cache.dump(snapshot, path)
+        with _lock:
+            if os.path.exists(old):
+                os.remove(old)
+    finally:
+        _compacting.discard(path)
+
+def _all_index(path: str) -> Dict[str, Any]:
+    n = _shard_count(path)
+    if n:
+        ix = _shard_index(path)
+        if json_cache.MULTIPROCESS:
+            _sync_shards(path, n)
+        return ix
+    return _index(_load(path), path)
+
 def create_group(name: str, owner_user_id: int, path: str = DEFAULT_PATH) -> Dict[str, Any]:
-    d = _load(path)
+    with json_cache.transaction(path):   # قفل بين العمليات يشمل فحص المالك والكتابة
+        return _create_group(name, owner_user_id, path)
+
+def _create_group(name: str, owner_user_id: int, path: str) -> Dict[str, Any]:
+    ix = _all_index(path)
     # كل شخص يملك مجموعة واحدة فقط
-    for g in d["groups"].values():
-        if g["owner_user_id"] == int(owner_user_id):
-            raise ValueError("ALREADY_OWNER")
+    if int(owner_user_id) in ix["by_owner"]:
+        raise ValueError("ALREADY_OWNER")
     while True:
         gid = _gen_numeric_id(6)  # أرقام فقط
-        if gid not in d["groups"]:
+        if gid not in ix["members"]:
             break
-    d["groups"][gid] = {
+    d, ix, file = _open(path, gid)
+    return _commit(d, ix, {"op": "create", "g": {
         "group_id": gid,
         "name": name.strip(),
         "owner_user_id": int(owner_user_id),
         "members": [int(owner_user_id)],
         "pending": []
-    }
-    _save(d, path)
-    return d["groups"][gid]
+    }}, path, file)
 
 def get_group(group_id: str, path: str = DEFAULT_PATH) -> Optional[Dict[str, Any]]:
-    return _load(path)["groups"].get(group_id.strip())
+    gid = group_id.strip()
+    return _open(path, gid)[0]["groups"].get(gid)
 
 def is_owner(group_id: str, user_id: int, path: str = DEFAULT_PATH) -> bool:
     g = get_group(group_id, path)
     return bool(g and g["owner_user_id"] == int(user_id))
 
-def request_join(group_id: str, user_id: int, path: str = DEFAULT_PATH) -> Dict[str, Any]:
-    d = _load(path)
+def is_member(group_id: str, user_id: int, path: str = DEFAULT_PATH) -> bool:
+    return group_id.strip() in _all_index(path)["by_user"].get(int(user_id), {})
+
+def _existing(d: Dict[str, Any], group_id: str) -> str:
     gid = group_id.strip()
-    g = d["groups"].get(gid)
-    if not g: raise ValueError("GROUP_NOT_FOUND")
-    uid = int(user_id)
-    if uid in g["members"]: raise ValueError("ALREADY_MEMBER")
-    if uid not in g["pending"]: g["pending"].append(uid)
-    _save(d, path)
-    return g
+    if gid not in d["groups"]: raise ValueError("GROUP_NOT_FOUND")
+    return gid
+
+def _change(kind: str, group_id: str, user_id: int, path: str) -> Dict[str, Any]:
+    with json_cache.transaction(path):
+        d, ix, file = _open(path, group_id.strip())
+        return _commit(d, ix, {"op": kind, "gid": _existing(d, group_id), "uid": int(user_id)}, path, file)
+
+def request_join(group_id: str, user_id: int, path: str = DEFAULT_PATH) -> Dict[str, Any]:
+    with json_cache.transaction(path):
+        d, ix, file = _open(path, group_id.strip())
+        gid = _existing(d, group_id)
+        uid = int(user_id)
+        if uid in ix["members"][gid]: raise ValueError("ALREADY_MEMBER")
+        return _commit(d, ix, {"op": "request", "gid": gid, "uid": uid, "ts": int(time.time())}, path, file)
 
 def approve_join(group_id: str, user_id: int, path: str = DEFAULT_PATH) -> Dict[str, Any]:
-    d = _load(path)
-    gid = group_id.strip()
-    g = d["groups"].get(gid)
-    if not g: raise ValueError("GROUP_NOT_FOUND")
-    uid = int(user_id)
-    if uid in g["pending"]: g["pending"].remove(uid)
-    if uid not in g["members"]: g["members"].append(uid)
-    _save(d, path)
-    return g
+    return _change("approve", group_id, user_id, path)
 
 def deny_join(group_id: str, user_id: int, path: str = DEFAULT_PATH) -> Dict[str, Any]:
-    d = _load(path)
-    gid = group_id.strip()
-    g = d["groups"].get(gid)
-    if not g: raise ValueError("GROUP_NOT_FOUND")
-    uid = int(user_id)
-    if uid in g["pending"]: g["pending"].remove(uid)
-    _save(d, path)
-    return g
+    return _change("deny", group_id, user_id, path)
 
 def add_member(group_id: str, user_id: int, path: str = DEFAULT_PATH) -> Dict[str, Any]:
-    d = _load(path)
-    gid = group_id.strip()
-    g = d["groups"].get(gid)
-    if not g: raise ValueError("GROUP_NOT_FOUND")
-    uid = int(user_id)
-    if uid not in g["members"]: g["members"].append(uid)
-    if uid in g["pending"]: g["pending"].remove(uid)
-    _save(d, path)
-    return g
+    return _change("add", group_id, user_id, path)
 
 def remove_member(group_id: str, user_id: int, path: str = DEFAULT_PATH) -> Dict[str, Any]:
-    d = _load(path)
-    gid = group_id.strip()
-    g = d["groups"].get(gid)
-    if not g: raise ValueError("GROUP_NOT_FOUND")
-    uid = int(user_id)
-    if uid in g["members"] and uid != g["owner_user_id"]:
-        g["members"].remove(uid)
-    if uid in g["pending"]:
-        g["pending"].remove(uid)
-    _save(d, path)
-    return g
+    return _change("remove", group_id, user_id, path)
+
+def _bulk(kind: str, group_id: str, user_ids: List[int], path: str) -> Dict[str, List[int]]:
+    with json_cache.transaction(path):
+        d, ix, file = _open(path, group_id.strip())
+        gid = _existing(d, group_id)
+        members, owner = ix["members"][gid], d["groups"][gid]["owner_user_id"]
+        uids = list(dict.fromkeys(int(u) for u in user_ids))
+        if kind == "add":
+            done = [u for u in uids if u not in members]
+        else:
+            done = [u for u in uids if u in members and u != owner]
+        if done:
+            _commit(d, ix, {"op": kind + "_many", "gid": gid, "uids": done}, path, file)
+        picked = set(done)
+        return {"done": done, "skipped": [u for u in uids if u not in picked]}
+
+def add_members(group_id: str, user_ids: List[int], path: str = DEFAULT_PATH) -> Dict[str, List[int]]:
+    """يضيف عدة مستخدمين بتعديل واحد وحفظ واحد.
+
+    يرجع {"done": من أُضيفوا، "skipped": من كانوا أعضاء أصلًا}.
+    """
+    return _bulk("add", group_id, user_ids, path)
+
+def remove_members(group_id: str, user_ids: List[int], path: str = DEFAULT_PATH) -> Dict[str, List[int]]:
+    """يزيل عدة أعضاء بتعديل واحد وحفظ واحد (المالك لا يُزال).
+
+    يرجع {"done": من أُزيلوا، "skipped": من لم يكونوا أعضاء أو المالك}.
+    """
+    return _bulk("remove", group_id, user_ids, path)
+
+# ===== طابور الطلبات المعلّقة =====
+
+def pending_queue(group_id: str, limit: int = 10, offset: int = 0,
+                  path: str = DEFAULT_PATH) -> Optional[Dict[str, Any]]:
+    """الطلبات من الأقدم (بدءًا من offset): {"total", "items": [(user_id, وقت الطلب)]}، أو None لو المجموعة غير موجودة."""
+    g = get_group(group_id, path)
+    if not g:
+        return None
+    at = g.get("pending_at", {})
+    return {"total": len(g["pending"]),
+            "items": [(uid, at.get(str(uid))) for uid in g["pending"][offset:offset + limit]]}
+
+def _take_pending(kind: str, group_id: str, count: Optional[int], before: Optional[float],
+                  path: str) -> List[int]:
+    with json_cache.transaction(path):
+        d, ix, file = _open(path, group_id.strip())
+        gid = _existing(d, group_id)
+        g = d["groups"][gid]
+        uids = g["pending"]   # القائمة بترتيب الطلب: الأقدم أولًا
+        if before is not None:
+            at = g.get("pending_at") or {}
+            uids = [u for u in uids if (at.get(str(u)) or 0) <= before]
+        uids = list(uids[:count] if count else uids)
+        if uids:
+            _commit(d, ix, {"op": kind + "_many", "gid": gid, "uids": uids}, path, file)
+        return uids
+
+def approve_pending(group_id: str, count: Optional[int] = None, before: Optional[float] = None,
+                    path: str = DEFAULT_PATH) -> List[int]:
+    """يقبل أقدم count طلبات (أو كلها) بتعديل واحد؛ يرجع من قُبلوا.
+
+    before (اختياري): الطلبات المرسلة حتى هذا الوقت فقط، أي ما كان ظاهرًا للمالك لا ما وصل بعده.
+    """
+    return _take_pending("approve", group_id, count, before, path)
+
+def deny_pending(group_id: str, count: Optional[int] = None, before: Optional[float] = None,
+                 path: str = DEFAULT_PATH) -> List[int]:
+    """يرفض أقدم count طلبات (أو كلها) بتعديل واحد؛ يرجع من رُفضوا (before كما في approve_pending)."""
+    return _take_pending("deny", group_id, count, before, path)
+
+def expire_pending(ttl: float, now: Optional[float] = None, path: str = DEFAULT_PATH) -> List[Tuple[str, int]]:
+    """يرفض الطلبات الأقدم من ttl ثانية ويرجع [(group_id, user_id)].
+
+    يقرأ من كومة مرتبة بوقت الطلب (ix["expiry"]) فيلمس الطلبات المنتهية فقط لا كل المجموعات.
+    مدخلات الكومة لطلبات قُبلت/رُفضت أو أُعيد إرسالها تُهمل عند خروجها.
+    """
+    now = time.time() if now is None else now
+    cutoff = now - ttl
+    due: Dict[str, List[int]] = {}
+    with json_cache.transaction(path):
+        if path not in _timestamped:
+            _timestamp_legacy(path, int(now))
+        ix = _all_index(path)
+        _trim_expiry(ix)
+        heap = ix["expiry"]
+        while heap and heap[0][0] <= cutoff:
+            ts, gid, uid = heappop(heap)
+            found = _lookup(path, [gid])
+            if found and found[0].get("pending_at", {}).get(str(uid)) == ts and uid not in due.get(gid, ()):
+                due.setdefault(gid, []).append(uid)
+        for gid, uids in due.items():
+            d, ix, file = _open(path, gid)
+            _commit(d, ix, {"op": "deny_many", "gid": gid, "uids": uids}, path, file)
+    return [(gid, uid) for gid, uids in due.items() for uid in uids]
+
+def _timestamp_legacy(path: str, now: int) -> None:
+    """طلبات محفوظة قبل حقل pending_at تأخذ وقت أول فحص (تُكتب مرة فتبدأ مهلتها من الآن)."""
+    for gid, g in all_groups(path).items():
+        at = g.get("pending_at") or {}
+        missing = [uid for uid in g.get("pending", []) if str(uid) not in at]
+        if missing:
+            d, ix, file = _open(path, gid)
+            _commit(d, ix, {"op": "stamp", "gid": gid, "uids": missing, "ts": now}, path, file)
+    _timestamped.add(path)
 
 def my_groups(user_id: int, path: str = DEFAULT_PATH) -> List[Dict[str, Any]]:
-    d = _load(path)
-    uid = int(user_id)
-    return [g for g in d["groups"].values() if uid in g.get("members", [])]
+    gids = list(_all_index(path)["by_user"].get(int(user_id), {}))
+    return _lookup(path, gids)
 
 def owner_group(user_id: int, path: str = DEFAULT_PATH) -> Optional[Dict[str, Any]]:
-    d = _load(path)
-    for g in d["groups"].values():
-        if g["owner_user_id"] == int(user_id):
-            return g
-    return None
+    gid = _all_index(path)["by_owner"].get(int(user_id))
+    found = _lookup(path, [gid]) if gid else []
+    return found[0] if found else None
 
 def list_members(group_id: str, path: str = DEFAULT_PATH) -> List[int]:
     g = get_group(group_id, path)
-    return list(g.get("members", [])) if g else []
\ No newline at end of file
+    return list(g.get("members", [])) if g else []
+
+def members_page(group_id: str, limit: int = 20, after: Optional[int] = None, before: Optional[int] = None,
+                 path: str = DEFAULT_PATH) -> Optional[Dict[str, Any]]:
+    """صفحة أعضاء مرتبة بالـ user_id بمؤشر ثابت (آخر/أول ID في الصفحة) بدل رقم صفحة.
+
+    يرجع {"group_id", "name", "owner_user_id", "members", "total", "prev", "next"} حيث prev/next
+    مؤشرات للصفحة السابقة/التالية أو None، أو None لو المجموعة غير موجودة. الإضافة/الحذف بين الصفحات لا يكرر ولا يُسقط أحدًا.
+    """
+    gid = group_id.strip()
+    with _lock:
+        d, ix, _ = _open(path, gid)
+        if gid not in d["groups"]:
+            return None
+        s = ix["sorted"].get(gid)
+        if s is None:   # تُبنى عند أول طلب وتُحدَّث مع كل إضافة/إزالة
+            s = ix["sorted"][gid] = sorted(ix["members"][gid])
+        if before is not None:
+            j = bisect_left(s, int(before))
+            i = max(0, j - limit)
+            if i == 0:
+                j = min(len(s), limit)
+        else:
+            i = bisect_right(s, int(after)) if after is not None else 0
+            if i >= len(s):   # حُذف ما بعد المؤشر: اعرض آخر صفحة
+                i = max(0, len(s) - limit)
+            j = min(len(s), i + limit)
+        page = s[i:j]
+        g = d["groups"][gid]
+        return {"group_id": gid, "name": g["name"], "owner_user_id": g["owner_user_id"],
+                "members": page, "total": len(s),
+                "prev": page[0] if page and i > 0 else None,
+                "next": page[-1] if page and j < len(s) else None}
+
+# ===== باك-إند SQLite (STORE_BACKEND=sqlite) =====
+if os.getenv("STORE_BACKEND", "json").lower() == "sqlite":
+    from sqlite_store import (  # noqa: F811
+        create_group, get_group, is_owner, is_member, request_join, approve_join, deny_join,
+        add_member, remove_member, add_members, remove_members, my_groups, owner_group, list_members,
+        members_page, pending_queue, approve_pending, deny_pending, expire_pending
+    )
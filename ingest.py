@@ -0,0 +1,84 @@
+# ingest.py
+"""طابور محدود لتحديثات الـ Webhook مقسّم إلى شرائح (shards) حسب المحادثة.
+
+كل شريحة لها عامل واحد يعالج تحديثاتها بالترتيب، فرسائل نفس المستخدم/المحادثة لا تتسابق
+على حالة الويزارد، بينما المحادثات المختلفة تُعالج بالتوازي على باقي الشرائح.
+لو شريحة التحديث ممتلئة يرجع offer() بـ False ويرد السيرفر 429 فيعيد تيليجرام الإرسال لاحقًا،
+وعند الإغلاق تُنهى التحديثات الموجودة بالطابور بدل إسقاطها.
+"""
+import asyncio, logging
+from typing import Any, Awaitable, Callable, List, Hashable
+
+logger = logging.getLogger("telegram-bot.ingest")
+
+def chat_key(update: Any) -> Hashable:
+    """مفتاح الترتيب: المحادثة ثم المستخدم ثم update_id (تحديث بلا محادثة لا يحتاج ترتيبًا)."""
+    chat = getattr(update, "effective_chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(update, "effective_user", None)
+    if user is not None:
+        return user.id
+    return getattr(update, "update_id", 0)
+
+class UpdateQueue:
+    def __init__(self, process: Callable[[Any], Awaitable[Any]], maxsize: int = 1000, workers: int = 8,
+                 key: Callable[[Any], Hashable] = chat_key):
+        self._process = process
+        self._maxsize = maxsize
+        self._shards_n = max(1, workers)
+        self._key = key
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        self._accepting = False
+
+    @property
+    def depth(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    @property
+    def capacity(self) -> int:
+        return self._maxsize
+
+    async def start(self) -> None:
+        per_shard = max(1, -(-self._maxsize // self._shards_n))
+        self._queues = [asyncio.Queue(maxsize=per_shard) for _ in range(self._shards_n)]
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self._shards_n)]
+        self._accepting = True
+
+    def _shard(self, update: Any) -> asyncio.Queue:
+        return self._queues[hash(self._key(update)) % self._shards_n]
+
+    def offer(self, update: Any) -> bool:
+        """يضيف التحديث لشريحته بدون انتظار؛ False = ممتلئة أو قيد الإغلاق (ضغط عكسي)."""
+        if not self._accepting or not self._queues:
+            return False
+        try:
+            self._shard(update).put_nowait(update)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def _worker(self, n: int) -> None:
+        queue = self._queues[n]
+        while True:
+            update = await queue.get()
+            try:
+                await self._process(update)
+            except Exception:
+                logger.exception("shard %d failed to process update", n)
+            finally:
+                queue.task_done()
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """يوقف الاستقبال وينتظر تفريغ الشرائح (حتى timeout) ثم يوقف العمّال."""
+        self._accepting = False
+        if self._queues:
+            try:
+                await asyncio.wait_for(asyncio.gather(*(q.join() for q in self._queues)), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("ingest drain timed out with %d updates left", self.depth)
+        for t in self._workers:
+            t.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
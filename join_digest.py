@@ -0,0 +1,115 @@
+# join_digest.py
+"""إشعار مجمّع لطلبات الانضمام: رسالة واحدة لكل مجموعة تُعدَّل مكانها بدل رسالة لكل طلب.
+
+- الطلبات التي تصل خلال JOIN_DIGEST_SECONDS تُجمع في تحديث واحد (debounce).
+- نفس الرسالة تُعدَّل بـ editMessageText ما دامت أحدث من JOIN_DIGEST_REUSE_SECONDS؛ بعدها
+  تُرسل رسالة جديدة لأن التعديل لا يصل كتنبيه للمالك.
+- الرسالة صفحات من الطلبات (الأقدم أولًا) بأزرار قبول/رفض لكل طلب + قبول/رفض الكل.
+- الحالة في ذاكرة العملية: مع عدة عمليات قد تكون لكل عملية رسالتها الخاصة.
+- اختياري: JOIN_DIGEST=1 لتفعيله، وإلا تبقى رسالة لكل طلب كما كان.
+
+    join_digest.notify(context.bot, g)   # بعد request_join
+"""
+import os, time, asyncio, logging
+from typing import Any, Dict, Optional
+
+from telegram import InlineKeyboardMarkup, InlineKeyboardButton
+from telegram.error import BadRequest
+
+import outbox
+from account_store import get_displays
+from group_store import pending_queue
+from pending_view import age, decide_all_row
+
+logger = logging.getLogger("telegram-bot.join_digest")
+
+ENABLED = os.getenv("JOIN_DIGEST", "0") == "1"
+WINDOW = float(os.getenv("JOIN_DIGEST_SECONDS", "3"))
+REUSE = float(os.getenv("JOIN_DIGEST_REUSE_SECONDS", "600"))
+PAGE_SIZE = int(os.getenv("JOIN_DIGEST_PAGE_SIZE", "5"))
+
+# group_id -> {"owner", "name", "bot", "message_id", "sent_at", "new", "task", "busy"}
+_digests: Dict[str, Dict[str, Any]] = {}
+
+def view(gid: str, name: str, page: int = 0, new: int = 0):
+    """(نص، أزرار) لصفحة page من الطلبات المعلّقة؛ الأزرار None لو لا يوجد طلبات."""
+    q = pending_queue(gid, PAGE_SIZE, offset=page * PAGE_SIZE)
+    if q and q["total"] and not q["items"] and page:   # الصفحة فرغت بعد قرارات: ارجع لآخر صفحة
+        page = (q["total"] - 1) // PAGE_SIZE
+        q = pending_queue(gid, PAGE_SIZE, offset=page * PAGE_SIZE)
+    if not q or not q["total"]:
+        return f"📨 {name} ({gid}): لا توجد طلبات معلّقة.", None
+    names = get_displays([uid for uid, _ in q["items"]])
+    head = f"📨 طلبات انضمام إلى {name} ({gid}): {q['total']} معلّق" + (f" (+{new} جديد)" if new else "")
+    lines = [f"{page * PAGE_SIZE + i + 1}. {names[uid]} (ID: {uid}){age(ts)}" for i, (uid, ts) in enumerate(q["items"])]
+    rows = [[InlineKeyboardButton(f"✅ {names[uid]}"[:40], callback_data=f"JD:{gid}:a:{uid}:{page}"),
+             InlineKeyboardButton("✖️", callback_data=f"JD:{gid}:d:{uid}:{page}")] for uid, _ in q["items"]]
+    pages = (q["total"] + PAGE_SIZE - 1) // PAGE_SIZE
+    if pages > 1:
+        nav = []
+        if page > 0:
+            nav.append(InlineKeyboardButton("◀️", callback_data=f"JD:{gid}:p:{page - 1}"))
+        nav.append(InlineKeyboardButton(f"{page + 1}/{pages}", callback_data=f"JD:{gid}:p:{page}"))
+        if page + 1 < pages:
+            nav.append(InlineKeyboardButton("▶️", callback_data=f"JD:{gid}:p:{page + 1}"))
+        rows.append(nav)
+    rows.append(decide_all_row(gid, q["total"]))
+    return head + "\n" + "\n".join(lines), InlineKeyboardMarkup(rows)
+
+def notify(bot, g: Dict[str, Any]) -> None:
+    """يسجّل طلبًا جديدًا؛ التحديث الفعلي بعد WINDOW ثانية من أول طلب في الدفعة."""
+    st = _digests.setdefault(g["group_id"], {"message_id": None, "sent_at": 0.0, "new": 0,
+                                                "task": None, "busy": 0})
+    st["owner"], st["name"], st["bot"] = g["owner_user_id"], g["name"], bot
+    st["new"] += 1
+    if st["task"] is None:
+        st["task"] = asyncio.create_task(_flush_later(bot, g["group_id"]))
+
+async def _flush_later(bot, gid: str) -> None:
+    st = _digests[gid]
+    try:
+        await asyncio.sleep(WINDOW)
+    finally:
+        st["task"] = None   # ما يصل أثناء الإرسال يبدأ دفعة جديدة
+    st["busy"] += 1
+    try:
+        await _render(bot, gid, st)
+    except Exception:
+        logger.exception("join digest for %s failed", gid)
+    finally:
+        st["busy"] -= 1
+
+async def _render(bot, gid: str, st: Dict[str, Any]) -> None:
+    owner, new = st["owner"], st["new"]
+    st["new"] = 0
+    text, kb = await asyncio.to_thread(view, gid, st["name"], 0, new)
+    if kb is None:
+        return   # حُسمت كل الطلبات قبل انتهاء النافذة
+    mid: Optional[int] = st["message_id"]
+    if mid and time.time() - st["sent_at"] < REUSE:
+        try:
+            await outbox.submit(owner, lambda: bot.edit_message_text(
+                text, chat_id=owner, message_id=mid, reply_markup=kb))
+            return
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                return
+            # الرسالة حُذفت أو لم تعد قابلة للتعديل: أرسل واحدة جديدة
+    msg = await outbox.submit(owner, lambda: bot.send_message(owner, text, reply_markup=kb))
+    st["message_id"], st["sent_at"] = msg.message_id, time.time()
+
+def pending() -> int:
+    """عدد المجموعات التي تنتظر تحديث رسالتها (للاختبارات وإيقاف الخادم)."""
+    return sum(1 for st in _digests.values() if st["task"] is not None or st["busy"])
+
+async def stop() -> None:
+    """يرسل التحديثات المنتظرة فورًا بدل انتظار النافذة (عند إيقاف الخادم، قبل outbox.stop)."""
+    waiting = [(gid, st, st["task"]) for gid, st in _digests.items() if st["task"] is not None]
+    for *_, task in waiting:
+        task.cancel()
+    await asyncio.gather(*(task for *_, task in waiting), return_exceptions=True)
+    for gid, st, _ in waiting:
+        try:
+            await _render(st["bot"], gid, st)
+        except Exception:
+            logger.exception("join digest for %s failed", gid)
@@ -0,0 +1,229 @@
+# json_cache.py
+"""كاش مشترك داخل العملية لملفات JSON الخاصة بالمخازن.
+
+القراءة تتحول لبحث في dict طالما توقيع الملف (mtime/size/inode) لم يتغير،
+والكتابة تمر عبر الكاش (write-through) فيبقى صالحًا بعد كل حفظ.
+ملاحظة: القيم المُرجعة مشتركة مع الكاش؛ لا تعدّلها إلا داخل transaction() ثم احفظها.
+
+وضع الحفظ المؤجَّل (group commit): لو STORE_FLUSH_MS > 0 فإن save() يعلّم الملف "متسخ"
+فقط، وخيط خلفي واحد يكتب كل الملفات المتسخة مرة كل STORE_FLUSH_MS مللي ثانية على الأكثر
+أو بعد STORE_FLUSH_MAX_OPS تعديل، مع flush() إجباري عند الإغلاق.
+
+صيغة الملفات على القرص (STORE_FORMAT): pretty (الافتراضي، indent=2) أو compact (JSON مضغوط
+بلا مسافات: ملفات أصغر وحفظ/تحميل أسرع). القراءة تقبل الصيغتين دائمًا، والتحويل مرة واحدة:
+    python json_cache.py --format compact data/*.json
+
+عدة عمليات على نفس الملفات (STORE_MULTIPROCESS=1، مثل uvicorn --workers): transaction() تأخذ
+أيضًا قفل ملف (fcntl.flock على <file>.lock) فلا تضيع تعديلات عملية أخرى، والحفظ يُكتب فورًا داخل
+القفل (بدون تأجيل). تماسك الكاش مضمون لأن load() يقارن توقيع الملف (mtime/size/inode) مع كل قراءة.
+"""
+import os, json, threading, itertools, time, atexit, logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Tuple, Iterator
+from metrics import STORE_SECONDS
+
+try:
+    import fcntl
+except ImportError:   # ويندوز: لا أقفال بين العمليات
+    fcntl = None
+
+FLUSH_MS = int(os.getenv("STORE_FLUSH_MS", "0"))            # 0 = كتابة فورية (الافتراضي)
+FLUSH_MAX_OPS = int(os.getenv("STORE_FLUSH_MAX_OPS", "500"))
+FORMATS = {
+    "pretty":  {"ensure_ascii": False, "indent": 2},
+    "compact": {"ensure_ascii": False, "separators": (",", ":")},
+}
+FORMAT = os.getenv("STORE_FORMAT", "pretty").lower()
+MULTIPROCESS = os.getenv("STORE_MULTIPROCESS", "0") == "1"
+if FORMAT not in FORMATS:
+    raise ValueError("BAD_STORE_FORMAT")
+
+lock = threading.RLock()
+_cond = threading.Condition(lock)
+_entries: Dict[str, Dict[str, Any]] = {}   # path -> {"sig", "data", "gen", "path"}
+_gens = itertools.count(1)
+_dirty: Dict[str, float] = {}              # path -> وقت أول تعديل غير محفوظ
+_dirty_ops = 0
+_flusher: Optional[threading.Thread] = None
+_batch: ContextVar[int] = ContextVar("json_cache_batch", default=0)
+_held: Dict[str, list] = {}                # path -> [fd, depth] لأقفال الملفات المأخوذة
+logger = logging.getLogger("telegram-bot.json_cache")
+
+if MULTIPROCESS and fcntl is None:
+    logger.warning("STORE_MULTIPROCESS=1 but fcntl is unavailable; stores are only locked per process")
+
+def _key(path: str) -> str:
+    return os.path.abspath(path)
+
+def _sig(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """توقيع الملف الحالي (mtime_ns, size, inode) أو None لو غير موجود."""
+    return _sig(path)
+
+@contextmanager
+def transaction(path: str) -> Iterator[None]:
+    """يحمي دورة قراءة-تعديل-حفظ من التداخل مع خيط الحفظ الخلفي (ومع العمليات الأخرى)."""
+    with lock:
+        if not MULTIPROCESS or fcntl is None:
+            yield
+            return
+        key = _key(path)
+        held = _held.get(key)
+        if held is not None:   # متداخلة في نفس العملية (القفل العام RLock يضمن أنه نفس الخيط)
+            held[1] += 1
+            try:
+                yield
+            finally:
+                held[1] -= 1
+            return
+        folder = os.path.dirname(key)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        fd = os.open(key + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            _held[key] = [fd, 1]
+            try:
+                yield
+            finally:
+                del _held[key]
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+@contextmanager
+def batch() -> Iterator[None]:
+    """يؤجل كل الحفظ داخل الكتلة (لنفس المهمة) ويكتب الملفات المتسخة مرة واحدة عند الخروج."""
+    token = _batch.set(_batch.get() + 1)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+        if _batch.get() == 0 and FLUSH_MS <= 0:
+            flush()
+
+def load(path: str) -> Dict[str, Any]:
+    """يرجع محتوى الملف من الكاش، ويعيد قراءته فقط لو تغيّر على القرص."""
+    key = _key(path)
+    with lock:
+        e = _entries.get(key)
+        if e is not None and key in _dirty:
+            return e["data"]   # تعديلات لم تُكتب بعد هي الأحدث
+        sig = _sig(path)
+        if e is not None and sig is not None and e["sig"] == sig:
+            return e["data"]
+        d: Dict[str, Any] = {}
+        if sig is not None:
+            with STORE_SECONDS.time(file=os.path.basename(path), op="load"), \
+                    open(path, "r", encoding="utf-8") as f:
+                try: d = json.load(f) or {}
+                except json.JSONDecodeError: d = {}
+        _entries[key] = {"sig": sig, "data": d, "gen": next(_gens), "path": path}
+        return d
+
+def dump(d: Dict[str, Any], path: str, fmt: Optional[str] = None) -> None:
+    """كتابة ذرية (tmp + replace) بدون المرور على الكاش؛ القراءة التالية ستعيد التحميل."""
+    tmp = f"{path}.{os.getpid()}.tmp"   # اسم خاص بالعملية حتى لا تتصادم عمليتان
+    with STORE_SECONDS.time(file=os.path.basename(path), op="save"):
+        # dumps ثم كتابة واحدة أسرع من json.dump الذي يكتب الملف قطعة قطعة
+        text = json.dumps(d, **FORMATS[fmt or FORMAT])
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+def save(d: Dict[str, Any], path: str) -> None:
+    """حفظ مع تحديث الكاش بنفس الكائن؛ فوري أو مؤجَّل حسب STORE_FLUSH_MS و batch()."""
+    global _dirty_ops
+    key = _key(path)
+    with lock:
+        e = _entries.get(key)
+        gen = e["gen"] if (e is not None and e["data"] is d) else next(_gens)
+        if MULTIPROCESS or (FLUSH_MS <= 0 and not _batch.get()):
+            # مع عدة عمليات لا يمكن تأجيل الكتابة لما بعد تحرير قفل الملف
+            dump(d, path)
+            _entries[key] = {"sig": _sig(path), "data": d, "gen": gen, "path": path}
+            return
+        _entries[key] = {"sig": e["sig"] if e else None, "data": d, "gen": gen, "path": path}
+        was_clean = not _dirty
+        _dirty.setdefault(key, time.monotonic())
+        _dirty_ops += 1
+        if FLUSH_MS > 0:
+            _start_flusher()
+            if was_clean or _dirty_ops >= FLUSH_MAX_OPS:
+                _cond.notify_all()
+
+def flush() -> None:
+    """يكتب كل الملفات المتسخة الآن (يُستدعى من الخيط الخلفي وعند الإغلاق)."""
+    global _dirty_ops
+    with lock:
+        for key in list(_dirty):
+            e = _entries[key]
+            dump(e["data"], e["path"])
+            e["sig"] = _sig(e["path"])
+            del _dirty[key]
+        _dirty_ops = 0
+
+def _flush_loop() -> None:
+    while True:
+        with _cond:
+            while not _dirty:
+                _cond.wait()
+            deadline = min(_dirty.values()) + FLUSH_MS / 1000.0
+            while _dirty and _dirty_ops < FLUSH_MAX_OPS:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                _cond.wait(remaining)
+            flush()
+
+def _start_flusher() -> None:
+    global _flusher
+    if _flusher is None:
+        _flusher = threading.Thread(target=_flush_loop, name="json-cache-flusher", daemon=True)
+        _flusher.start()
+        atexit.register(flush)
+
+def generation(path: str) -> int:
+    """عدّاد يزيد كلما أُعيد تحميل الملف من القرص (لإعادة بناء الفهارس المشتقة)."""
+    e = _entries.get(_key(path))
+    return e["gen"] if e else 0
+
+def invalidate(path: Optional[str] = None) -> None:
+    with lock:
+        if path is None:
+            flush()
+            _entries.clear()
+        else:
+            key = _key(path)
+            if key in _dirty:
+                flush()
+            _entries.pop(key, None)
+
+def convert(path: str, fmt: str = "compact") -> Tuple[int, int]:
+    """يعيد كتابة ملف موجود بالصيغة المطلوبة ويرجع (الحجم قبل، الحجم بعد)."""
+    if fmt not in FORMATS:
+        raise ValueError("BAD_STORE_FORMAT")
+    with lock:
+        before = os.path.getsize(path)
+        with open(path, "r", encoding="utf-8") as f:
+            d = json.load(f)
+        dump(d, path, fmt)
+        _entries.pop(_key(path), None)
+        return before, os.path.getsize(path)
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Rewrite store files in another on-disk format")
+    ap.add_argument("--format", choices=sorted(FORMATS), default="compact")
+    ap.add_argument("files", nargs="+")
+    args = ap.parse_args()
+    for p in args.files:
+        b, a = convert(p, args.format)
+        print(f"{p}: {b} -> {a} bytes")
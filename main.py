@@ -1,5 +1,4 @@
 import os
-import sqlite3
 import string
 import random
 from datetime import datetime, timezone
@@ -16,6 +15,9 @@ from telegram.ext import (
 )
 from dotenv import load_dotenv
 
+from sqlite_db import thread_conn, DBExecutor
+from state_store import SqlitePersistence
+
 # ===== إعدادات =====
 load_dotenv()
 BOT_TOKEN = os.getenv("TELEGRAM_TOKEN", "8331353191:AAGnY-ZfvDZZBjBN3qkkmnwCIrporljxEDg")
@@ -24,10 +26,12 @@ DB_PATH = os.getenv("DB_PATH", "bot.db")
 CHOOSING, WAIT_JOIN_ID = range(2)
 
 # ===== الداتابيز =====
+# كل الاستعلامات تمر على خيط واحد مخصص باتصال طويل العمر (WAL + synchronous=NORMAL)
+# والهاندلرز تنتظرها بـ await DB.run(...) بدل ما توقف الـ event loop.
+DB = DBExecutor(DB_PATH)
+
 def db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    return thread_conn(DB_PATH)
 
 def init_db():
     conn = db()
@@ -50,7 +54,6 @@ def init_db():
         )
     """)
     conn.commit()
-    conn.close()
 
 def gen_team_id(length=6):
     alphabet = string.ascii_uppercase + string.digits
@@ -61,7 +64,6 @@ def user_in_any_team(user_id: int):
     cur = conn.cursor()
     cur.execute("SELECT team_id, role FROM team_members WHERE user_id = ?", (user_id,))
     row = cur.fetchone()
-    conn.close()
     return row
 
 def create_team_for_user(user_id: int):
@@ -78,7 +80,6 @@ def create_team_for_user(user_id: int):
     cur.execute("INSERT INTO team_members(team_id, user_id, role, joined_at) VALUES (?,?,?,?)",
                 (tid, user_id, 'owner', now))
     conn.commit()
-    conn.close()
     return tid
 
 def add_member_to_team(team_id: str, user_id: int):
@@ -87,17 +88,14 @@ def add_member_to_team(team_id: str, user_id: int):
     cur.execute("SELECT team_id FROM teams WHERE team_id = ?", (team_id,))
     team = cur.fetchone()
     if not team:
-        conn.close()
         return False, "لا يوجد فريق بهذا الـ ID."
     cur.execute("SELECT 1 FROM team_members WHERE team_id = ? AND user_id = ?", (team_id, user_id))
     if cur.fetchone():
-        conn.close()
         return True, "أنت بالفعل عضو في هذا الفريق."
     now = datetime.now(timezone.utc).isoformat()
     cur.execute("INSERT INTO team_members(team_id, user_id, role, joined_at) VALUES (?,?,?,?)",
                 (team_id, user_id, 'member', now))
     conn.commit()
-    conn.close()
     return True, "تم انضمامك للفريق بنجاح ✅"
 
 def get_team_members(team_id: str):
@@ -111,7 +109,6 @@ def get_team_members(team_id: str):
         ORDER BY CASE WHEN tm.role='owner' THEN 0 ELSE 1 END, tm.user_id
     """, (team_id,))
     rows = cur.fetchall()
-    conn.close()
     return rows
 
 def get_user_team(user_id: int):
@@ -124,7 +121,6 @@ def get_user_team(user_id: int):
         WHERE tm.user_id = ?
     """, (user_id,))
     row = cur.fetchone()
-    conn.close()
     return row
 
 def leave_team(user_id: int):
@@ -138,7 +134,6 @@ def leave_team(user_id: int):
     cur = conn.cursor()
     cur.execute("DELETE FROM team_members WHERE team_id = ? AND user_id = ?", (team_id, user_id))
     conn.commit()
-    conn.close()
     return True, f"تم خروجك من الفريق {team_id}."
 
 # ===== واجهة البوت =====
@@ -167,7 +162,7 @@ async def handle_menu_choice(update: Update, context: ContextTypes.DEFAULT_TYPE)
     user_id = query.from_user.id
 
     if choice == "create_main":
-        exists = user_in_any_team(user_id)
+        exists = await DB.run(user_in_any_team, user_id)
         if exists:
             team_id, role = exists
             msg = (
@@ -179,7 +174,7 @@ async def handle_menu_choice(update: Update, context: ContextTypes.DEFAULT_TYPE)
             await query.edit_message_text(msg, reply_markup=main_menu_keyboard())
             return CHOOSING
 
-        new_tid = create_team_for_user(user_id)
+        new_tid = await DB.run(create_team_for_user, user_id)
         msg = (
             "تم إنشاء الحساب الرئيسي بنجاح! ✅\n"
             f"ده **Team ID** الخاص بيك: `{new_tid}`\n\n"
@@ -202,7 +197,7 @@ async def receive_join_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.message.from_user.id
     text = (update.message.text or "").strip().upper()
 
-    if user_in_any_team(user_id):
+    if await DB.run(user_in_any_team, user_id):
         await update.message.reply_text("إنت بالفعل منضم لفريق. استخدم /myteam لمعرفة التفاصيل.")
         return ConversationHandler.END
 
@@ -210,13 +205,13 @@ async def receive_join_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("صيغة Team ID غير صحيحة. ابعت الكود اللي شكله زي: ABC123")
         return WAIT_JOIN_ID
 
-    ok, msg = add_member_to_team(text, user_id)
+    ok, msg = await DB.run(add_member_to_team, text, user_id)
     await update.message.reply_text(msg)
     return ConversationHandler.END
 
 async def cmd_myteam(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    ut = get_user_team(user_id)
+    ut = await DB.run(get_user_team, user_id)
     if not ut:
         await update.message.reply_text("أنت غير منضم لأي فريق. استخدم /start واختر إنشاء أو انضمام.")
         return
@@ -226,12 +221,12 @@ async def cmd_myteam(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def cmd_members(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    ut = get_user_team(user_id)
+    ut = await DB.run(get_user_team, user_id)
     if not ut:
         await update.message.reply_text("أنت غير منضم لأي فريق.")
         return
     team_id, owner_id = ut
-    rows = get_team_members(team_id)
+    rows = await DB.run(get_team_members, team_id)
     if not rows:
         await update.message.reply_text("لا يوجد أعضاء (غريب!)")
         return
@@ -244,7 +239,7 @@ async def cmd_members(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def cmd_leave(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    ok, msg = leave_team(user_id)
+    ok, msg = await DB.run(leave_team, user_id)
     await update.message.reply_text(msg)
 
 async def cancel_conv(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -253,7 +248,8 @@ async def cancel_conv(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 def build_application():
     init_db()
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    # حالات المحادثة تُحفظ بنفس ملف القاعدة فيكمل المستخدم من حيث توقف بعد إعادة التشغيل
+    app = ApplicationBuilder().token(BOT_TOKEN).persistence(SqlitePersistence(DB_PATH)).build()
 
     conv = ConversationHandler(
         entry_points=[CommandHandler("start", start)],
@@ -263,6 +259,8 @@ def build_application():
         },
         fallbacks=[CommandHandler("cancel", cancel_conv)],
         allow_reentry=True,
+        name="main_menu",
+        persistent=True,
     )
 
     app.add_handler(conv)
@@ -275,4 +273,7 @@ def build_application():
 if __name__ == "__main__":
     application = build_application()
     print("Bot is running... Press Ctrl+C to stop.")
-    application.run_polling(close_loop=False)
+    try:
+        application.run_polling(close_loop=False)
+    finally:
+        DB.shutdown()
@@ -0,0 +1,129 @@
+# metrics.py
+"""عدّادات ومدرّجات زمنية بسيطة بصيغة Prometheus النصية (بدون اعتماديات خارجية).
+
+    UPDATES.inc(status="accepted")
+    with HANDLER_SECONDS.time(handler="on_text", branch="admin"):
+        ...
+    text = render()   # لمسار /metrics
+"""
+import time, threading, functools
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Tuple, List, Callable, Optional, Iterator, Any
+
+_lock = threading.Lock()
+_registry: List["_Metric"] = []
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _labels_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _fmt_labels(key: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    body = ",".join('%s="%s"' % (k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in items)
+    return "{" + body + "}"
+
+class _Metric:
+    kind = ""
+    def __init__(self, name: str, doc: str):
+        self.name, self.doc = name, doc
+        with _lock:
+            _registry.append(self)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"] + self._samples())
+
+class Counter(_Metric):
+    kind = "counter"
+    def __init__(self, name: str, doc: str):
+        super().__init__(name, doc)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _labels_key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_fmt_labels(k)} {v}" for k, v in sorted(self._values.items())]
+
+class Gauge(_Metric):
+    """قيمة لحظية تُقرأ عند العرض من دالة (مثل عمق الطابور)."""
+    kind = "gauge"
+    def __init__(self, name: str, doc: str, fn: Callable[[], float]):
+        super().__init__(name, doc)
+        self._fn = fn
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name} {self._fn()}"]
+
+class Histogram(_Metric):
+    kind = "histogram"
+    def __init__(self, name: str, doc: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, doc)
+        self.buckets = tuple(buckets)
+        self._data: Dict[tuple, List[float]] = {}   # key -> [counts..., +Inf, sum]
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _labels_key(labels)
+        i = bisect_left(self.buckets, value)
+        with _lock:
+            row = self._data.get(key)
+            if row is None:
+                row = self._data[key] = [0.0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def _samples(self) -> List[str]:
+        out: List[str] = []
+        for key, row in sorted(self._data.items()):
+            acc = 0.0
+            for b, c in zip(self.buckets, row):
+                acc += c
+                out.append(f"{self.name}_bucket{_fmt_labels(key, ('le', repr(b)))} {acc}")
+            acc += row[len(self.buckets)]
+            out.append(f"{self.name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {acc}")
+            out.append(f"{self.name}_sum{_fmt_labels(key)} {row[-1]}")
+            out.append(f"{self.name}_count{_fmt_labels(key)} {acc}")
+        return out
+
+def render() -> str:
+    with _lock:
+        metrics = list(_registry)
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+# ===== المقاييس المشتركة =====
+UPDATES = Counter("bot_updates_total", "Webhook updates by outcome.")
+UPDATE_SECONDS = Histogram("bot_update_seconds", "Time to process one update end to end.")
+HANDLER_SECONDS = Histogram("bot_handler_seconds", "Handler latency by handler and branch.")
+API_CALLS = Counter("bot_api_requests_total", "Outbound Bot API calls by method and status.")
+API_SECONDS = Histogram("bot_api_request_seconds", "Outbound Bot API call latency by method.")
+STORE_SECONDS = Histogram("store_io_seconds", "Store disk load/save time by file and operation.")
+
+def timed(handler: str, branch_of: Optional[Callable[..., str]] = None):
+    """ديكوريتور يقيس زمن الهاندلر، مع فرع اختياري يُحسب من (update, context)."""
+    def deco(fn):
+        @functools.wraps(fn)
+        async def wrapper(update, context, *args, **kwargs):
+            branch = "-"
+            if branch_of is not None:
+                try: branch = branch_of(update, context)
+                except Exception: branch = "unknown"
+            with HANDLER_SECONDS.time(handler=handler, branch=branch):
+                return await fn(update, context, *args, **kwargs)
+        return wrapper
+    return deco
@@ -0,0 +1,194 @@
+# outbox.py
+"""مُجدول مركزي للرسائل الصادرة يحترم حدود تيليجرام (flood limits).
+
+- Token bucket عام للبوت كله وآخر لكل محادثة.
+- RetryAfter من الـ API يوقف الإرسال كله للمدة المطلوبة ثم يعيد نفس الرسالة.
+- أخطاء الشبكة تُعاد بتأخير أُسّي مع jitter، أما BadRequest/Forbidden فتفشل فورًا.
+- الردود التفاعلية (INTERACTIVE) تسبق الإشعارات الخلفية (BACKGROUND) ثم البث الجماعي (BULK).
+
+    await outbox.send(context.bot, chat_id, "نص", reply_markup=kb)     # ينتظر النتيجة
+    outbox.post(context.bot, owner_id, "إشعار", reply_markup=kb)        # بالخلفية
+"""
+import os, time, random, asyncio, logging, itertools
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from telegram.error import RetryAfter, BadRequest, NetworkError
+
+logger = logging.getLogger("telegram-bot.outbox")
+
+INTERACTIVE, BACKGROUND, BULK = 0, 1, 2
+
+GLOBAL_RATE = float(os.getenv("OUTBOX_GLOBAL_RATE", "25"))   # رسالة/ثانية للبوت كله
+GLOBAL_BURST = float(os.getenv("OUTBOX_GLOBAL_BURST", "30"))
+CHAT_RATE = float(os.getenv("OUTBOX_CHAT_RATE", "1"))        # رسالة/ثانية لكل محادثة
+CHAT_BURST = float(os.getenv("OUTBOX_CHAT_BURST", "3"))
+MAX_RETRIES = int(os.getenv("OUTBOX_MAX_RETRIES", "5"))
+BACKOFF_BASE = 0.5
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate, self.burst = rate, burst
+        self.tokens, self.stamp = burst, time.monotonic()
+
+    def delay(self, now: float) -> float:
+        """الزمن المتبقي حتى يتوفر توكن (0 = متاح الآن)."""
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def full(self, now: float) -> bool:
+        return self.tokens + (now - self.stamp) * self.rate >= self.burst
+
+class _Job:
+    __slots__ = ("chat_id", "call", "priority", "future", "attempt")
+
+    def __init__(self, chat_id: int, call: Callable[[], Awaitable[Any]], priority: int, future: asyncio.Future):
+        self.chat_id, self.call, self.priority, self.future = chat_id, call, priority, future
+        self.attempt = 0
+
+class Outbox:
+    def __init__(self):
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._seq = itertools.count()
+        self._global = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+        self._chats: Dict[int, TokenBucket] = {}
+        self._paused_until = 0.0
+        self._pending = 0
+        self._idle: Optional[asyncio.Event] = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _ensure_started(self) -> None:
+        if (self._runner is None or self._runner.done()
+                or self._runner.get_loop() is not asyncio.get_running_loop()):
+            self._queue = asyncio.PriorityQueue()
+            self._idle = asyncio.Event()
+            self._idle.set()
+            self._runner = asyncio.create_task(self._run())
+
+    def submit(self, chat_id: int, call: Callable[[], Awaitable[Any]], priority: int = BACKGROUND) -> asyncio.Future:
+        """يضيف استدعاء API (دالة بلا وسائط ترجع coroutine) ويرجع Future بنتيجته."""
+        self._ensure_started()
+        job = _Job(int(chat_id), call, priority, asyncio.get_running_loop().create_future())
+        self._pending += 1
+        self._idle.clear()
+        self._enqueue(job)
+        return job.future
+
+    def _enqueue(self, job: _Job) -> None:
+        self._queue.put_nowait((job.priority, next(self._seq), job))
+
+    def _defer(self, job: _Job, delay: float) -> None:
+        asyncio.get_running_loop().call_later(delay, self._enqueue, job)
+
+    def _done(self) -> None:
+        self._pending -= 1
+        if self._pending == 0:
+            self._idle.set()
+
+    def _chat(self, chat_id: int, now: float) -> TokenBucket:
+        b = self._chats.get(chat_id)
+        if b is None:
+            if len(self._chats) > 10000:   # تنظيف الدلاء الممتلئة (محادثات خاملة)
+                self._chats = {k: v for k, v in self._chats.items() if not v.full(now)}
+            b = self._chats[chat_id] = TokenBucket(CHAT_RATE, CHAT_BURST)
+        return b
+
+    async def _run(self) -> None:
+        while True:
+            prio, seq, job = await self._queue.get()
+            if job.future.cancelled():
+                self._done()   # صاحب الطلب ألغاه (مثل بث متوقف) فلا ترسله
+                continue
+            now = time.monotonic()
+            wait = max(self._paused_until - now, self._global.delay(now))
+            if wait > 0:
+                # أعده للطابور حتى لا يتخطى رسالة أعلى أولوية تصل أثناء الانتظار
+                self._queue.put_nowait((prio, seq, job))
+                await asyncio.sleep(wait)
+                continue
+            bucket = self._chat(job.chat_id, now)
+            cw = bucket.delay(now)
+            if cw > 0:
+                self._defer(job, cw)   # لا تحجز الطابور كله لأجل محادثة واحدة
+                continue
+            self._global.take()
+            bucket.take()
+            asyncio.create_task(self._execute(job))
+
+    async def _execute(self, job: _Job) -> None:
+        try:
+            result = await job.call()
+        except RetryAfter as e:
+            secs = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else float(e.retry_after)
+            self._paused_until = max(self._paused_until, time.monotonic() + secs)
+            logger.warning("flood control: pausing outbound sends for %.1fs", secs)
+            self._enqueue(job)
+            return
+        except BadRequest as e:
+            self._fail(job, e)
+            return
+        except NetworkError as e:
+            job.attempt += 1
+            if job.attempt > MAX_RETRIES:
+                self._fail(job, e)
+                return
+            self._defer(job, BACKOFF_BASE * (2 ** job.attempt) * random.uniform(0.5, 1.5))
+            return
+        except Exception as e:
+            self._fail(job, e)
+            return
+        if not job.future.done():
+            job.future.set_result(result)
+        self._done()
+
+    def _fail(self, job: _Job, exc: BaseException) -> None:
+        if not job.future.done():
+            job.future.set_exception(exc)
+        self._done()
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """ينتظر إرسال كل ما في الطابور (حتى timeout) ثم يوقف المُجدول."""
+        if self._runner is None:
+            return
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("outbox drain timed out with %d sends left", self._pending)
+        self._runner.cancel()
+        await asyncio.gather(self._runner, return_exceptions=True)
+        self._runner = None
+
+_outbox = Outbox()
+
+def _log_failure(fut: asyncio.Future) -> None:
+    if not fut.cancelled() and fut.exception() is not None:
+        logger.info("background send failed: %s", fut.exception())
+
+async def send(bot, chat_id: int, text: str, priority: int = INTERACTIVE, **kwargs: Any):
+    """يرسل رسالة عبر المُجدول وينتظر نتيجتها (يرفع الخطأ النهائي إن فشلت)."""
+    return await _outbox.submit(chat_id, lambda: bot.send_message(chat_id, text, **kwargs), priority)
+
+def post(bot, chat_id: int, text: str, priority: int = BACKGROUND, **kwargs: Any) -> asyncio.Future:
+    """إرسال بالخلفية بدون انتظار؛ الفشل يُسجَّل في اللوج بدل ابتلاعه."""
+    fut = _outbox.submit(chat_id, lambda: bot.send_message(chat_id, text, **kwargs), priority)
+    fut.add_done_callback(_log_failure)
+    return fut
+
+def submit(chat_id: int, call: Callable[[], Awaitable[Any]], priority: int = BACKGROUND) -> asyncio.Future:
+    return _outbox.submit(chat_id, call, priority)
+
+def pending() -> int:
+    return _outbox.pending
+
+async def stop(timeout: float = 30.0) -> None:
+    await _outbox.stop(timeout)
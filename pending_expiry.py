@@ -0,0 +1,48 @@
+# pending_expiry.py
+"""رفض طلبات الانضمام المعلّقة التي تجاوزت PENDING_TTL_HOURS بمهمة دورية في الخلفية.
+
+اختياري: معطّل ما لم يُضبط PENDING_TTL_HOURS (مثلًا 72)، لأنه يرفض الطلبات ويبلغ أصحابها تلقائيًا.
+
+كل دورة تسأل group_store.expire_pending عن الطلبات المنتهية فقط (فهرس مرتب بوقت الطلب)
+بدل المرور على كل المجموعات، ثم تبلغ أصحابها عبر outbox بأولوية BULK.
+"""
+import os, asyncio, logging
+
+import outbox
+from group_store import expire_pending
+
+logger = logging.getLogger("telegram-bot.pending_expiry")
+
+PENDING_TTL = float(os.getenv("PENDING_TTL_HOURS", "0")) * 3600   # 0 (الافتراضي) = الطلبات لا تنتهي
+SWEEP_SECONDS = float(os.getenv("PENDING_SWEEP_SECONDS", "300"))
+
+_task: "asyncio.Task | None" = None
+
+async def sweep(bot) -> int:
+    expired = await asyncio.to_thread(expire_pending, PENDING_TTL)
+    for gid, uid in expired:
+        outbox.post(bot, uid, f"⌛ انتهت مهلة طلبك للانضمام إلى المجموعة {gid}. يمكنك إرسال طلب جديد.",
+                    priority=outbox.BULK)
+    if expired:
+        logger.info("⌛ expired %d pending join requests", len(expired))
+    return len(expired)
+
+async def _run(bot) -> None:
+    while True:
+        await asyncio.sleep(SWEEP_SECONDS)
+        try:
+            await sweep(bot)
+        except Exception:
+            logger.exception("pending sweep failed")
+
+def start(bot) -> None:
+    global _task
+    if PENDING_TTL > 0 and _task is None:
+        _task = asyncio.create_task(_run(bot))
+
+async def stop() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
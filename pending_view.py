@@ -0,0 +1,39 @@
+# pending_view.py
+"""عرض طابور الطلبات المعلّقة للمالك (زر الطلبات المعلّقة) وأجزاؤه المشتركة مع join_digest.
+
+أزرار القرار الجماعي PQ:<gid>:approve|deny:<عدد>:<وقت العرض> يعالجها bot_handlers.on_pending_batch.
+"""
+import time
+from typing import List
+
+from telegram import InlineKeyboardMarkup, InlineKeyboardButton
+
+from account_store import get_displays
+from group_store import pending_queue
+
+PENDING_PREVIEW = 10
+
+def age(ts) -> str:
+    if not ts:
+        return ""
+    m = max(0, int(time.time() - ts)) // 60
+    return f" — منذ {m // 1440}ي" if m >= 1440 else f" — منذ {m // 60}س" if m >= 60 else f" — منذ {m}د"
+
+def decide_all_row(gid: str, total: int) -> List[InlineKeyboardButton]:
+    """قبول/رفض الكل لما يظهر الآن فقط: العدد ووقت العرض في الزر حتى لا يشمل طلبات وصلت بعده."""
+    shown = f"{total}:{int(time.time())}"
+    return [InlineKeyboardButton(f"✅ قبول الكل ({total})", callback_data=f"PQ:{gid}:approve:{shown}"),
+            InlineKeyboardButton("✖️ رفض الكل", callback_data=f"PQ:{gid}:deny:{shown}")]
+
+def pending_view(gid: str):
+    q = pending_queue(gid, PENDING_PREVIEW)
+    if not q or not q["total"]:
+        return "لا توجد طلبات معلّقة.", None
+    names = get_displays([uid for uid, _ in q["items"]])
+    lines = [f"- {names[uid]} (ID: {uid}){age(ts)}" for uid, ts in q["items"]]
+    more = f"\n… و{q['total'] - len(q['items'])} آخرين" if q["total"] > len(q["items"]) else ""
+    rows = [decide_all_row(gid, q["total"])]
+    if q["total"] > PENDING_PREVIEW:
+        rows.append([InlineKeyboardButton(f"✅ قبول أقدم {PENDING_PREVIEW}",
+                                          callback_data=f"PQ:{gid}:approve:{PENDING_PREVIEW}:{int(time.time())}")])
+    return f"📥 طلبات معلّقة ({q['total']}) — الأقدم أولًا:\n" + "\n".join(lines) + more, InlineKeyboardMarkup(rows)
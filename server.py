@@ -1,38 +1,107 @@
 # server.py
-import os, asyncio, logging
+import os, logging, random, time
 from fastapi import FastAPI, Request
 from fastapi.responses import PlainTextResponse, JSONResponse
 import uvicorn
 
 from telegram import Update
 from telegram.ext import Application
+from telegram.request import HTTPXRequest
 from bot_handlers import register_handlers
+import json_cache
+from ingest import UpdateQueue
+import outbox
+import broadcast
+import pending_expiry
+import join_digest
+from dedup import SeenUpdates
+from state_store import SqlitePersistence
+import metrics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("telegram-bot")
 
 TOKEN = (os.getenv("TELEGRAM_TOKEN") or "8331353191:AAGnY-ZfvDZZBjBN3qkkmnwCIrporljxEDg").strip()
+# عنوان Bot API (الافتراضي api.telegram.org)؛ يُغيَّر لسيرفر وهمي في اختبارات الحمل
+TELEGRAM_API_BASE = (os.getenv("TELEGRAM_API_BASE") or "").rstrip("/")
+
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "1000"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "8"))   # عدد الشرائح: ترتيب داخل المحادثة وتوازي بينها
+# آخر N update_id مستلمة لتجاهل إعادة الإرسال؛ DEDUP_PATH (اختياري) يحفظها بعد إعادة التشغيل
+DEDUP_CAPACITY = int(os.getenv("DEDUP_CAPACITY", "10000"))
+DEDUP_PATH = os.getenv("DEDUP_PATH") or None
+# عدد عمليات uvicorn؛ أكثر من 1 يفعّل STORE_MULTIPROCESS (أقفال ملفات بين العمليات).
+# ملاحظة: حدود outbox و dedup لكل عملية على حدة، فاقسم OUTBOX_GLOBAL_RATE على عدد العمليات.
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+# نسبة التحديثات التي يُطبع محتواها كاملًا على مستوى INFO (الباقي DEBUG فقط)
+UPDATE_LOG_SAMPLE = float(os.getenv("UPDATE_LOG_SAMPLE", "0"))
+
+class MeteredRequest(HTTPXRequest):
+    """HTTPXRequest يسجّل عدد وزمن كل استدعاء لـ Bot API حسب الطريقة."""
+    async def do_request(self, url, method, *args, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        t0 = time.perf_counter()
+        status = "error"
+        try:
+            code, payload = await super().do_request(url, method, *args, **kwargs)
+            status = str(code)
+            return code, payload
+        finally:
+            metrics.API_SECONDS.observe(time.perf_counter() - t0, method=api_method)
+            metrics.API_CALLS.inc(method=api_method, status=status)
 
 app = FastAPI()
 tg_app: Application | None = None
+ingest: UpdateQueue | None = None
+seen: SeenUpdates | None = None
+metrics.Gauge("bot_ingest_queue_depth", "Updates waiting in the ingest queue.",
+              lambda: ingest.depth if ingest else 0)
+
+async def process_update(update: Update) -> None:
+    assert tg_app is not None
+    with metrics.UPDATE_SECONDS.time():
+        await tg_app.process_update(update)
+        if json_cache.MULTIPROCESS:
+            # التحديث التالي لنفس المستخدم قد تعالجه عملية أخرى: احفظ حالة الويزارد الآن
+            await tg_app.update_persistence()
 
 @app.on_event("startup")
 async def on_startup():
     """تهيئة وتشغيل تطبيق تيليجرام قبل استقبال أي Webhook."""
-    global tg_app
-    tg_app = Application.builder().token(TOKEN).build()
+    global tg_app, ingest, seen
+    seen = SeenUpdates(DEDUP_CAPACITY, DEDUP_PATH)
+    # حالة الويزارد (user_data) تُحفظ في SQLite فلا تضيع مع إعادة التشغيل
+    builder = Application.builder().token(TOKEN).request(MeteredRequest()).persistence(SqlitePersistence())
+    if TELEGRAM_API_BASE:
+        builder = builder.base_url(f"{TELEGRAM_API_BASE}/bot").base_file_url(f"{TELEGRAM_API_BASE}/file/bot")
+    tg_app = builder.build()
     register_handlers(tg_app)
     await tg_app.initialize()   # لازم الأول
     await tg_app.start()        # تشغيل اللوب الداخلي للهاندلرز
+    ingest = UpdateQueue(process_update, INGEST_QUEUE_SIZE, INGEST_WORKERS)
+    await ingest.start()
+    resumed = broadcast.resume_all(tg_app.bot)
+    if resumed:
+        logger.info("📣 resumed %d unfinished broadcasts", resumed)
+    pending_expiry.start(tg_app.bot)
     logger.info("✅ Telegram Application initialized & started")
 
 @app.on_event("shutdown")
 async def on_shutdown():
     """إيقاف تطبيق تيليجرام بشكل نظيف عند إغلاق الخادم."""
+    if ingest is not None:
+        await ingest.stop()   # أنهِ التحديثات الموجودة بالطابور قبل الإيقاف
+    await broadcast.stop()    # أوقف البث الجاري (يُستأنف في التشغيل التالي)
+    await pending_expiry.stop()
+    await join_digest.stop()  # أرسل رسائل الطلبات المجمّعة المنتظرة قبل إيقاف outbox
+    await outbox.stop()       # ثم أرسل الرسائل المعلّقة بالمُجدول
     if tg_app is not None:
         await tg_app.stop()
         await tg_app.shutdown()
         logger.info("🛑 Telegram Application stopped & shutdown")
+    if seen is not None:
+        seen.close()
+    json_cache.flush()   # اكتب أي تعديلات مؤجَّلة (STORE_FLUSH_MS) قبل الخروج
 
 @app.get("/")
 async def root():
@@ -40,18 +109,39 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return JSONResponse({"status": "ok"})
+    return JSONResponse({
+        "status": "ok",
+        "queue_depth": ingest.depth if ingest else 0,
+        "queue_capacity": INGEST_QUEUE_SIZE,
+    })
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.post("/webhook")
 async def webhook(request: Request):
     """يستقبل التحديثات من تيليجرام ويمررها للهاندلرز."""
     try:
         data = await request.json()
-        logger.info("📩 Update from Telegram: %s", data)
-        assert tg_app is not None
+        if UPDATE_LOG_SAMPLE and random.random() < UPDATE_LOG_SAMPLE:
+            logger.info("📩 Update from Telegram: %s", data)
+        else:
+            logger.debug("📩 Update from Telegram: %s", data)
+        assert tg_app is not None and ingest is not None and seen is not None
+        update_id = data.get("update_id")
+        if update_id is not None and update_id in seen:
+            # تيليجرام أعاد إرسال تحديث استلمناه بالفعل: لا تعالجه مرة ثانية
+            metrics.UPDATES.inc(status="duplicate")
+            return PlainTextResponse("OK", status_code=200)
         update = Update.de_json(data, tg_app.bot)
-        # يشتغل عادي بعد start/initialize
-        asyncio.create_task(tg_app.process_update(update))
+        if not ingest.offer(update):
+            # الطابور ممتلئ: تيليجرام يعيد المحاولة لاحقًا بدل تراكم مهام بلا حد
+            metrics.UPDATES.inc(status="rejected")
+            return PlainTextResponse("BUSY", status_code=429, headers={"Retry-After": "1"})
+        if update_id is not None:
+            seen.add(update_id)   # بعد القبول فقط، حتى لا يُسقط تحديث رُفض بـ 429 عند إعادة إرساله
+        metrics.UPDATES.inc(status="accepted")
         return PlainTextResponse("OK", status_code=200)
     except Exception as e:
         logger.exception("Webhook error: %s", e)
@@ -59,4 +149,6 @@ async def webhook(request: Request):
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "3000"))
-    uvicorn.run("server:app", host="0.0.0.0", port=port)
\ No newline at end of file
+    if WORKERS > 1:
+        os.environ["STORE_MULTIPROCESS"] = "1"   # تقرأه العمليات الفرعية عند استيرادها للوحدات
+    uvicorn.run("server:app", host="0.0.0.0", port=port, workers=WORKERS)
\ No newline at end of file
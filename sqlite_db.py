@@ -0,0 +1,57 @@
+# sqlite_db.py
+"""اتصالات SQLite مشتركة: WAL + synchronous=NORMAL واتصال طويل العمر لكل خيط."""
+import os, sqlite3, threading, asyncio, functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Callable, Any
+
+_local = threading.local()
+_schema_ready: set = set()
+_schema_lock = threading.Lock()
+
+def connect(path: str) -> sqlite3.Connection:
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(path, cached_statements=256)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+def thread_conn(path: str, schema: Optional[str] = None) -> sqlite3.Connection:
+    """يرجع اتصال هذا الخيط بالملف (يُفتح مرة واحدة) وينشئ الجداول أول مرة."""
+    conns: Dict[str, sqlite3.Connection] = getattr(_local, "conns", None) or {}
+    _local.conns = conns
+    conn = conns.get(path)
+    if conn is None:
+        conn = conns[path] = connect(path)
+    if schema and path not in _schema_ready:
+        with _schema_lock:
+            if path not in _schema_ready:
+                conn.executescript(schema)
+                _schema_ready.add(path)
+    return conn
+
+class DBExecutor:
+    """خيط مخصص لاستعلامات SQLite حتى لا تُوقف حلقة asyncio.
+
+    كل الدوال تُنفَّذ بالترتيب على نفس الخيط وبنفس الاتصال طويل العمر:
+        rows = await executor.run(get_team_members, team_id)
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+
+    def _close(self) -> None:
+        conn = getattr(_local, "conns", {}).pop(self.path, None)
+        if conn is not None:
+            conn.close()
+
+    def shutdown(self) -> None:
+        """يغلق اتصال خيط القاعدة ثم يوقف الخيط."""
+        self._pool.submit(self._close).result()
+        self._pool.shutdown(wait=True)
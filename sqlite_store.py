@@ -0,0 +1,516 @@
+# sqlite_store.py
+"""نفس واجهات group_store و account_store و user_index لكن على SQLite (WAL).
+
+تُفعَّل بـ STORE_BACKEND=sqlite، وعندها تستبدل كل وحدة دوالها بدوال هذا الملف.
+القراءات بحث بالمفتاح/الفهرس والتعديلات على مستوى الصف بدل إعادة كتابة المستند كله.
+"""
+import os, secrets, string, time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+from sqlite_db import thread_conn
+
+DB_PATH = os.getenv("STORE_DB_PATH", "./data/store.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS groups (
+    group_id      TEXT PRIMARY KEY,
+    name          TEXT NOT NULL,
+    owner_user_id INTEGER NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS group_members (
+    id       INTEGER PRIMARY KEY,
+    group_id TEXT NOT NULL REFERENCES groups(group_id) ON DELETE CASCADE,
+    user_id  INTEGER NOT NULL,
+    status   TEXT NOT NULL CHECK(status IN ('member','pending')),
+    UNIQUE (group_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_group_members_user ON group_members(user_id, status);
+-- وقت كل طلب معلّق، مفهرس بالوقت لانتهاء الطلبات القديمة؛ المشغّلات تبقيه مطابقًا لـ group_members
+CREATE TABLE IF NOT EXISTS pending_requests (
+    group_id     TEXT NOT NULL,
+    user_id      INTEGER NOT NULL,
+    requested_at INTEGER NOT NULL,
+    PRIMARY KEY (group_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_pending_requested ON pending_requests(requested_at);
+CREATE TRIGGER IF NOT EXISTS trg_pending_add AFTER INSERT ON group_members WHEN NEW.status = 'pending'
+BEGIN
+    INSERT OR REPLACE INTO pending_requests(group_id, user_id, requested_at)
+    VALUES (NEW.group_id, NEW.user_id, CAST(strftime('%s', 'now') AS INTEGER));
+END;
+CREATE TRIGGER IF NOT EXISTS trg_pending_del AFTER DELETE ON group_members WHEN OLD.status = 'pending'
+BEGIN
+    DELETE FROM pending_requests WHERE group_id = OLD.group_id AND user_id = OLD.user_id;
+END;
+CREATE TABLE IF NOT EXISTS accounts (
+    account_id TEXT PRIMARY KEY,
+    user_id    INTEGER NOT NULL UNIQUE,
+    name       TEXT NOT NULL,
+    username   TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_accounts_username ON accounts(username);
+CREATE TABLE IF NOT EXISTS account_names (
+    token   TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    PRIMARY KEY (token, user_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS user_index (
+    user_id  INTEGER PRIMARY KEY,
+    username TEXT NOT NULL DEFAULT '',
+    phone    TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS user_by_username (
+    username TEXT PRIMARY KEY,
+    user_id  INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS user_by_phone (
+    phone   TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+def _db(path: str):
+    return thread_conn(path, SCHEMA)
+
+@contextmanager
+def _write(conn):
+    """معاملة تحجز قفل الكتابة من أولها (BEGIN IMMEDIATE) فيكون الفحص والكتابة بعده ذريًّا بين العمليات.
+
+    مع `with conn:` وحده لا يبدأ sqlite3 المعاملة إلا عند أول INSERT/DELETE، فقد تكتب عملية أخرى بين
+    SELECT الفحص والكتابة.
+    """
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+
+def _gen_numeric_id(length: int = 6) -> str:
+    digits = string.digits
+    return "".join(secrets.choice(digits) for _ in range(length))
+
+# ===== المجموعات =====
+
+def _group(conn, gid: str) -> Optional[Dict[str, Any]]:
+    row = conn.execute("SELECT group_id, name, owner_user_id FROM groups WHERE group_id = ?", (gid,)).fetchone()
+    if not row:
+        return None
+    g = {"group_id": row[0], "name": row[1], "owner_user_id": row[2], "members": [], "pending": []}
+    for uid, status in conn.execute(
+            "SELECT user_id, status FROM group_members WHERE group_id = ? ORDER BY id", (gid,)):
+        g["members" if status == "member" else "pending"].append(uid)
+    return g
+
+def _status(conn, gid: str, uid: int) -> Optional[str]:
+    row = conn.execute("SELECT status FROM group_members WHERE group_id = ? AND user_id = ?",
+                       (gid, uid)).fetchone()
+    return row[0] if row else None
+
+def _existing(conn, group_id: str) -> str:
+    gid = group_id.strip()
+    if not conn.execute("SELECT 1 FROM groups WHERE group_id = ?", (gid,)).fetchone():
+        raise ValueError("GROUP_NOT_FOUND")
+    return gid
+
+def create_group(name: str, owner_user_id: int, path: str = DB_PATH) -> Dict[str, Any]:
+    conn = _db(path)
+    oid = int(owner_user_id)
+    with _write(conn):
+        # كل شخص يملك مجموعة واحدة فقط
+        if conn.execute("SELECT 1 FROM groups WHERE owner_user_id = ?", (oid,)).fetchone():
+            raise ValueError("ALREADY_OWNER")
+        while True:
+            gid = _gen_numeric_id(6)  # أرقام فقط
+            if not conn.execute("SELECT 1 FROM groups WHERE group_id = ?", (gid,)).fetchone():
+                break
+        conn.execute("INSERT INTO groups(group_id, name, owner_user_id) VALUES (?,?,?)", (gid, name.strip(), oid))
+        conn.execute("INSERT INTO group_members(group_id, user_id, status) VALUES (?,?,'member')", (gid, oid))
+    return _group(conn, gid)
+
+def get_group(group_id: str, path: str = DB_PATH) -> Optional[Dict[str, Any]]:
+    return _group(_db(path), group_id.strip())
+
+def is_owner(group_id: str, user_id: int, path: str = DB_PATH) -> bool:
+    row = _db(path).execute("SELECT 1 FROM groups WHERE group_id = ? AND owner_user_id = ?",
+                            (group_id.strip(), int(user_id))).fetchone()
+    return bool(row)
+
+def is_member(group_id: str, user_id: int, path: str = DB_PATH) -> bool:
+    return _status(_db(path), group_id.strip(), int(user_id)) == "member"
+
+def request_join(group_id: str, user_id: int, path: str = DB_PATH) -> Dict[str, Any]:
+    conn = _db(path)
+    uid = int(user_id)
+    with _write(conn):
+        gid = _existing(conn, group_id)
+        st = _status(conn, gid, uid)
+        if st == "member": raise ValueError("ALREADY_MEMBER")
+        if st is None:
+            conn.execute("INSERT INTO group_members(group_id, user_id, status) VALUES (?,?,'pending')", (gid, uid))
+    return _group(conn, gid)
+
+def _make_member(conn, gid: str, uid: int) -> None:
+    st = _status(conn, gid, uid)
+    if st == "member":
+        return
+    if st == "pending":
+        conn.execute("DELETE FROM group_members WHERE group_id = ? AND user_id = ?", (gid, uid))
+    conn.execute("INSERT INTO group_members(group_id, user_id, status) VALUES (?,?,'member')", (gid, uid))
+
+def approve_join(group_id: str, user_id: int, path: str = DB_PATH) -> Dict[str, Any]:
+    conn = _db(path)
+    with _write(conn):
+        gid = _existing(conn, group_id)
+        _make_member(conn, gid, int(user_id))
+    return _group(conn, gid)
+
+def deny_join(group_id: str, user_id: int, path: str = DB_PATH) -> Dict[str, Any]:
+    conn = _db(path)
+    with _write(conn):
+        gid = _existing(conn, group_id)
+        conn.execute("DELETE FROM group_members WHERE group_id = ? AND user_id = ? AND status = 'pending'",
+                     (gid, int(user_id)))
+    return _group(conn, gid)
+
+def add_member(group_id: str, user_id: int, path: str = DB_PATH) -> Dict[str, Any]:
+    return approve_join(group_id, user_id, path)
+
+def remove_member(group_id: str, user_id: int, path: str = DB_PATH) -> Dict[str, Any]:
+    conn = _db(path)
+    with _write(conn):
+        gid = _existing(conn, group_id)
+        conn.execute("""
+            DELETE FROM group_members
+            WHERE group_id = ? AND user_id = ?
+              AND user_id != (SELECT owner_user_id FROM groups WHERE group_id = ?)
+        """, (gid, int(user_id), gid))
+    return _group(conn, gid)
+
+def _bulk(kind: str, group_id: str, user_ids: Iterable[int], path: str) -> Dict[str, List[int]]:
+    conn = _db(path)
+    uids = list(dict.fromkeys(int(u) for u in user_ids))
+    with _write(conn):   # معاملة واحدة لكل القائمة
+        gid = _existing(conn, group_id)
+        owner = conn.execute("SELECT owner_user_id FROM groups WHERE group_id = ?", (gid,)).fetchone()[0]
+        status: Dict[int, str] = {}
+        for i in range(0, len(uids), 500):   # حد متغيرات SQLite
+            chunk = uids[i:i + 500]
+            status.update(conn.execute(
+                "SELECT user_id, status FROM group_members WHERE group_id = ? AND user_id IN (%s)"
+                % ",".join("?" * len(chunk)), [gid, *chunk]).fetchall())
+        if kind == "add":
+            done = [u for u in uids if status.get(u) != "member"]
+            conn.executemany("DELETE FROM group_members WHERE group_id = ? AND user_id = ? AND status = 'pending'",
+                             [(gid, u) for u in done])
+            conn.executemany("INSERT INTO group_members(group_id, user_id, status) VALUES (?,?,'member')",
+                             [(gid, u) for u in done])
+        else:
+            done = [u for u in uids if status.get(u) == "member" and u != owner]
+            conn.executemany("DELETE FROM group_members WHERE group_id = ? AND user_id = ?", [(gid, u) for u in done])
+    picked = set(done)
+    return {"done": done, "skipped": [u for u in uids if u not in picked]}
+
+def add_members(group_id: str, user_ids: Iterable[int], path: str = DB_PATH) -> Dict[str, List[int]]:
+    return _bulk("add", group_id, user_ids, path)
+
+def remove_members(group_id: str, user_ids: Iterable[int], path: str = DB_PATH) -> Dict[str, List[int]]:
+    return _bulk("remove", group_id, user_ids, path)
+
+# ===== طابور الطلبات المعلّقة =====
+
+def pending_queue(group_id: str, limit: int = 10, offset: int = 0,
+                  path: str = DB_PATH) -> Optional[Dict[str, Any]]:
+    conn = _db(path)
+    gid = group_id.strip()
+    if not conn.execute("SELECT 1 FROM groups WHERE group_id = ?", (gid,)).fetchone():
+        return None
+    total = conn.execute("SELECT COUNT(*) FROM group_members WHERE group_id = ? AND status = 'pending'",
+                         (gid,)).fetchone()[0]
+    items = conn.execute("""
+        SELECT m.user_id, p.requested_at FROM group_members m
+        LEFT JOIN pending_requests p ON p.group_id = m.group_id AND p.user_id = m.user_id
+        WHERE m.group_id = ? AND m.status = 'pending' ORDER BY m.id LIMIT ? OFFSET ?
+    """, (gid, limit, offset)).fetchall()
+    return {"total": total, "items": [tuple(r) for r in items]}
+
+def _take_pending(kind: str, group_id: str, count: Optional[int], before: Optional[float],
+                  path: str) -> List[int]:
+    conn = _db(path)
+    with _write(conn):
+        gid = _existing(conn, group_id)
+        uids = [r[0] for r in conn.execute("""
+            SELECT m.user_id FROM group_members m
+            LEFT JOIN pending_requests p ON p.group_id = m.group_id AND p.user_id = m.user_id
+            WHERE m.group_id = ? AND m.status = 'pending'
+              AND (? IS NULL OR p.requested_at IS NULL OR p.requested_at <= ?)
+            ORDER BY m.id LIMIT ?
+        """, (gid, before, before, count or -1))]
+        conn.executemany("DELETE FROM group_members WHERE group_id = ? AND user_id = ? AND status = 'pending'",
+                         [(gid, u) for u in uids])
+        if kind == "approve":
+            conn.executemany("INSERT INTO group_members(group_id, user_id, status) VALUES (?,?,'member')",
+                             [(gid, u) for u in uids])
+    return uids
+
+def approve_pending(group_id: str, count: Optional[int] = None, before: Optional[float] = None,
+                    path: str = DB_PATH) -> List[int]:
+    return _take_pending("approve", group_id, count, before, path)
+
+def deny_pending(group_id: str, count: Optional[int] = None, before: Optional[float] = None,
+                 path: str = DB_PATH) -> List[int]:
+    return _take_pending("deny", group_id, count, before, path)
+
+_pending_ready: set = set()   # مسارات تأكدنا أن لكل طلب معلّق صفًا في pending_requests
+
+def expire_pending(ttl: float, now: Optional[float] = None, path: str = DB_PATH) -> List[Tuple[str, int]]:
+    conn = _db(path)
+    now = time.time() if now is None else now
+    with _write(conn):
+        if path not in _pending_ready:   # طلبات أقدم من الجدول: وقتها = الآن
+            conn.execute("""
+                INSERT OR IGNORE INTO pending_requests(group_id, user_id, requested_at)
+                SELECT group_id, user_id, ? FROM group_members WHERE status = 'pending'
+            """, (int(now),))
+            _pending_ready.add(path)
+        due = conn.execute("SELECT group_id, user_id FROM pending_requests WHERE requested_at <= ? "
+                           "ORDER BY requested_at", (now - ttl,)).fetchall()
+        conn.executemany("DELETE FROM group_members WHERE group_id = ? AND user_id = ? AND status = 'pending'", due)
+    return [tuple(r) for r in due]
+
+def my_groups(user_id: int, path: str = DB_PATH) -> List[Dict[str, Any]]:
+    conn = _db(path)
+    rows = conn.execute("""
+        SELECT g.group_id FROM group_members m JOIN groups g ON g.group_id = m.group_id
+        WHERE m.user_id = ? AND m.status = 'member'
+        ORDER BY g.rowid
+    """, (int(user_id),)).fetchall()
+    return [_group(conn, gid) for (gid,) in rows]
+
+def owner_group(user_id: int, path: str = DB_PATH) -> Optional[Dict[str, Any]]:
+    conn = _db(path)
+    row = conn.execute("SELECT group_id FROM groups WHERE owner_user_id = ?", (int(user_id),)).fetchone()
+    return _group(conn, row[0]) if row else None
+
+def list_members(group_id: str, path: str = DB_PATH) -> List[int]:
+    rows = _db(path).execute(
+        "SELECT user_id FROM group_members WHERE group_id = ? AND status = 'member' ORDER BY id",
+        (group_id.strip(),)).fetchall()
+    return [r[0] for r in rows]
+
+def members_page(group_id: str, limit: int = 20, after: Optional[int] = None, before: Optional[int] = None,
+                 path: str = DB_PATH) -> Optional[Dict[str, Any]]:
+    conn = _db(path)
+    gid = group_id.strip()
+    row = conn.execute("SELECT name, owner_user_id FROM groups WHERE group_id = ?", (gid,)).fetchone()
+    if not row:
+        return None
+    base = "SELECT user_id FROM group_members WHERE group_id = ? AND status = 'member'"
+    page = None
+    if before is not None:
+        page = [r[0] for r in conn.execute(base + " AND user_id < ? ORDER BY user_id DESC LIMIT ?",
+                                           (gid, int(before), limit))][::-1]
+        if len(page) < limit:   # وصلنا للبداية: الصفحة الأولى كاملة
+            page = None
+    if page is None:
+        if after is not None and before is None:
+            page = [r[0] for r in conn.execute(base + " AND user_id > ? ORDER BY user_id LIMIT ?",
+                                               (gid, int(after), limit))]
+            if not page:   # حُذف ما بعد المؤشر: اعرض آخر صفحة
+                page = [r[0] for r in conn.execute(base + " ORDER BY user_id DESC LIMIT ?", (gid, limit))][::-1]
+        else:
+            page = [r[0] for r in conn.execute(base + " ORDER BY user_id LIMIT ?", (gid, limit))]
+    out = {"group_id": gid, "name": row[0], "owner_user_id": row[1], "members": page,
+           "total": conn.execute(base.replace("user_id", "COUNT(*)", 1), (gid,)).fetchone()[0],
+           "prev": None, "next": None}
+    if page:
+        q = base.replace("user_id", "1", 1)
+        if conn.execute(q + " AND user_id < ? LIMIT 1", (gid, page[0])).fetchone():
+            out["prev"] = page[0]
+        if conn.execute(q + " AND user_id > ? LIMIT 1", (gid, page[-1])).fetchone():
+            out["next"] = page[-1]
+    return out
+
+# ===== الحسابات =====
+
+def _account(row) -> Optional[Dict[str, Any]]:
+    if not row:
+        return None
+    return {"account_id": row[0], "user_id": row[1], "name": row[2], "username": row[3]}
+
+def get_account_by_user(user_id: int, path: str = DB_PATH) -> Optional[Dict[str, Any]]:
+    return _account(_db(path).execute(
+        "SELECT account_id, user_id, name, username FROM accounts WHERE user_id = ?", (int(user_id),)).fetchone())
+
+_names_ready: set = set()   # مسارات تأكدنا أن account_names فيها مملوء
+
+def _tokens(name: str) -> List[str]:
+    from account_store import name_tokens   # نفس تطبيع نسخة JSON
+    return name_tokens(name)
+
+def _prefix_range(prefix: str):
+    """حدود الاستعلام token >= lo AND token < hi لبادئة (تستخدم فهرس المفتاح الأساسي)."""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def find_by_name_prefix(query: str, limit: int = 10, path: str = DB_PATH) -> List[int]:
+    from account_store import normalize_name, MAX_SCAN
+    words = normalize_name(query).split()
+    if not words:
+        return []
+    conn = _db(path)
+    if path not in _names_ready:   # قاعدة أقدم من جدول account_names: املأه مرة
+        if not conn.execute("SELECT 1 FROM account_names LIMIT 1").fetchone():
+            rows = conn.execute("SELECT user_id, name FROM accounts").fetchall()
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO account_names(token, user_id) VALUES (?,?)",
+                                 [(t, uid) for uid, name in rows for t in _tokens(name)])
+        _names_ready.add(path)
+    probe = max(words, key=len)
+    out: List[int] = []
+    for (uid,) in conn.execute("SELECT user_id FROM account_names WHERE token >= ? AND token < ? "
+                               "ORDER BY token, user_id LIMIT ?", (*_prefix_range(probe), MAX_SCAN)):
+        if len(out) >= limit:
+            break
+        if uid in out:
+            continue
+        if len(words) > 1:
+            toks = [r[0] for r in conn.execute("SELECT token FROM account_names WHERE user_id = ?", (uid,))]
+            if not all(any(t.startswith(w) for t in toks) for w in words):
+                continue
+        out.append(uid)
+    return out
+
+def create_or_update_account(user_id: int, name: str, username: Optional[str] = None,
+                             path: str = DB_PATH) -> Dict[str, Any]:
+    conn = _db(path)
+    uid = int(user_id)
+    with conn:
+        conn.execute("DELETE FROM account_names WHERE user_id = ?", (uid,))
+        conn.executemany("INSERT OR IGNORE INTO account_names(token, user_id) VALUES (?,?)",
+                         [(t, uid) for t in _tokens(name)])
+        if conn.execute("SELECT 1 FROM accounts WHERE user_id = ?", (uid,)).fetchone():
+            conn.execute("UPDATE accounts SET name = ? WHERE user_id = ?", (name.strip(), uid))
+            if username is not None:
+                conn.execute("UPDATE accounts SET username = ? WHERE user_id = ?", (username, uid))
+        else:
+            while True:
+                acc_id = _gen_numeric_id(6)  # أرقام فقط
+                if not conn.execute("SELECT 1 FROM accounts WHERE account_id = ?", (acc_id,)).fetchone():
+                    break
+            conn.execute("INSERT INTO accounts(account_id, user_id, name, username) VALUES (?,?,?,?)",
+                         (acc_id, uid, name.strip(), username or ""))
+    return get_account_by_user(uid, path)
+
+def set_username(user_id: int, username: Optional[str], path: str = DB_PATH) -> None:
+    if username is None:
+        return
+    conn = _db(path)
+    with conn:
+        conn.execute("UPDATE accounts SET username = ? WHERE user_id = ?", (username, int(user_id)))
+
+def _display(acc: Optional[Dict[str, Any]], user_id: int) -> str:
+    if acc:
+        uname = ("@" + acc["username"]) if acc.get("username") else ""
+        return f"{acc['name']} {uname}".strip()
+    return str(user_id)
+
+def get_display(user_id: int, path: str = DB_PATH) -> str:
+    return _display(get_account_by_user(user_id, path), user_id)
+
+def get_displays(user_ids: Iterable[int], path: str = DB_PATH) -> Dict[int, str]:
+    conn = _db(path)
+    uids = [int(u) for u in user_ids]
+    accs: Dict[int, Dict[str, Any]] = {}
+    for i in range(0, len(uids), 500):   # حد متغيرات SQLite
+        chunk = uids[i:i + 500]
+        rows = conn.execute(
+            "SELECT account_id, user_id, name, username FROM accounts WHERE user_id IN (%s)"
+            % ",".join("?" * len(chunk)), chunk).fetchall()
+        for row in rows:
+            accs[row[1]] = _account(row)
+    return {uid: _display(accs.get(uid), uid) for uid in uids}
+
+# ===== فهرس المستخدمين =====
+
+def upsert(user_id: int, username: Optional[str] = None, phone: Optional[str] = None,
+           path: str = DB_PATH) -> None:
+    conn = _db(path)
+    uid = int(user_id)
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO user_index(user_id, username, phone) VALUES (?,?,?)",
+                     (uid, username or "", phone or ""))
+        if username:
+            conn.execute("INSERT OR REPLACE INTO user_by_username(username, user_id) VALUES (?,?)",
+                         (username.lower(), uid))
+        if phone:
+            conn.execute("INSERT OR REPLACE INTO user_by_phone(phone, user_id) VALUES (?,?)", (phone, uid))
+
+def find_by_username(username: str, path: str = DB_PATH) -> Optional[int]:
+    row = _db(path).execute("SELECT user_id FROM user_by_username WHERE username = ?",
+                            (username.lower(),)).fetchone()
+    return row[0] if row else None
+
+def find_by_username_prefix(prefix: str, limit: int = 10, path: str = DB_PATH) -> List[int]:
+    p = prefix.lower()
+    if not p:
+        return []
+    rows = _db(path).execute("SELECT user_id FROM user_by_username WHERE username >= ? AND username < ? "
+                             "ORDER BY username LIMIT ?", (*_prefix_range(p), limit)).fetchall()
+    return [r[0] for r in rows]
+
+def find_many_by_username(usernames: Iterable[str], path: str = DB_PATH) -> Dict[str, int]:
+    conn = _db(path)
+    names = list(dict.fromkeys(u.lower() for u in usernames))
+    out: Dict[str, int] = {}
+    for i in range(0, len(names), 500):
+        chunk = names[i:i + 500]
+        out.update(conn.execute("SELECT username, user_id FROM user_by_username WHERE username IN (%s)"
+                                % ",".join("?" * len(chunk)), chunk).fetchall())
+    return out
+
+def find_by_phone(phone: str, path: str = DB_PATH) -> Optional[int]:
+    row = _db(path).execute("SELECT user_id FROM user_by_phone WHERE phone = ?", (phone,)).fetchone()
+    return row[0] if row else None
+
+def get_cached(user_id: int, path: str = DB_PATH) -> Dict[str, str]:
+    row = _db(path).execute("SELECT username, phone FROM user_index WHERE user_id = ?", (int(user_id),)).fetchone()
+    return {"username": row[0], "phone": row[1]} if row else {"username": "", "phone": ""}
+
+# ===== ترحيل البيانات من ملفات JSON =====
+
+def import_json(groups_path: str, accounts_path: str, index_path: str, path: str = DB_PATH) -> None:
+    """ينسخ محتوى ملفات JSON الحالية إلى قاعدة SQLite (يُشغَّل مرة قبل تبديل الباك-إند)."""
+    import json_cache, group_store
+    conn = _db(path)
+    groups = group_store.all_groups(groups_path)   # ملف واحد أو شرائح groups.d
+    accounts = json_cache.load(accounts_path).get("accounts", {}) if os.path.exists(accounts_path) else {}
+    index = json_cache.load(index_path) if os.path.exists(index_path) else {}
+    with conn:
+        for g in groups.values():
+            conn.execute("INSERT OR REPLACE INTO groups(group_id, name, owner_user_id) VALUES (?,?,?)",
+                         (g["group_id"], g["name"], g["owner_user_id"]))
+            for uid in g.get("members", []):
+                conn.execute("INSERT OR IGNORE INTO group_members(group_id, user_id, status) VALUES (?,?,'member')",
+                             (g["group_id"], uid))
+            for uid in g.get("pending", []):
+                conn.execute("INSERT OR IGNORE INTO group_members(group_id, user_id, status) VALUES (?,?,'pending')",
+                             (g["group_id"], uid))
+                ts = g.get("pending_at", {}).get(str(uid))
+                if ts:
+                    conn.execute("UPDATE pending_requests SET requested_at = ? WHERE group_id = ? AND user_id = ?",
+                                 (int(ts), g["group_id"], uid))
+        for a in accounts.values():
+            conn.execute("INSERT OR REPLACE INTO accounts(account_id, user_id, name, username) VALUES (?,?,?,?)",
+                         (a["account_id"], a["user_id"], a["name"], a.get("username") or ""))
+            conn.executemany("INSERT OR IGNORE INTO account_names(token, user_id) VALUES (?,?)",
+                             [(t, a["user_id"]) for t in _tokens(a["name"])])
+        for uid, info in index.get("by_id", {}).items():
+            conn.execute("INSERT OR REPLACE INTO user_index(user_id, username, phone) VALUES (?,?,?)",
+                         (int(uid), info.get("username") or "", info.get("phone") or ""))
+        conn.executemany("INSERT OR REPLACE INTO user_by_username(username, user_id) VALUES (?,?)",
+                         index.get("by_username", {}).items())
+        conn.executemany("INSERT OR REPLACE INTO user_by_phone(phone, user_id) VALUES (?,?)",
+                         index.get("by_phone", {}).items())
+
+if __name__ == "__main__":
+    import sys
+    # python sqlite_store.py groups.json accounts.json user_index.json [store.db]
+    import_json(*sys.argv[1:5])
+    print("✅ imported into", sys.argv[4] if len(sys.argv) > 4 else DB_PATH)
@@ -0,0 +1,166 @@
+# state_store.py
+"""حفظ حالة المحادثات (user_data / chat_data / ConversationHandler) في SQLite.
+
+- لا شيء يُحمَّل عند التشغيل: بيانات كل مستخدم/محادثة تُقرأ من القاعدة أول ما يصل منه تحديث
+  (refresh_user_data)، فالمستخدمون الخاملون لا يشغلون ذاكرة ولا يبطئون الإقلاع.
+- الكتابة صف لكل مستخدم/محادثة، وفقط لو تغيّر المحتوى عن آخر نسخة محفوظة.
+- الاستعلامات تمر على خيط القاعدة (DBExecutor) فلا تُوقف حلقة asyncio.
+- مع عدة عمليات (STORE_MULTIPROCESS=1) يُعاد فحص صف المستخدم مع كل تحديث لأن تحديثه السابق ربما
+  عالجته عملية أخرى، والسيرفر يحفظ بعد كل تحديث بدل الانتظار لـ update_interval.
+
+    app = Application.builder().token(TOKEN).persistence(SqlitePersistence()).build()
+"""
+import os, json
+from typing import Any, Dict, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from sqlite_db import thread_conn, DBExecutor
+
+DB_PATH = os.getenv("STATE_DB_PATH", "./data/state.db")
+# كل كم ثانية تُكتب التغييرات (PTB يجمع المستخدمين الذين تغيّرت بياناتهم فقط)
+UPDATE_INTERVAL = float(os.getenv("STATE_UPDATE_INTERVAL", "5"))
+MULTIPROCESS = os.getenv("STORE_MULTIPROCESS", "0") == "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (
+    user_id INTEGER PRIMARY KEY,
+    data    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chat_data (
+    chat_id INTEGER PRIMARY KEY,
+    data    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bot_data (
+    id   INTEGER PRIMARY KEY CHECK(id = 0),
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    name  TEXT NOT NULL,
+    key   TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (name, key)
+) WITHOUT ROWID;
+"""
+
+# أسماء الجداول ثابتة (ليست من المستخدم) فلا خطر من تركيبها في الاستعلام
+_KEYS = {"user_data": "user_id", "chat_data": "chat_id", "bot_data": "id"}
+
+def _encode(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+# ===== دوال القاعدة (تعمل على خيط القاعدة) =====
+
+def _get(path: str, table: str, key: int) -> Optional[str]:
+    row = thread_conn(path, SCHEMA).execute(
+        f"SELECT data FROM {table} WHERE {_KEYS[table]} = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def _put(path: str, table: str, key: int, raw: str) -> None:
+    conn = thread_conn(path, SCHEMA)
+    with conn:
+        if raw == "{}":
+            conn.execute(f"DELETE FROM {table} WHERE {_KEYS[table]} = ?", (key,))
+        else:
+            conn.execute(f"INSERT OR REPLACE INTO {table} ({_KEYS[table]}, data) VALUES (?, ?)", (key, raw))
+
+def _conversations(path: str, name: str) -> Dict[Tuple, Any]:
+    rows = thread_conn(path, SCHEMA).execute(
+        "SELECT key, state FROM conversations WHERE name = ?", (name,)).fetchall()
+    return {tuple(json.loads(k)): json.loads(s) for k, s in rows}
+
+def _put_conversation(path: str, name: str, key: str, state: Optional[str]) -> None:
+    conn = thread_conn(path, SCHEMA)
+    with conn:
+        if state is None:
+            conn.execute("DELETE FROM conversations WHERE name = ? AND key = ?", (name, key))
+        else:
+            conn.execute("INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)",
+                         (name, key, state))
+
+class SqlitePersistence(BasePersistence):
+    def __init__(self, path: str = DB_PATH, update_interval: float = UPDATE_INTERVAL):
+        super().__init__(store_data=PersistenceInput(callback_data=False), update_interval=update_interval)
+        self.path = path
+        self._db = DBExecutor(path)
+        # آخر نسخة مكتوبة لكل صف لتجاهل الحفظ بدون تغيير؛ وجود المفتاح = تم تحميله من القاعدة
+        self._saved: Dict[str, Dict[int, str]] = {"user_data": {}, "chat_data": {}, "bot_data": {}}
+
+    # ----- التحميل: فارغ عند التشغيل، ثم لكل مستخدم/محادثة عند أول تحديث -----
+    async def get_user_data(self) -> Dict[int, Any]:
+        return {}
+
+    async def get_chat_data(self) -> Dict[int, Any]:
+        return {}
+
+    async def get_bot_data(self) -> Any:
+        raw = await self._db.run(_get, self.path, "bot_data", 0)
+        self._saved["bot_data"][0] = raw or "{}"
+        return json.loads(raw) if raw else {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str):
+        return await self._db.run(_conversations, self.path, name)
+
+    async def _refresh(self, table: str, key: int, data: Dict) -> None:
+        saved = self._saved[table]
+        if key in saved and not MULTIPROCESS:
+            return
+        raw = await self._db.run(_get, self.path, table, key) or "{}"
+        if MULTIPROCESS:
+            if saved.get(key) != raw:   # عملية أخرى غيّرته: نسختها هي الأحدث
+                data.clear()
+                data.update(json.loads(raw))
+                saved[key] = raw
+            return
+        if key in saved:   # تحديث آخر لنفس المستخدم حمّله أثناء الانتظار
+            return
+        saved[key] = raw
+        for k, v in json.loads(raw).items():
+            data.setdefault(k, v)
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict) -> None:
+        await self._refresh("user_data", int(user_id), user_data)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict) -> None:
+        await self._refresh("chat_data", int(chat_id), chat_data)
+
+    async def refresh_bot_data(self, bot_data: Any) -> None:
+        pass
+
+    # ----- الكتابة: صف واحد ولو تغيّر فقط -----
+    async def _update(self, table: str, key: int, data: Any) -> None:
+        raw = _encode(data)
+        saved = self._saved[table]
+        if saved.get(key) == raw:
+            return
+        await self._db.run(_put, self.path, table, key, raw)
+        saved[key] = raw
+
+    async def update_user_data(self, user_id: int, data: Dict) -> None:
+        await self._update("user_data", int(user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data: Dict) -> None:
+        await self._update("chat_data", int(chat_id), data)
+
+    async def update_bot_data(self, data: Any) -> None:
+        await self._update("bot_data", 0, data)
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def update_conversation(self, name: str, key: Tuple, new_state: Optional[object]) -> None:
+        state = None if new_state is None else _encode(new_state)
+        await self._db.run(_put_conversation, self.path, name, _encode(list(key)), state)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        await self._update("user_data", int(user_id), {})
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        await self._update("chat_data", int(chat_id), {})
+
+    async def flush(self) -> None:
+        """يُستدعى عند shutdown بعد آخر حفظ: يغلق اتصال القاعدة."""
+        self._db.shutdown()
@@ -0,0 +1,47 @@
+# tests/conftest.py
+"""إعدادات المخازن تُقرأ من البيئة عند الاستيراد، فكل سيناريو يعمل في عملية Python مستقلة
+بملفات داخل tmp_path — وهذا أيضًا ما تحتاجه اختبارات العمليات المتعددة."""
+import os, sys, json, textwrap, subprocess
+from typing import Any, Dict, List
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class Stores:
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.env = {
+            "GROUPS_PATH": os.path.join(folder, "groups.json"),
+            "ACCOUNTS_PATH": os.path.join(folder, "accounts.json"),
+            "USER_INDEX_PATH": os.path.join(folder, "user_index.json"),
+            "STORE_DB_PATH": os.path.join(folder, "store.db"),
+        }
+
+    def path(self, *parts: str) -> str:
+        return os.path.join(self.folder, *parts)
+
+    def spawn(self, code: str, *args: str, **env: str) -> subprocess.Popen:
+        """يشغّل code (ومعاملاته في sys.argv[1:]) دون انتظار، لتجارب العمليات المتزامنة."""
+        full = dict(os.environ, PYTHONPATH=ROOT, **self.env, **env)
+        cmd = [sys.executable, "-c", textwrap.dedent(code), *args]
+        return subprocess.Popen(cmd, env=full, cwd=self.folder, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, text=True)
+
+    def run(self, code: str, **env: str) -> Any:
+        """ينفّذ code ويرجع آخر سطر يطبعه كـ JSON."""
+        return self.wait([self.spawn(code, **env)])[0]
+
+    @staticmethod
+    def wait(procs: List[subprocess.Popen]) -> List[Any]:
+        out = []
+        for p in procs:
+            stdout, stderr = p.communicate(timeout=120)
+            assert p.returncode == 0, stderr
+            lines = stdout.strip().splitlines()
+            out.append(json.loads(lines[-1]) if lines else None)
+        return out
+
+@pytest.fixture
+def stores(tmp_path) -> Stores:
+    return Stores(str(tmp_path))
@@ -0,0 +1,75 @@
+# tests/test_group_store_journal.py
+import os, json
+
+JOURNAL = {"GROUPS_JOURNAL": "1"}
+
+MUTATE = """
+    import json, group_store as gs
+    g = gs.create_group("journal", 1)
+    gid = g["group_id"]
+    for uid in (2, 3, 4, 5):
+        gs.request_join(gid, uid)
+    gs.approve_join(gid, 2)
+    gs.deny_join(gid, 3)
+    gs.add_members(gid, [6, 7, 2])
+    gs.remove_members(gid, [7])
+    gs.remove_member(gid, 1)   # المالك لا يُزال
+    print(json.dumps(gs.get_group(gid)))
+"""
+
+STATE = """
+    import json, sys, group_store as gs
+    print(json.dumps(gs.all_groups()))
+"""
+
+def test_log_replays_to_same_state(stores):
+    g = stores.run(MUTATE, **JOURNAL)
+    assert g["members"] == [1, 2, 6] and g["pending"] == [4, 5]
+    with open(stores.path("groups.json"), encoding="utf-8") as f:
+        assert json.load(f)["groups"] == {}   # كل التعديلات في السجل فقط
+    assert stores.run(STATE, **JOURNAL) == {g["group_id"]: g}
+
+def test_replay_is_idempotent(stores):
+    g = stores.run(MUTATE, **JOURNAL)
+    again = stores.run("""
+        import json, group_store as gs
+        d = gs._load(gs.DEFAULT_PATH)
+        ix = gs._indexes[gs.DEFAULT_PATH]
+        gs._replay(d, ix, gs._log_path(gs.DEFAULT_PATH))   # السجل كله مرة ثانية
+        gid = next(iter(d["groups"]))
+        print(json.dumps([d["groups"][gid], sorted(ix["members"][gid]), sorted(ix["pending"][gid])]))
+    """, **JOURNAL)
+    assert again == [g, sorted(g["members"]), sorted(g["pending"])]
+
+def test_partial_last_line_is_ignored(stores):
+    g = stores.run(MUTATE, **JOURNAL)
+    with open(stores.path("groups.json.log"), "ab") as f:
+        f.write(b'{"op": "approve", "gid": "' + g["group_id"].encode() + b'", "ui')
+    assert stores.run(STATE, **JOURNAL) == {g["group_id"]: g}
+
+def test_compaction_folds_log_into_snapshot(stores):
+    g = stores.run(MUTATE, **JOURNAL)
+    stores.run("""
+        import group_store as gs
+        gs.compact()
+        print("null")
+    """, **JOURNAL)
+    assert not os.path.exists(stores.path("groups.json.log"))
+    with open(stores.path("groups.json"), encoding="utf-8") as f:
+        assert json.load(f)["groups"] == {g["group_id"]: g}
+    assert stores.run(STATE, GROUPS_JOURNAL="0") == {g["group_id"]: g}
+
+def test_background_compaction_keeps_later_writes(stores):
+    out = stores.run("""
+        import json, time, group_store as gs
+        gid = gs.create_group("big", 1)["group_id"]
+        for uid in range(2, 400):
+            gs.request_join(gid, uid)
+            if uid % 2:
+                gs.approve_join(gid, uid)
+        while gs._compacting:
+            time.sleep(0.01)
+        print(json.dumps(gs.get_group(gid)))
+    """, GROUPS_JOURNAL_MAX_BYTES="2000", **JOURNAL)
+    assert stores.run(STATE, **JOURNAL) == {out["group_id"]: out}
+    assert len(out["members"]) == 1 + 199 and len(out["pending"]) == 199
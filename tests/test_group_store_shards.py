@@ -0,0 +1,73 @@
+# tests/test_group_store_shards.py
+import os, json
+
+SEED = """
+    import json, group_store as gs
+    gids = []
+    for owner in range(1, 21):
+        gid = gs.create_group(f"g{owner}", owner)["group_id"]
+        gids.append(gid)
+        gs.request_join(gid, 100 + owner)
+        gs.add_member(gid, 500)
+    gs.approve_join(gids[0], 101)
+    print(json.dumps(gs.all_groups()))
+"""
+
+QUERY = """
+    import json, group_store as gs
+    print(json.dumps({
+        "groups": gs.all_groups(),
+        "mine": sorted(g["group_id"] for g in gs.my_groups(500)),
+        "owner": gs.owner_group(7)["group_id"],
+        "shards": gs._shard_count(gs.DEFAULT_PATH),
+    }))
+"""
+
+def test_split_existing_file_into_shards(stores):
+    before = stores.run(SEED)
+    after = stores.run(QUERY, GROUPS_SHARDS="4")
+    assert after["groups"] == before and after["shards"] == 4
+    assert after["mine"] == sorted(before)
+    assert after["owner"] == next(gid for gid, g in before.items() if g["owner_user_id"] == 7)
+    assert os.path.exists(stores.path("groups.json.migrated"))
+    assert not os.path.exists(stores.path("groups.json"))
+    sizes = [len(json.load(open(stores.path("groups.d", f"shard-{i:03d}.json")))["groups"]) for i in range(4)]
+    assert sum(sizes) == 20
+
+def test_split_replays_journal(stores):
+    before = stores.run(SEED, GROUPS_JOURNAL="1")
+    after = stores.run(QUERY, GROUPS_SHARDS="4", GROUPS_JOURNAL="1")
+    assert after["groups"] == before
+    assert os.path.exists(stores.path("groups.json.log.migrated"))
+
+def test_manifest_wins_over_setting(stores):
+    stores.run(SEED, GROUPS_SHARDS="4")
+    after = stores.run(QUERY, GROUPS_SHARDS="8")
+    assert after["shards"] == 4 and len(after["groups"]) == 20
+
+def test_write_touches_only_its_shard(stores):
+    stores.run(SEED, GROUPS_SHARDS="4")
+    out = stores.run("""
+        import json, os, group_store as gs
+        gid = next(iter(gs.all_groups()))
+        shard = os.path.basename(gs._shard_path(gs.DEFAULT_PATH, gs._shard_of(gid, 4)))
+        folder = gs._shard_dir(gs.DEFAULT_PATH)
+        before = {f: os.stat(os.path.join(folder, f)).st_mtime_ns for f in os.listdir(folder)}
+        gs.request_join(gid, 999)
+        changed = [f for f in before if os.stat(os.path.join(folder, f)).st_mtime_ns != before[f]]
+        print(json.dumps([shard, changed, 999 in gs.get_group(gid)["pending"]]))
+    """, GROUPS_SHARDS="4")
+    shard, changed, pending = out
+    assert changed == [shard] and pending
+
+def test_index_follows_write_from_other_process(stores):
+    """عملية أخرى عدّلت شريحة: فهارس هذه العملية (my_groups) تتبعها بعد إعادة تحميل الشريحة."""
+    stores.run(SEED, GROUPS_SHARDS="4", STORE_MULTIPROCESS="1")
+    gid, mine = stores.run("""
+        import json, os, sys, subprocess, group_store as gs
+        gid = sorted(g["group_id"] for g in gs.my_groups(500))[0]
+        subprocess.run([sys.executable, "-c", f"import group_store as gs; gs.remove_member('{gid}', 500)"],
+                       check=True, env=os.environ)
+        print(json.dumps([gid, sorted(g["group_id"] for g in gs.my_groups(500))]))
+    """, GROUPS_SHARDS="4", STORE_MULTIPROCESS="1")
+    assert gid not in mine and len(mine) == 19
@@ -0,0 +1,83 @@
+# tests/test_multiprocess.py
+"""عدة عمليات على نفس ملفات المخازن (STORE_MULTIPROCESS=1 كما يضبطه server.py مع WEB_CONCURRENCY>1)."""
+import pytest
+
+WORKERS, CYCLES = 4, 25
+
+MODES = {
+    "plain": {},
+    "shards": {"GROUPS_SHARDS": "4"},
+    "journal": {"GROUPS_JOURNAL": "1", "GROUPS_JOURNAL_MAX_BYTES": "4000"},
+    "flush": {"STORE_FLUSH_MS": "50"},
+}
+
+WORKER = """
+    import sys, group_store as gs, account_store as acc, user_index as ui, json_cache
+    gid, w = sys.argv[1], int(sys.argv[2])
+    for i in range(%d):
+        uid = 1000 * w + i
+        gs.request_join(gid, uid)
+        gs.approve_join(gid, uid)
+        acc.create_or_update_account(uid, f"user {uid}")
+        ui.upsert(uid, f"user{uid}")
+    json_cache.flush()
+    print("null")
+""" % CYCLES
+
+@pytest.mark.parametrize("mode", sorted(MODES))
+def test_concurrent_writers_lose_nothing(stores, mode):
+    env = dict(MODES[mode], STORE_MULTIPROCESS="1")
+    gid = stores.run("""
+        import json, group_store as gs
+        print(json.dumps(gs.create_group("shared", 1)["group_id"]))
+    """, **env)
+    stores.wait([stores.spawn(WORKER, gid, str(w), **env) for w in range(1, WORKERS + 1)])
+    out = stores.run("""
+        import json, group_store as gs, account_store as acc, user_index as ui
+        gid = next(iter(gs.all_groups()))
+        g = gs.get_group(gid)
+        uids = [1000 * w + i for w in range(1, %d) for i in range(%d)]
+        print(json.dumps({
+            "members": sorted(g["members"]), "pending": g["pending"],
+            "accounts": sum(1 for u in uids if acc.get_account_by_user(u)),
+            "index": sum(1 for u in uids if ui.find_by_username(f"user{u}") == u),
+            "by_user": sum(1 for u in uids if gs.my_groups(u)),
+        }))
+    """ % (WORKERS + 1, CYCLES), **env)
+    expected = sorted([1] + [1000 * w + i for w in range(1, WORKERS + 1) for i in range(CYCLES)])
+    assert out["members"] == expected and out["pending"] == []
+    assert out["accounts"] == out["index"] == out["by_user"] == WORKERS * CYCLES
+
+@pytest.mark.parametrize("mode", ["plain", "shards"])
+def test_one_group_per_owner_across_processes(stores, mode):
+    env = dict(MODES[mode], STORE_MULTIPROCESS="1")
+    racer = """
+        import json, group_store as gs
+        try:
+            gs.create_group("race", 42)
+            print(json.dumps("created"))
+        except ValueError as e:
+            print(json.dumps(str(e)))
+    """
+    results = stores.wait([stores.spawn(racer, **env) for _ in range(WORKERS)])
+    assert sorted(results) == ["ALREADY_OWNER"] * (WORKERS - 1) + ["created"]
+
+def test_dedup_log_shared_by_workers(stores):
+    """كل عامل يلحق بنفس DEDUP_PATH ويضغطه؛ ما يُكتب بعد ضغط عامل آخر لا يضيع."""
+    worker = """
+        import sys
+        from dedup import SeenUpdates
+        w = int(sys.argv[1])
+        s = SeenUpdates(500, "seen.log")
+        for i in range(3000):
+            s.add(w * 1_000_000 + i)
+        s.close()
+        print("null")
+    """
+    stores.wait([stores.spawn(worker, str(w)) for w in range(WORKERS)])
+    with open(stores.path("seen.log"), encoding="utf-8") as f:
+        ids = [int(line) for line in f]
+    assert len(ids) >= 500
+    for w in range(WORKERS):
+        mine = [u - w * 1_000_000 for u in ids if u // 1_000_000 == w]
+        assert mine == list(range(3000 - len(mine), 3000))   # لاحقة متصلة: لا إلحاق ضائع
@@ -0,0 +1,53 @@
+# tests/test_pending_queue.py
+import json
+
+def test_expiry_heap_stays_bounded_with_foreign_writes(stores):
+    """إعادة تحميل الشرائح بعد كتابات عملية أخرى لا تضاعف مدخلات كومة الانتهاء."""
+    out = stores.run("""
+        import json, os, sys, subprocess, group_store as gs
+        gids = [gs.create_group(f"g{i}", 1000 + i)["group_id"] for i in range(10)]
+        for gid in gids:
+            for u in range(20):
+                gs.request_join(gid, 5000 + u)
+        ix = gs._all_index(gs.DEFAULT_PATH)
+        for k in range(20):
+            subprocess.run([sys.executable, "-c",
+                            f"import group_store as gs; gs.request_join('{gids[k % 10]}', {9000 + k})"],
+                           check=True, env=os.environ)
+            gs.my_groups(5000)
+        live = sum(map(len, ix["pending"].values()))
+        print(json.dumps([len(ix["expiry"]), live, len(gs.expire_pending(0))]))
+    """, GROUPS_SHARDS="4", STORE_MULTIPROCESS="1")
+    heap, live, expired = out
+    assert live == expired == 220
+    assert heap <= 2 * live
+
+def test_legacy_requests_are_stamped_once(stores):
+    legacy = {"groups": {"111111": {"group_id": "111111", "name": "x", "owner_user_id": 1,
+                                    "members": [1], "pending": [2, 3]}}}
+    with open(stores.path("groups.json"), "w", encoding="utf-8") as f:
+        json.dump(legacy, f)
+    out = stores.run("""
+        import json, time, group_store as gs
+        gs.pending_queue("111111")   # القراءة لا تكتب أوقاتًا
+        on_disk = json.load(open(gs.DEFAULT_PATH))["groups"]["111111"].get("pending_at")
+        first = gs.expire_pending(3600)
+        stamped = json.load(open(gs.DEFAULT_PATH))["groups"]["111111"]["pending_at"]
+        later = gs.expire_pending(3600, now=time.time() + 7200)
+        print(json.dumps([on_disk, first, sorted(stamped), later]))
+    """)
+    on_disk, first, stamped, later = out
+    assert on_disk is None and first == []
+    assert stamped == ["2", "3"] and later == [["111111", 2], ["111111", 3]]
+
+def test_batch_decision_skips_requests_after_shown_time(stores):
+    out = stores.run("""
+        import json, time, group_store as gs
+        gid = gs.create_group("x", 1)["group_id"]
+        for uid in (2, 3, 4):
+            gs.request_join(gid, uid)
+        shown = int(time.time())
+        gs._open(gs.DEFAULT_PATH, gid)[0]["groups"][gid]["pending_at"]["4"] = shown + 60   # وصل بعد العرض
+        print(json.dumps([gs.approve_pending(gid, 3, shown), gs.get_group(gid)["pending"]]))
+    """)
+    assert out == [[2, 3], [4]]
@@ -0,0 +1,64 @@
+# update_scope.py
+"""سياق لكل تحديث: حساب المستخدم ومجموعاته وملكيته تُحمَّل مرة واحدة وتُشارك
+بين الهاندلر و admin_kb و show_admin، وكل الحفظ يُكتب معًا في نهاية التحديث."""
+import functools
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List
+
+import json_cache
+from account_store import get_account_by_user, format_display
+from group_store   import my_groups, owner_group
+
+_current: ContextVar[Optional["UpdateScope"]] = ContextVar("update_scope", default=None)
+
+_MISSING = object()
+
+class UpdateScope:
+    def __init__(self, user_id: int):
+        self.user_id = int(user_id)
+        self._cache: Dict[str, Any] = {}
+
+    def _get(self, key: str, loader):
+        v = self._cache.get(key, _MISSING)
+        if v is _MISSING:
+            v = self._cache[key] = loader(self.user_id)
+        return v
+
+    @property
+    def account(self) -> Optional[Dict[str, Any]]:
+        return self._get("account", get_account_by_user)
+
+    @property
+    def groups(self) -> List[Dict[str, Any]]:
+        return self._get("groups", my_groups)
+
+    @property
+    def own(self) -> Optional[Dict[str, Any]]:
+        return self._get("own", owner_group)
+
+    @property
+    def display(self) -> str:
+        return format_display(self.account, self.user_id)
+
+    def invalidate(self) -> None:
+        """يُستدعى بعد أي تعديل يخص المستخدم (حساب/مجموعة) ليُعاد التحميل عند الحاجة."""
+        self._cache.clear()
+
+def current(user_id: int) -> UpdateScope:
+    """سياق التحديث الحالي لو كان لنفس المستخدم، وإلا سياق مؤقت."""
+    sc = _current.get()
+    if sc is not None and sc.user_id == int(user_id):
+        return sc
+    return UpdateScope(user_id)
+
+def scoped(handler):
+    """ديكوريتور للهاندلرز: يفتح سياق التحديث ويجمع الحفظ في كتابة واحدة بالنهاية."""
+    @functools.wraps(handler)
+    async def wrapper(update, context, *args, **kwargs):
+        token = _current.set(UpdateScope(update.effective_user.id))
+        try:
+            with json_cache.batch():
+                return await handler(update, context, *args, **kwargs)
+        finally:
+            _current.reset(token)
+    return wrapper
@@ -1,6 +1,8 @@
 # user_index.py
 import os, json
-from typing import Optional, Dict, Any
+from bisect import bisect_left, insort
+import json_cache
+from typing import Optional, Dict, Any, List, Iterable
 
 DEFAULT_PATH = os.getenv("USER_INDEX_PATH", "./data/user_index.json")
 
@@ -11,37 +13,78 @@ def _ensure() -> Dict[str, Any]:
     if not os.path.exists(DEFAULT_PATH):
         with open(DEFAULT_PATH, "w", encoding="utf-8") as f:
             json.dump({"by_username": {}, "by_phone": {}, "by_id": {}}, f)
-    with open(DEFAULT_PATH, "r", encoding="utf-8") as f:
-        try: d = json.load(f)
-        except json.JSONDecodeError: d = {}
+    d = json_cache.load(DEFAULT_PATH)
     d.setdefault("by_username", {})
     d.setdefault("by_phone", {})
     d.setdefault("by_id", {})
     return d
 
 def _save(d: Dict[str, Any]) -> None:
-    tmp = DEFAULT_PATH + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(d, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, DEFAULT_PATH)
+    json_cache.save(d, DEFAULT_PATH)
+
+# أسماء المستخدمين مرتبة للبحث بالبادئة (bisect)؛ تُبنى عند أول بحث بعد كل تحميل للملف
+_prefix: Dict[str, Any] = {"data": None, "keys": []}
+
+def _sorted_usernames(d: Dict[str, Any]) -> List[str]:
+    if _prefix["data"] is not d:
+        _prefix["keys"] = sorted(d["by_username"])
+        _prefix["data"] = d
+    return _prefix["keys"]
 
 def upsert(user_id: int, username: Optional[str] = None, phone: Optional[str] = None) -> None:
-    d = _ensure()
-    d["by_id"][str(user_id)] = {"username": username or "", "phone": phone or ""}
-    if username:
-        d["by_username"][username.lower()] = int(user_id)
-    if phone:
-        d["by_phone"][phone] = int(user_id)
-    _save(d)
+    with json_cache.transaction(DEFAULT_PATH):
+        d = _ensure()
+        entry = {"username": username or "", "phone": phone or ""}
+        if (d["by_id"].get(str(user_id)) == entry
+                and (not username or d["by_username"].get(username.lower()) == int(user_id))
+                and (not phone or d["by_phone"].get(phone) == int(user_id))):
+            return   # لا تغيير: تجنّب إعادة كتابة الملف مع كل رسالة
+        d["by_id"][str(user_id)] = entry
+        if username:
+            key = username.lower()
+            if key not in d["by_username"] and _prefix["data"] is d:
+                insort(_prefix["keys"], key)
+            d["by_username"][key] = int(user_id)
+        if phone:
+            d["by_phone"][phone] = int(user_id)
+        _save(d)
 
 def find_by_username(username: str) -> Optional[int]:
     d = _ensure()
     return d["by_username"].get(username.lower())
 
+def find_many_by_username(usernames: Iterable[str]) -> Dict[str, int]:
+    """عدة أسماء مستخدمين بتحميل واحد للفهرس: {username بحروف صغيرة: user_id} للموجودين فقط."""
+    by_username = _ensure()["by_username"]
+    out: Dict[str, int] = {}
+    for u in usernames:
+        key = u.lower()
+        if key in by_username:
+            out[key] = by_username[key]
+    return out
+
+def find_by_username_prefix(prefix: str, limit: int = 10) -> List[int]:
+    """أول limit مستخدمين (بترتيب username) يبدأ اسم مستخدمهم بـ prefix."""
+    d = _ensure()
+    keys = _sorted_usernames(d)
+    p = prefix.lower()
+    out: List[int] = []
+    i = bisect_left(keys, p)
+    while i < len(keys) and len(out) < limit and keys[i].startswith(p):
+        out.append(d["by_username"][keys[i]])
+        i += 1
+    return out
+
 def find_by_phone(phone: str) -> Optional[int]:
     d = _ensure()
     return d["by_phone"].get(phone)
 
 def get_cached(user_id: int) -> Dict[str, str]:
     d = _ensure()
-    return d["by_id"].get(str(user_id), {"username": "", "phone": ""})
\ No newline at end of file
+    return d["by_id"].get(str(user_id), {"username": "", "phone": ""})
+
+# ===== باك-إند SQLite (STORE_BACKEND=sqlite) =====
+if os.getenv("STORE_BACKEND", "json").lower() == "sqlite":
+    from sqlite_store import (  # noqa: F811
+        upsert, find_by_username, find_many_by_username, find_by_username_prefix, find_by_phone, get_cached
+    )
@@ -0,0 +1,56 @@
+# user_search.py
+"""بحث المستخدمين بالبادئة لويزاردات الإضافة/الإزالة/الدعوة.
+
+يجمع فهرسين مرتبين: أسماء المستخدمين (user_index) وكلمات أسماء الحسابات (account_store)،
+وكل استعلام بضع عمليات bisect فقط. لو لم تكفِ المطابقات يُعاد البحث بافتراض خطأ إملائي واحد
+(حرف زائد أو حرفان متبادلان).
+الاستعلام يُقص إلى SEARCH_MAX_QUERY حرفًا والتصحيح للاستعلامات القصيرة فقط، لأن عدد الاحتمالات
+يكبر مع الطول والبحث يعمل على حلقة الأحداث.
+"""
+import os
+from typing import Callable, Iterator, List, Optional
+
+from account_store import find_by_name_prefix
+from user_index import find_by_username_prefix
+
+SEARCH_LIMIT = int(os.getenv("USER_SEARCH_LIMIT", "8"))
+SEARCH_MAX_QUERY = int(os.getenv("USER_SEARCH_MAX_QUERY", "64"))
+FUZZY_MIN_LEN = 4    # البادئات الأقصر تطابق كثيرًا أصلًا
+FUZZY_MAX_LEN = 24   # الأطول: 2·L احتمال لكل منها bisect — ليست كتابة اسم باليد
+
+def _typos(q: str) -> Iterator[str]:
+    seen = {q}
+    variants = [q[:i] + q[i + 1] + q[i] + q[i + 2:] for i in range(len(q) - 1)]   # حرفان متبادلان
+    variants += [q[:i] + q[i + 1:] for i in range(len(q))]                         # حرف زائد
+    for v in variants:
+        if v.strip() and v not in seen:
+            seen.add(v)
+            yield v
+
+def search(query: str, limit: int = SEARCH_LIMIT,
+           where: Optional[Callable[[int], bool]] = None) -> List[int]:
+    """أفضل limit مستخدمين لـ query: مطابقة username ثم الاسم، ثم التصحيح الإملائي.
+
+    where (اختياري) يستبعد من لا يصلح (مثل غير الأعضاء عند الإزالة).
+    """
+    q = query.strip().lstrip("@")[:SEARCH_MAX_QUERY].strip()
+    if not q:
+        return []
+    out: List[int] = []
+    fetch = limit * 4 if where else limit
+    def take(uids: List[int]) -> None:
+        for uid in uids:
+            if len(out) >= limit:
+                return
+            if uid not in out and (where is None or where(uid)):
+                out.append(uid)
+    variants = [q]
+    if FUZZY_MIN_LEN <= len(q) <= FUZZY_MAX_LEN:
+        variants += list(_typos(q))
+    for v in variants:
+        if len(out) >= limit:
+            break
+        if " " not in v:
+            take(find_by_username_prefix(v, fetch))
+        take(find_by_name_prefix(v, fetch))
+    return out